@@ -29,6 +29,7 @@ from app.routers import (
     plan,
     route,
     terrain,
+    tiles,
     weather,
 )
 from app.services.beads_reporter import (
@@ -37,6 +38,7 @@ from app.services.beads_reporter import (
     report_unhandled_exception,
 )
 from app.startup_checks import collect_startup_config_issues
+from app.utils.data_versions import data_versions
 
 
 logger = logging.getLogger(__name__)
@@ -75,7 +77,13 @@ def create_app(settings: Settings) -> FastAPI:
             logger.warning("Startup config: missing %s (%s)", missing, feature)
             for step in issue.get("remediation") or []:
                 logger.warning("  - %s", step)
-        yield
+
+        # Load and index the data caches in the background, then poll them for changes.
+        data_versions.start()
+        try:
+            yield
+        finally:
+            data_versions.stop()
 
     app = FastAPI(
         title=settings.app_name,
@@ -113,6 +121,7 @@ def create_app(settings: Settings) -> FastAPI:
     app.include_router(local.router, prefix=settings.api_prefix, tags=["local"])
     app.include_router(airspace.router, prefix=settings.api_prefix, tags=["airspace"])
     app.include_router(terrain.router, prefix=settings.api_prefix, tags=["terrain"])
+    app.include_router(tiles.router, prefix=settings.api_prefix, tags=["tiles"])
     app.include_router(meta.router, prefix=settings.api_prefix, tags=["meta"])
 
     @app.exception_handler(Exception)
@@ -1,15 +1,32 @@
 from __future__ import annotations
 
 import difflib
-import math
+import heapq
 import re
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
-from app.utils.data_loader import load_airports
+import numpy as np
 
+from app.models.airport_table import AirportTable, char_bins
+from app.utils.data_versions import current_data
+from app.utils.text_index import padded_trigrams, trigrams
 
-def load_airport_cache() -> List[Dict[str, Any]]:
-    return load_airports()
+
+# Upper bound on rows scored with SequenceMatcher for a typo'd query. Candidates are taken in
+# order of their quick_ratio bound, and scoring stops early once no remaining row can enter
+# the results, so the cap only binds on unusually ambiguous queries.
+FUZZY_CANDIDATE_LIMIT = 400
+FUZZY_MIN_RATIO = 0.6
+
+# Viewport queries: decimation cells are this many screen pixels wide (256px Web Mercator
+# tiles), and at or above BBOX_FULL_DETAIL_ZOOM airports are returned individually.
+BBOX_CLUSTER_CELL_PX = 40.0
+BBOX_FULL_DETAIL_ZOOM = 12
+BBOX_MAX_POINTS = 500
+
+
+def load_airport_cache() -> Sequence[Mapping[str, Any]]:
+    return current_data().airports
 
 
 def _normalize_airport_code(value: str) -> str:
@@ -31,88 +48,229 @@ def _normalize_airport_code(value: str) -> str:
     return value.strip().upper()
 
 
-def _candidate_codes(code_u: str) -> set[str]:
-    codes = {code_u}
+_table_cache: Tuple[Optional[Sequence[Mapping[str, Any]]], Optional[AirportTable]] = (None, None)
+
+
+def airport_table_for(airports: Sequence[Mapping[str, Any]]) -> AirportTable:
+    """Return the columnar table for ``airports``, building it once per data version.
+
+    `load_airport_cache` returns the same object for a whole data version, so the object
+    identity doubles as the version. Plain record lists (e.g. test fixtures) are
+    converted on first use.
+    """
 
-    # Our airport cache stores many US local identifiers as pseudo-ICAO codes prefixed with 'K'
-    # (e.g., 7S5 -> K7S5). Allow lookups by the FAA/local code.
-    if (
-        code_u
-        and not code_u.startswith("K")
-        and (len(code_u) == 3 or (3 <= len(code_u) <= 4 and any(ch.isdigit() for ch in code_u)))
-    ):
-        codes.add(f"K{code_u}")
+    global _table_cache
 
-    if code_u.startswith("K") and 4 <= len(code_u) <= 5:
-        codes.add(code_u[1:])
+    if isinstance(airports, AirportTable):
+        return airports
 
-    return codes
+    source, table = _table_cache
+    if source is airports and table is not None:
+        return table
+
+    table = AirportTable.from_records(airports)
+    _table_cache = (airports, table)
+    return table
+
+
+def get_airport_table() -> AirportTable:
+    return airport_table_for(load_airport_cache())
 
 
 def get_airport_coordinates(code: str) -> Optional[Dict[str, Any]]:
     code_u = _normalize_airport_code(code)
-    candidates = _candidate_codes(code_u)
+    if not code_u:
+        return None
 
-    for airport in load_airport_cache():
-        icao_code = (airport.get("icao") or airport.get("icaoCode") or "").upper()
-        iata_code = (airport.get("iata") or airport.get("iataCode") or "").upper()
+    table = get_airport_table()
+    row = table.code_index.get(code_u)
+    return table.row(row) if row is not None else None
 
-        if not ({icao_code, iata_code} & candidates):
-            continue
 
-        lat, lon = _extract_lat_lon(airport)
-        if lat is None or lon is None:
-            continue
+def resolve_airport_codes(codes: Iterable[str]) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Resolve many user-provided codes against one data version.
 
-        return {
-            "icao": icao_code,
-            "iata": iata_code,
-            "name": airport.get("name"),
-            "city": airport.get("city"),
-            "country": airport.get("country"),
-            "latitude": float(lat),
-            "longitude": float(lon),
-            "elevation": airport.get("elevation"),
-            "type": airport.get("type"),
-        }
+    Returns ``(normalized_code, airport_or_None)`` per input, in input order.
+    """
 
-    return None
+    table = get_airport_table()
+    index = table.code_index
+    out: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+    for code in codes:
+        code_u = _normalize_airport_code(code)
+        row = index.get(code_u) if code_u else None
+        out.append((code_u, table.row(row) if row is not None else None))
+    return out
 
 
-def _extract_lat_lon(airport: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
-    if "geometry" in airport and isinstance(airport["geometry"], dict):
-        coords = airport["geometry"].get("coordinates")
-        if isinstance(coords, list) and len(coords) == 2:
-            lon, lat = coords
-            return _to_float(lat), _to_float(lon)
+def search_airports(query: str, *, limit: int = 20) -> List[Dict[str, Any]]:
+    return search_airports_advanced(query=query, limit=limit)
 
-    return _to_float(airport.get("lat") or airport.get("latitude")), _to_float(
-        airport.get("lon") or airport.get("longitude")
-    )
 
+def _substring_score(table: AirportTable, i: int, q: str) -> Optional[float]:
+    icao_code = table.icao[i]
+    iata_code = table.iata[i]
+    code_hay = table.code_text[i]
+
+    if q in code_hay.split():
+        return 1.0
+    if icao_code.lower().startswith(q):
+        return 0.95
+    if iata_code.lower().startswith(q):
+        return 0.9
+    if q in code_hay:
+        return 0.85
+    if q in table.search_text[i]:
+        return 0.65
+    return None
 
-def _to_float(v: Any) -> Optional[float]:
-    if v is None:
-        return None
-    try:
-        return float(v)
-    except Exception:
+
+def _fuzzy_score(table: AirportTable, i: int, q: str) -> Optional[float]:
+    ratio = 0.0
+    for field in (table.icao[i], table.iata[i], table.name[i] or ""):
+        matcher = difflib.SequenceMatcher(None, q, field.lower())
+        # Both quick ratios are upper bounds on ratio(), so skipping on them is exact.
+        if matcher.real_quick_ratio() < FUZZY_MIN_RATIO or matcher.quick_ratio() < FUZZY_MIN_RATIO:
+            continue
+        ratio = max(ratio, matcher.ratio())
+    if ratio < FUZZY_MIN_RATIO:
         return None
+    return 0.5 + (ratio - FUZZY_MIN_RATIO) * 0.5
 
 
-def search_airports(query: str, *, limit: int = 20) -> List[Dict[str, Any]]:
-    return search_airports_advanced(query=query, limit=limit)
+def _fuzzy_ratio_bound(table: AirportTable, rows: np.ndarray, q: str) -> np.ndarray:
+    """Best `SequenceMatcher.quick_ratio` over each row's fields, an upper bound on its ratio.
+
+    Computed from the table's character histograms, so it costs no matcher per row.
+    """
+    lengths, chars = (a[rows] for a in table.fuzzy_fields)
+    q_chars = np.bincount(char_bins(q), minlength=chars.shape[2])
+    shared = np.minimum(chars, q_chars).sum(axis=2)
+    return (2.0 * shared / (lengths + len(q))).max(axis=1, initial=0.0)
 
 
-def _haversine_nm(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    r_nm = 3440.065
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return r_nm * c
+def _text_score(table: AirportTable, i: int, q: str) -> Optional[float]:
+    score = _substring_score(table, i, q)
+    return score if score is not None else _fuzzy_score(table, i, q)
+
+
+def _take_nearest(rows: np.ndarray, need: int, dists: Optional[np.ndarray]) -> List[int]:
+    """Return up to ``need`` of ``rows`` ordered by (distance, row) without a full sort."""
+    if need <= 0 or not len(rows):
+        return []
+    if dists is None:
+        if len(rows) > need:
+            rows = np.partition(rows, need - 1)[:need]
+        return np.sort(rows).tolist()
+    order = np.lexsort((rows, dists[rows]))
+    return rows[order[:need]].tolist()
+
+
+def _rank_text(
+    table: AirportTable, q: str, limit: int, dists: Optional[np.ndarray]
+) -> List[Tuple[float, int]]:
+    """Return the best ``limit`` (score, row) pairs for ``q``, best first.
+
+    The code tiers (exact code, ICAO prefix, IATA prefix, code substring) are disjoint
+    ranges of sorted code arrays, so they are filled in order and the search stops once
+    ``limit`` rows are ranked. Only then are name/city matches and fuzzy matches considered.
+    Within a tier rows are ordered by distance (when given) and row order, which matches a
+    stable sort over a full scan.
+    """
+
+    first = table.first_key
+    ranked: List[Tuple[float, int]] = []
+    taken: List[int] = []
+
+    code_tiers: List[Tuple[float, Callable[[], np.ndarray]]] = [
+        (1.0, lambda: table.code_keys.exact(q)),
+        (0.95, lambda: table.icao_keys.prefix(q)),
+        (0.9, lambda: table.iata_keys.prefix(q)),
+    ]
+    if " " not in q:
+        # Codes never contain spaces, so "q in code haystack" is "q in one of the codes".
+        code_tiers.append((0.85, lambda: table.code_suffix_keys.prefix(q)))
+
+    for score, tier_rows in code_tiers:
+        need = limit - len(ranked)
+        if need <= 0:
+            return ranked
+        rows = np.unique(tier_rows())
+        rows = rows[first[rows]]
+        if taken:
+            rows = rows[~np.isin(rows, taken)]
+        picked = _take_nearest(rows, need, dists)
+        ranked.extend((score, r) for r in picked)
+        taken.extend(picked)
+
+    need = limit - len(ranked)
+    if need <= 0:
+        return ranked
+
+    # Spaces can only match across codes inside the haystack, so score those exactly.
+    exact = " " in q
+    early_exit = dists is None and not exact
+
+    candidates = table.text_index.containing_all(trigrams(q))
+    rows = np.arange(len(table)) if candidates is None else candidates
+    rows = rows[first[rows]]
+    if taken:
+        rows = rows[~np.isin(rows, taken)]
+
+    scored: List[Tuple[float, int]] = []
+    for r in rows.tolist():
+        if exact:
+            score = _substring_score(table, r, q)
+        else:
+            score = 0.65 if q in table.search_text[r] else None
+        if score is None:
+            continue
+        scored.append((score, r))
+        if early_exit and len(scored) >= need:
+            break
+
+    taken_set = set(taken)
+    if candidates is not None:
+        # Score rows sharing enough grams in order of their best possible ratio, and stop once
+        # that can no longer enter the top ``need``; long rows that merely share many grams
+        # no longer crowd out short, close names.
+        q_grams = padded_trigrams(q)
+        fuzzy_rows = table.text_index.shared_counts(q_grams, min_shared=max(1, len(q_grams) // 3))
+        fuzzy_rows = fuzzy_rows[first[fuzzy_rows]]
+        bound = _fuzzy_ratio_bound(table, fuzzy_rows, q)
+        order = np.argsort(-bound, kind="stable")
+        order = order[bound[order] >= FUZZY_MIN_RATIO][:FUZZY_CANDIDATE_LIMIT]
+        fuzzy_rows, bound = fuzzy_rows[order], bound[order]
+        top = heapq.nlargest(need, (s for s, _ in scored))
+        heapq.heapify(top)
+        for r, b in zip(fuzzy_rows.tolist(), bound.tolist()):
+            if len(top) >= need and 0.5 + (b - FUZZY_MIN_RATIO) * 0.5 < top[0]:
+                break
+            if r in taken_set or q in table.search_text[r]:
+                continue
+            score = _fuzzy_score(table, r, q)
+            if score is None:
+                continue
+            scored.append((score, r))
+            if len(top) < need:
+                heapq.heappush(top, score)
+            elif score > top[0]:
+                heapq.heapreplace(top, score)
+    elif len(scored) < need:
+        # Sub-trigram queries only reach fuzzy scoring when substring matches run out; their
+        # fuzzy scores are always below the 0.65 substring tier.
+        for r in rows.tolist():
+            if r in taken_set or q in table.search_text[r]:
+                continue
+            score = _fuzzy_score(table, r, q)
+            if score is not None:
+                scored.append((score, r))
+
+    def _key(t: Tuple[float, int]) -> Tuple[float, float, int]:
+        return (-t[0], float(dists[t[1]]) if dists is not None else 0.0, t[1])
+
+    ranked.extend(heapq.nsmallest(need, scored, key=_key))
+    return ranked
 
 
 def search_airports_advanced(
@@ -129,81 +287,119 @@ def search_airports_advanced(
     if not q and not has_geo:
         return []
 
-    candidates: List[Tuple[float, float, Dict[str, Any]]] = []
-    seen: set[str] = set()
+    table = get_airport_table()
 
-    for airport in load_airport_cache():
-        icao_code = (airport.get("icao") or airport.get("icaoCode") or "").upper()
-        iata_code = (airport.get("iata") or airport.get("iataCode") or "").upper()
-        alt_codes = _candidate_codes(icao_code)
-        name = str(airport.get("name") or "")
-        city = str(airport.get("city") or "")
-        country = str(airport.get("country") or "")
+    if has_geo and radius_nm is not None:
+        ranked = _rank_within_radius(table, q, limit, float(lat), float(lon), float(radius_nm))
+    else:
+        dists = table.distances_nm(float(lat), float(lon)) if has_geo else None
+        if q:
+            ranked = _rank_text(table, q, limit, dists)
+        else:
+            rows = np.flatnonzero(table.first_key)
+            ranked = [(0.0, r) for r in _take_nearest(rows, limit, dists)]
+        ranked = [(score, r, float(dists[r]) if dists is not None else None) for score, r in ranked]
+
+    out: List[Dict[str, Any]] = []
+    for _score, r, dist_nm in ranked:
+        normalized = table.row(r)
+        if dist_nm is not None:
+            normalized["distance_nm"] = round(dist_nm, 2)
+        out.append(normalized)
+    return out
 
-        lat_v, lon_v = _extract_lat_lon(airport)
-        if lat_v is None or lon_v is None:
-            continue
 
-        dist_nm: float | None = None
-        if has_geo:
-            dist_nm = _haversine_nm(float(lat), float(lon), float(lat_v), float(lon_v))
-            if radius_nm is not None and dist_nm > float(radius_nm):
-                continue
+def _rank_within_radius(
+    table: AirportTable, q: str, limit: int, lat: float, lon: float, radius_nm: float
+) -> List[Tuple[float, int, Optional[float]]]:
+    hit_rows, hit_dists = table.query_radius(lat, lon, radius_nm)
+
+    candidates: List[Tuple[float, int, Optional[float]]] = []
+    seen: set[str] = set()
 
-        normalized = {
-            "icao": icao_code,
-            "iata": iata_code,
-            "name": airport.get("name"),
-            "city": airport.get("city") or "",
-            "country": airport.get("country") or "",
-            "latitude": float(lat_v),
-            "longitude": float(lon_v),
-            "elevation": airport.get("elevation"),
-            "type": airport.get("type") or "",
-        }
-
-        key = (
-            normalized["icao"]
-            or normalized["iata"]
-            or f"{normalized['latitude']},{normalized['longitude']}"
-        )
+    for i, dist_nm in zip(hit_rows.tolist(), hit_dists.tolist()):
+        key = table.icao[i] or table.iata[i] or f"{float(table.lat[i])},{float(table.lon[i])}"
         if key in seen:
             continue
         seen.add(key)
 
         score = 0.0
         if q:
-            code_hay = " ".join(sorted({icao_code, iata_code, *alt_codes})).lower()
-            text_hay = f"{code_hay} {name} {city} {country}".lower()
-
-            if q in {c.lower() for c in {icao_code, iata_code, *alt_codes} if c}:
-                score = 1.0
-            elif icao_code.lower().startswith(q):
-                score = 0.95
-            elif iata_code.lower().startswith(q):
-                score = 0.9
-            elif q in code_hay:
-                score = 0.85
-            elif q in text_hay:
-                score = 0.65
-            else:
-                ratio = max(
-                    difflib.SequenceMatcher(None, q, icao_code.lower()).ratio(),
-                    difflib.SequenceMatcher(None, q, iata_code.lower()).ratio(),
-                    difflib.SequenceMatcher(None, q, name.lower()).ratio(),
-                )
-                if ratio < 0.6:
-                    continue
-                score = 0.5 + (ratio - 0.6) * 0.5
+            text_score = _text_score(table, i, q)
+            if text_score is None:
+                continue
+            score = text_score
 
-        if dist_nm is not None:
-            normalized["distance_nm"] = round(dist_nm, 2)
+        candidates.append((score, i, dist_nm))
 
-        candidates.append((score, dist_nm if dist_nm is not None else float("inf"), normalized))
+    if not q:
+        return heapq.nsmallest(limit, candidates, key=lambda t: t[2])
+    return heapq.nsmallest(limit, candidates, key=lambda t: (-t[0], t[2]))
 
-    if has_geo and not q:
-        candidates.sort(key=lambda t: t[1])
-    else:
-        candidates.sort(key=lambda t: (-t[0], t[1]))
 
-    return [item[2] for item in candidates[:limit]]
+def _mercator_y_deg(lat: np.ndarray) -> np.ndarray:
+    phi = np.radians(np.clip(lat, -85.05113, 85.05113))
+    return np.degrees(np.log(np.tan(np.pi / 4 + phi / 2)))
+
+
+def airports_in_bbox(
+    *,
+    west: float,
+    south: float,
+    east: float,
+    north: float,
+    zoom: int,
+    max_points: int = BBOX_MAX_POINTS,
+) -> Dict[str, Any]:
+    """Return airports inside a map viewport, decimated for the zoom level.
+
+    Below `BBOX_FULL_DETAIL_ZOOM` airports are grouped into square screen-space cells and each
+    cell is represented by its most important airport (large before medium before small, with
+    heliports and closed fields last); ``cluster_count`` tells how many airports it stands for.
+    The response never holds more than ``max_points`` airports: when it would, the most
+    important representatives win.
+    """
+
+    table = get_airport_table()
+    rows = table.query_bbox(west, south, east, north)
+    rows = rows[table.first_key[rows]]
+    total = int(len(rows))
+    rank = table.type_rank[rows]
+
+    if zoom >= BBOX_FULL_DETAIL_ZOOM or total <= 1:
+        reps, counts, rep_rank = rows, np.ones(total, dtype=np.int64), rank
+    else:
+        cell = 360.0 / (256.0 * 2.0**zoom) * BBOX_CLUSTER_CELL_PX
+        cx = np.floor((table.lon[rows] + 180.0) / cell).astype(np.int64)
+        cy = np.floor((_mercator_y_deg(table.lat[rows]) + 180.0) / cell).astype(np.int64)
+        key = cy * (int(360.0 / cell) + 2) + cx
+
+        order = np.lexsort((rows, rank, key))
+        sorted_key = key[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sorted_key[1:] != sorted_key[:-1]
+        starts = np.flatnonzero(first)
+        reps = rows[order][starts]
+        rep_rank = rank[order][starts]
+        counts = np.diff(np.append(starts, len(order)))
+
+    truncated = len(reps) > max_points
+    if truncated:
+        keep = np.lexsort((reps, -counts, rep_rank))[:max_points]
+        reps, counts = reps[keep], counts[keep]
+    by_row = np.argsort(reps, kind="stable")
+    reps, counts = reps[by_row], counts[by_row]
+
+    airports: List[Dict[str, Any]] = []
+    for r, n in zip(reps.tolist(), counts.tolist()):
+        airport = table.row(r)
+        airport["cluster_count"] = n
+        airports.append(airport)
+
+    return {
+        "zoom": zoom,
+        "total": total,
+        "clustered": bool(len(counts) and counts.max() > 1),
+        "truncated": truncated,
+        "airports": airports,
+    }
@@ -0,0 +1,399 @@
+from __future__ import annotations
+
+import math
+import sys
+from functools import cached_property
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.snapshot import Snapshot
+from app.utils.spatial_index import GridIndex, SphericalIndex
+from app.utils.text_index import FIELD_SEPARATOR, PrefixIndex, TrigramIndex
+
+
+EARTH_RADIUS_NM = 3440.065
+
+# Characters with their own histogram bin in `AirportTable.fuzzy_field_chars`.
+CHAR_BINS = "abcdefghijklmnopqrstuvwxyz0123456789 "
+_ASCII_BIN = np.full(128, len(CHAR_BINS), dtype=np.int64)
+_ASCII_BIN[[ord(c) for c in CHAR_BINS]] = np.arange(len(CHAR_BINS))
+
+
+def char_bins(text: str) -> np.ndarray:
+    """Histogram bin of each character of ``text``; unlisted characters share the last bin."""
+    cps = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    return _ASCII_BIN[np.minimum(cps, 127)].astype(np.int64)
+
+
+# Display priority by OurAirports type (lower is more important); unknown types rank with
+# seaplane bases, ahead of heliports and closed fields.
+TYPE_PRIORITY = {
+    "large_airport": 0,
+    "medium_airport": 1,
+    "small_airport": 2,
+    "seaplane_base": 3,
+    "balloonport": 4,
+    "heliport": 5,
+    "closed": 6,
+}
+_DEFAULT_TYPE_PRIORITY = 3
+
+
+def _to_float(v: Any) -> Optional[float]:
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except Exception:
+        return None
+
+
+def extract_lat_lon(airport: Mapping[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    if "geometry" in airport and isinstance(airport["geometry"], dict):
+        coords = airport["geometry"].get("coordinates")
+        if isinstance(coords, list) and len(coords) == 2:
+            lon, lat = coords
+            return _to_float(lat), _to_float(lon)
+
+    return _to_float(airport.get("lat") or airport.get("latitude")), _to_float(
+        airport.get("lon") or airport.get("longitude")
+    )
+
+
+def candidate_codes(code_u: str) -> set[str]:
+    codes = {code_u}
+
+    # Our airport cache stores many US local identifiers as pseudo-ICAO codes prefixed with 'K'
+    # (e.g., 7S5 -> K7S5). Allow lookups by the FAA/local code.
+    if (
+        code_u
+        and not code_u.startswith("K")
+        and (len(code_u) == 3 or (3 <= len(code_u) <= 4 and any(ch.isdigit() for ch in code_u)))
+    ):
+        codes.add(f"K{code_u}")
+
+    if code_u.startswith("K") and 4 <= len(code_u) <= 5:
+        codes.add(code_u[1:])
+
+    return codes
+
+
+def code_aliases(code_u: str) -> set[str]:
+    """Return every lookup code that `candidate_codes` expands to include ``code_u``.
+
+    This is the inverse of `candidate_codes`: indexing a record under these keys makes a
+    single dict hit equivalent to matching the candidate set against every record.
+    """
+
+    keys = {code_u}
+
+    local = code_u[1:]
+    if (
+        code_u.startswith("K")
+        and local
+        and not local.startswith("K")
+        and (len(local) == 3 or (len(local) == 4 and any(ch.isdigit() for ch in local)))
+    ):
+        keys.add(local)
+
+    if len(code_u) in (3, 4):
+        keys.add(f"K{code_u}")
+
+    return keys
+
+
+def _readonly(values: Iterable[float], *, dtype: Any = np.float64) -> np.ndarray:
+    arr = np.fromiter(values, dtype=dtype)
+    arr.setflags(write=False)
+    return arr
+
+
+class AirportTable(Sequence[Dict[str, Any]]):
+    """Read-only columnar airport store.
+
+    One instance is built per data version and shared by every request. Numeric columns are
+    NumPy arrays so geo queries can run vectorized; string columns hold interned strings.
+    Indexing or iterating yields the normalized airport dicts the API returns, so the table
+    is a drop-in replacement for the old list of raw records.
+    """
+
+    def __init__(
+        self,
+        *,
+        icao: Sequence[str],
+        iata: Sequence[str],
+        name: Sequence[Optional[str]],
+        city: Sequence[str],
+        country: Sequence[str],
+        type: Sequence[str],
+        lat: np.ndarray,
+        lon: np.ndarray,
+        elevation: np.ndarray,
+    ) -> None:
+        self.icao = icao
+        self.iata = iata
+        self.name = name
+        self.city = city
+        self.country = country
+        self.type = type
+        self.lat = lat
+        self.lon = lon
+        self.elevation = elevation
+
+    @classmethod
+    def from_records(cls, airports: Iterable[Mapping[str, Any]]) -> "AirportTable":
+        icao: List[str] = []
+        iata: List[str] = []
+        name: List[Optional[str]] = []
+        city: List[str] = []
+        country: List[str] = []
+        types: List[str] = []
+        lat: List[float] = []
+        lon: List[float] = []
+        elevation: List[float] = []
+
+        for airport in airports:
+            lat_v, lon_v = extract_lat_lon(airport)
+            if lat_v is None or lon_v is None:
+                continue
+
+            name_v = airport.get("name")
+            elev_v = _to_float(airport.get("elevation"))
+
+            icao.append(
+                sys.intern(
+                    str(airport.get("icao") or airport.get("icaoCode") or "").strip().upper()
+                )
+            )
+            iata.append(
+                sys.intern(
+                    str(airport.get("iata") or airport.get("iataCode") or "").strip().upper()
+                )
+            )
+            name.append(sys.intern(str(name_v)) if name_v else None)
+            city.append(sys.intern(str(airport.get("city") or "")))
+            country.append(sys.intern(str(airport.get("country") or "")))
+            types.append(sys.intern(str(airport.get("type") or "")))
+            lat.append(lat_v)
+            lon.append(lon_v)
+            elevation.append(elev_v if elev_v is not None else math.nan)
+
+        return cls(
+            icao=tuple(icao),
+            iata=tuple(iata),
+            name=tuple(name),
+            city=tuple(city),
+            country=tuple(country),
+            type=tuple(types),
+            lat=_readonly(lat),
+            lon=_readonly(lon),
+            elevation=_readonly(elevation),
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> "AirportTable":
+        """Wrap the columns of an ``airports`` snapshot without copying or parsing them."""
+        return cls(
+            icao=snapshot.strings("icao"),
+            iata=snapshot.strings("iata"),
+            name=snapshot.strings("name"),
+            city=snapshot.strings("city"),
+            country=snapshot.strings("country"),
+            type=snapshot.strings("type"),
+            lat=snapshot.array("lat"),
+            lon=snapshot.array("lon"),
+            elevation=snapshot.array("elevation"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.icao)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self.row(j) for j in range(*i.indices(len(self)))]
+        return self.row(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        elev = float(self.elevation[i])
+        return {
+            "icao": self.icao[i],
+            "iata": self.iata[i],
+            "name": self.name[i],
+            "city": self.city[i],
+            "country": self.country[i],
+            "latitude": float(self.lat[i]),
+            "longitude": float(self.lon[i]),
+            "elevation": None if math.isnan(elev) else elev,
+            "type": self.type[i],
+        }
+
+    def code(self, i: int) -> str:
+        return self.icao[i] or self.iata[i]
+
+    @cached_property
+    def code_index(self) -> Mapping[str, int]:
+        """Map ICAO/IATA codes and their local-identifier aliases to the first matching row."""
+        index: Dict[str, int] = {}
+        for i, (icao, iata) in enumerate(zip(self.icao, self.iata)):
+            for code in (icao, iata):
+                if not code:
+                    continue
+                for key in code_aliases(code):
+                    index.setdefault(key, i)
+        return MappingProxyType(index)
+
+    @cached_property
+    def first_key(self) -> np.ndarray:
+        """Boolean mask of rows that are the first occurrence of their ICAO/IATA/position key."""
+        seen: set[str] = set()
+        mask = np.zeros(len(self), dtype=bool)
+        for i, (icao, iata) in enumerate(zip(self.icao, self.iata)):
+            key = icao or iata or f"{float(self.lat[i])},{float(self.lon[i])}"
+            if key not in seen:
+                seen.add(key)
+                mask[i] = True
+        mask.setflags(write=False)
+        return mask
+
+    @cached_property
+    def code_text(self) -> Tuple[str, ...]:
+        """Lowercased, space-joined ICAO/IATA/alias codes per row."""
+        return tuple(
+            " ".join(sorted({icao, iata, *candidate_codes(icao)})).lower()
+            for icao, iata in zip(self.icao, self.iata)
+        )
+
+    @cached_property
+    def search_text(self) -> Tuple[str, ...]:
+        """Lowercased "codes name city country" haystack per row, as used by text search."""
+        return tuple(
+            f"{codes} {name or ''} {city} {country}".lower()
+            for codes, name, city, country in zip(
+                self.code_text, self.name, self.city, self.country
+            )
+        )
+
+    @cached_property
+    def text_index(self) -> TrigramIndex:
+        """Trigram index over the search haystack plus padded codes and names."""
+        docs = []
+        for text, icao, iata, name in zip(self.search_text, self.icao, self.iata, self.name):
+            fields = [f"  {f.lower()} " for f in (icao, iata, name) if f]
+            docs.append(FIELD_SEPARATOR.join([text, *fields]))
+        return TrigramIndex(docs)
+
+    @cached_property
+    def fuzzy_fields(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Lengths ``(rows, 3)`` and character histograms ``(rows, 3, bins)`` of the lowercased
+        ICAO, IATA and name, the fields fuzzy search compares against.
+
+        Histogram bins follow `char_bins`; counts are uint8 (no airport field comes close).
+        """
+        fields = [
+            f.lower()
+            for icao, iata, name in zip(self.icao, self.iata, self.name)
+            for f in (icao, iata, name or "")
+        ]
+        lengths = np.fromiter((len(f) for f in fields), dtype=np.int64, count=len(fields))
+        n_bins = len(CHAR_BINS) + 1
+        owner = np.repeat(np.arange(len(fields), dtype=np.int64), lengths)
+        counts = np.bincount(
+            owner * n_bins + char_bins("".join(fields)), minlength=len(fields) * n_bins
+        )
+        chars = np.minimum(counts, 255).astype(np.uint8).reshape(len(self), 3, n_bins)
+        return lengths.astype(np.int32).reshape(len(self), 3), chars
+
+    @cached_property
+    def icao_keys(self) -> PrefixIndex:
+        return PrefixIndex((icao.lower(), i) for i, icao in enumerate(self.icao))
+
+    @cached_property
+    def iata_keys(self) -> PrefixIndex:
+        return PrefixIndex((iata.lower(), i) for i, iata in enumerate(self.iata))
+
+    @cached_property
+    def code_keys(self) -> PrefixIndex:
+        """ICAO, IATA and local-identifier alias codes (lowercased) of every row."""
+        return PrefixIndex(
+            (code, i) for i, codes in enumerate(self.code_text) for code in codes.split()
+        )
+
+    @cached_property
+    def code_suffix_keys(self) -> PrefixIndex:
+        """Every suffix of every code, so "substring of a code" becomes a prefix lookup."""
+        return PrefixIndex(
+            (code[j:], i)
+            for i, codes in enumerate(self.code_text)
+            for code in codes.split()
+            for j in range(len(code))
+        )
+
+    @cached_property
+    def spatial_index(self) -> SphericalIndex:
+        return SphericalIndex(self.lat, self.lon)
+
+    @cached_property
+    def grid_index(self) -> GridIndex:
+        return GridIndex(self.lat, self.lon)
+
+    @cached_property
+    def type_rank(self) -> np.ndarray:
+        """Per-row `TYPE_PRIORITY` rank (lower is more important)."""
+        return _readonly(
+            (TYPE_PRIORITY.get(t, _DEFAULT_TYPE_PRIORITY) for t in self.type), dtype=np.int8
+        )
+
+    def query_bbox(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        """Return rows inside the box, in row order; ``west > east`` crosses the antimeridian."""
+        return self.grid_index.query_bbox(west, south, east, north)
+
+    def query_radius(self, lat: float, lon: float, nm: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, distances_nm) for airports within ``nm`` of (lat, lon), in row order."""
+        return self.spatial_index.query_radius(lat, lon, nm)
+
+    def query_knn(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, distances_nm) for the ``k`` airports nearest (lat, lon)."""
+        return self.spatial_index.query_knn(lat, lon, k)
+
+    @cached_property
+    def _lat_rad(self) -> np.ndarray:
+        return np.radians(self.lat)
+
+    @cached_property
+    def _cos_lat(self) -> np.ndarray:
+        return np.cos(self._lat_rad)
+
+    def distances_nm(self, lat: float, lon: float, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Vectorized haversine distance from (lat, lon) to every row (or the given rows)."""
+        lat_rad = self._lat_rad if rows is None else self._lat_rad[rows]
+        cos_lat = self._cos_lat if rows is None else self._cos_lat[rows]
+        lon_v = self.lon if rows is None else self.lon[rows]
+
+        phi = math.radians(lat)
+        dphi = lat_rad - phi
+        dlambda = np.radians(lon_v - lon)
+        a = np.sin(dphi / 2) ** 2 + math.cos(phi) * cos_lat * np.sin(dlambda / 2) ** 2
+        return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def warm(self) -> "AirportTable":
+        """Build every lazily computed index so later requests only read them."""
+        _ = self.code_index
+        _ = self.first_key
+        _ = self.code_text
+        _ = self.text_index
+        _ = self.fuzzy_fields
+        _ = self.icao_keys
+        _ = self.iata_keys
+        _ = self.code_keys
+        _ = self.code_suffix_keys
+        _ = self.spatial_index
+        _ = self.grid_index
+        _ = self.type_rank
+        _ = self._cos_lat
+        return self
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.airspace_store import VERTICAL_LIMIT_KEYS, vertical_mask
+from app.utils.snapshot import Snapshot
+
+
+@dataclass(frozen=True)
+class ObstacleLayer:
+    """Airspace of one class, buffered by ``buffer_nm`` and merged, with its own STRtree.
+
+    Parts are merged per vertical band, so each part carries exact vertical limits (NaN
+    where unknown, or where the layers predate them).
+    """
+
+    buffer_nm: float
+    airspace_class: str
+    geometries: np.ndarray
+    tree: Any
+    vertical: Optional[Dict[str, np.ndarray]] = None
+
+    def altitude_mask(self, altitude_ft: Optional[float]) -> np.ndarray:
+        """Parts that may contain ``altitude_ft``; all of them when it or the limits are unknown."""
+        if altitude_ft is None or self.vertical is None:
+            return np.ones(len(self.geometries), dtype=bool)
+        return vertical_mask(altitude_ft, *(self.vertical[k] for k in VERTICAL_LIMIT_KEYS))
+
+
+class ObstacleLayers:
+    """Precomputed avoidance obstacles keyed by (buffer distance, airspace class)."""
+
+    def __init__(self, layers: Sequence[ObstacleLayer]) -> None:
+        self._layers: Dict[Tuple[float, str], ObstacleLayer] = {
+            (layer.buffer_nm, layer.airspace_class): layer for layer in layers
+        }
+
+    @property
+    def buffers_nm(self) -> List[float]:
+        return sorted({b for b, _ in self._layers})
+
+    def for_buffer(
+        self, buffer_nm: float, classes: Optional[Sequence[str]] = None
+    ) -> List[ObstacleLayer]:
+        """Layers built for exactly ``buffer_nm``, optionally limited to ``classes``."""
+        wanted = None if classes is None else {str(c) for c in classes}
+        return [
+            layer
+            for (b, c), layer in sorted(self._layers.items())
+            if b == float(buffer_nm) and (wanted is None or c in wanted)
+        ]
+
+    @classmethod
+    def from_snapshot(
+        cls, snapshot: Snapshot, source_sha256: Optional[str]
+    ) -> Optional["ObstacleLayers"]:
+        """Load layers built from the file hashing to ``source_sha256``; None for another file."""
+        import shapely
+
+        if source_sha256 is None or snapshot.meta.get("sha256") != source_sha256:
+            return None
+
+        geoms = shapely.from_wkb(np.array(list(snapshot.blobs("wkb")), dtype=object))
+        buffers = snapshot.array("buffer_nm")
+        classes = np.array([c or "" for c in snapshot.strings("class")], dtype=object)
+        vertical = (
+            {k: snapshot.array(k) for k in VERTICAL_LIMIT_KEYS}
+            if all(k in snapshot for k in VERTICAL_LIMIT_KEYS)
+            else None
+        )
+
+        layers: List[ObstacleLayer] = []
+        for buffer_nm in np.unique(buffers).tolist():
+            for airspace_class in sorted(set(classes[buffers == buffer_nm].tolist())):
+                rows = (buffers == buffer_nm) & (classes == airspace_class)
+                parts = geoms[rows]
+                shapely.prepare(parts)
+                layers.append(
+                    ObstacleLayer(
+                        buffer_nm=float(buffer_nm),
+                        airspace_class=airspace_class,
+                        geometries=parts,
+                        tree=shapely.STRtree(parts),
+                        vertical=(
+                            None
+                            if vertical is None
+                            else {k: v[rows] for k, v in vertical.items()}
+                        ),
+                    )
+                )
+        return cls(layers)
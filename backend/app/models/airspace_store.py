@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import json
+import math
+import threading
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.utils.data_loader import load_airspace, load_airspace_snapshot, load_snapshot, read_json
+from app.utils.data_versions import DataVersion, current_data, register_index
+from app.utils.snapshot import Snapshot
+from app.utils.vector_tiles import WEB_MERCATOR_RADIUS_M, to_web_mercator
+
+# Simplification tiers written by the data build (meters); see `column_for_zoom`.
+SIMPLIFY_TOLERANCES_M = (50, 250, 1000)
+
+# Vertical limit reference datums (OpenAIP `referenceDatum`), as stored in the caches.
+REF_GND, REF_MSL, REF_STD = 0, 1, 2
+VERTICAL_LIMIT_KEYS = ("lower_ft", "lower_ref", "upper_ft", "upper_ref")
+# Pruning keeps airspace within this many feet of the cruise altitude.
+VERTICAL_MARGIN_FT = 250.0
+# Flight levels are pressure altitudes; they may sit this far from the same MSL altitude.
+STD_ALLOWANCE_FT = 1000.0
+# An AGL ceiling is only known to be overflown once above it plus the highest terrain under
+# the bundled data (Mont Blanc, 15,774 ft).
+MAX_GROUND_FT = 15_800.0
+
+
+def vertical_mask(
+    altitude_ft: float,
+    lower_ft: np.ndarray,
+    lower_ref: np.ndarray,
+    upper_ft: np.ndarray,
+    upper_ref: np.ndarray,
+) -> np.ndarray:
+    """True where airspace may contain ``altitude_ft`` (MSL); unknown limits always may.
+
+    A floor of N ft AGL is at least N ft MSL, so it compares like an MSL floor; an AGL
+    ceiling gets `MAX_GROUND_FT` on top and flight levels `STD_ALLOWANCE_FT` either way.
+    """
+    floor = lower_ft - np.where(lower_ref == REF_STD, STD_ALLOWANCE_FT, 0.0)
+    ceiling = upper_ft + np.select(
+        [upper_ref == REF_STD, upper_ref == REF_GND], [STD_ALLOWANCE_FT, MAX_GROUND_FT], 0.0
+    )
+    # NaN (unknown) limits compare False, so they never prune.
+    below = float(altitude_ft) + VERTICAL_MARGIN_FT < floor
+    above = float(altitude_ft) - VERTICAL_MARGIN_FT > ceiling
+    return ~(below | above)
+
+
+def _vertical_columns(rows: Sequence[Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+    """Vertical limit columns from per-airspace ``lower_ft``/``lower_ref``/... values."""
+    out: Dict[str, np.ndarray] = {}
+    for side in ("lower", "upper"):
+        ft = np.full(len(rows), np.nan)
+        ref = np.full(len(rows), -1, dtype=np.int8)
+        for i, row in enumerate(rows):
+            value, datum = row.get(f"{side}_ft"), row.get(f"{side}_ref")
+            if isinstance(value, (int, float)) and datum in (REF_GND, REF_MSL, REF_STD):
+                ft[i], ref[i] = float(value), datum
+        out[f"{side}_ft"], out[f"{side}_ref"] = ft, ref
+    return out
+
+
+class AirspaceStore:
+    """Airspace geometries for one data version, shared by route planning and the map API.
+
+    Holds lon/lat shapely geometries with their properties, bounding boxes and an STRtree.
+    Simplified tiers are decoded and projected variants computed lazily, per geometry, so
+    neither costs anything until a request needs it.
+    """
+
+    def __init__(
+        self,
+        geometries: np.ndarray,
+        properties: Sequence[Mapping[str, Any]],
+        *,
+        tiers: Optional[Mapping[str, Callable[[], np.ndarray]]] = None,
+        vertical: Optional[Mapping[str, np.ndarray]] = None,
+        source: Optional[Path] = None,
+    ) -> None:
+        self.geometries = np.asarray(geometries, dtype=object)
+        self.properties: List[Mapping[str, Any]] = list(properties)
+        self.source = source
+        columns = vertical if vertical is not None else _vertical_columns(self.properties)
+        self.lower_ft = np.asarray(columns["lower_ft"], dtype=float)
+        self.lower_ref = np.asarray(columns["lower_ref"])
+        self.upper_ft = np.asarray(columns["upper_ft"], dtype=float)
+        self.upper_ref = np.asarray(columns["upper_ref"])
+        self._tier_loaders = dict(tiers or {})
+        self._tiers: Dict[str, np.ndarray] = {}
+        self._projected: Dict[str, np.ndarray] = {}
+        self._features: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.geometries) == 0
+
+    @cached_property
+    def bounds(self) -> np.ndarray:
+        import shapely
+
+        return shapely.bounds(self.geometries)
+
+    @cached_property
+    def tree(self):
+        import shapely
+
+        return shapely.STRtree(self.geometries)
+
+    def tier(self, name: str) -> np.ndarray:
+        """Geometries of a prebuilt tier (``wkb_50m``, ``wkb_avoid`` ...), or the full ones."""
+        if name not in self._tier_loaders:
+            return self.geometries
+        with self._lock:
+            if name not in self._tiers:
+                self._tiers[name] = self._tier_loaders[name]()
+            return self._tiers[name]
+
+    @cached_property
+    def avoidance_geometries(self) -> np.ndarray:
+        """Conservative geometries for route avoidance: each covers its original outline."""
+        return self.tier("wkb_avoid")
+
+    @cached_property
+    def avoidance_tree(self):
+        import shapely
+
+        if self.avoidance_geometries is self.geometries:
+            return self.tree
+        return shapely.STRtree(self.avoidance_geometries)
+
+    def altitude_mask(self, altitude_ft: Optional[float]) -> np.ndarray:
+        """Airspaces that may contain ``altitude_ft``; all of them when it is None."""
+        if altitude_ft is None:
+            return np.ones(len(self), dtype=bool)
+        return vertical_mask(
+            altitude_ft, self.lower_ft, self.lower_ref, self.upper_ft, self.upper_ref
+        )
+
+    def column_for_zoom(self, zoom: Optional[int]) -> str:
+        """Coarsest prebuilt tier whose tolerance stays under a web-mercator pixel at ``zoom``."""
+        if zoom is None:
+            return "wkb"
+        meters_per_pixel = 2.0 * math.pi * WEB_MERCATOR_RADIUS_M / 256.0 / (2**zoom)
+        for tolerance_m in sorted(SIMPLIFY_TOLERANCES_M, reverse=True):
+            column = f"wkb_{tolerance_m}m"
+            if tolerance_m <= meters_per_pixel and column in self._tier_loaders:
+                return column
+        return "wkb"
+
+    def web_mercator(self, indices: np.ndarray, column: str = "wkb") -> np.ndarray:
+        """EPSG:3857 geometries for ``indices`` of ``column``, projected once on first use."""
+        import shapely
+
+        indices = np.asarray(indices, dtype=np.intp)
+        with self._lock:
+            cache = self._projected.get(column)
+            if cache is None:
+                cache = self._projected[column] = np.full(len(self), None, dtype=object)
+        missing = indices[shapely.is_missing(cache[indices])]
+        if missing.size:
+            source = self.tier(column) if column != "wkb" else self.geometries
+            cache[missing] = to_web_mercator(source[missing])
+        return cache[indices]
+
+    def geojson_features(self, indices: np.ndarray, column: str = "wkb") -> List[bytes]:
+        """Serialized GeoJSON ``Feature`` objects for ``indices`` of ``column``, built once each.
+
+        Features without a geometry in ``column`` are left out.
+        """
+        import shapely
+
+        indices = np.asarray(indices, dtype=np.intp)
+        with self._lock:
+            cache = self._features.get(column)
+            if cache is None:
+                cache = self._features[column] = np.full(len(self), None, dtype=object)
+        missing = indices[[cache[i] is None for i in indices.tolist()]]
+        if missing.size:
+            geometries = shapely.to_geojson(self.tier(column)[missing])
+            for i, geometry in zip(missing.tolist(), geometries.tolist()):
+                props = self.properties[i]
+                cache[i] = (
+                    b""
+                    if geometry is None
+                    else (
+                        '{"type":"Feature","geometry":%s,"properties":%s}'
+                        % (
+                            geometry,
+                            json.dumps(
+                                props if isinstance(props, dict) else {}, separators=(",", ":")
+                            ),
+                        )
+                    ).encode("utf-8")
+                )
+        return [f for f in cache[indices].tolist() if f]
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot, *, source: Optional[Path] = None) -> "AirspaceStore":
+        import shapely
+
+        def loader(column: str) -> Callable[[], np.ndarray]:
+            return lambda: shapely.from_wkb(np.array(list(snapshot.blobs(column)), dtype=object))
+
+        tiers = {
+            column: loader(column)
+            for column in [f"wkb_{t}m" for t in SIMPLIFY_TOLERANCES_M] + ["wkb_avoid"]
+            if column in snapshot
+        }
+        properties = [json.loads(p or "{}") for p in snapshot.strings("properties")]
+        vertical = (
+            {k: snapshot.array(k) for k in VERTICAL_LIMIT_KEYS}
+            if all(k in snapshot for k in VERTICAL_LIMIT_KEYS)
+            else None
+        )
+        return cls(loader("wkb")(), properties, tiers=tiers, vertical=vertical, source=source)
+
+    @classmethod
+    def from_features(
+        cls, features: Sequence[Any], *, source: Optional[Path] = None
+    ) -> "AirspaceStore":
+        """Build from GeoJSON features; features without a parseable geometry are skipped."""
+        from shapely.geometry import shape
+
+        geoms: List[Any] = []
+        props: List[Mapping[str, Any]] = []
+        for feat in features:
+            if not isinstance(feat, dict) or not feat.get("geometry"):
+                continue
+            try:
+                geoms.append(shape(feat["geometry"]))
+            except Exception:
+                continue
+            p = feat.get("properties")
+            props.append(p if isinstance(p, dict) else {})
+        return cls(np.array(geoms, dtype=object), props, source=source)
+
+
+def airspace_store() -> AirspaceStore:
+    return current_data().index("airspace_store")
+
+
+def _build_airspace_store(version: DataVersion) -> AirspaceStore:
+    """Load the map airspace cache (a superset of the US list), else the US list itself.
+
+    The returned store has ``source=None`` when neither file exists.
+    """
+    map_path = version.files["airspace"]
+    snapshot = load_airspace_snapshot(map_path)
+    if snapshot is not None:
+        return AirspaceStore.from_snapshot(snapshot, source=map_path)
+    if map_path.exists():
+        features = load_airspace(map_path).get("features")
+        return AirspaceStore.from_features(
+            features if isinstance(features, list) else [], source=map_path
+        )
+
+    us_path = version.files["airspaces_us"]
+    snapshot = load_snapshot(us_path, kind="airspaces")
+    if snapshot is not None:
+        return AirspaceStore.from_snapshot(snapshot, source=us_path)
+    if us_path.exists():
+        raw = read_json(us_path)
+        return AirspaceStore.from_features(
+            [
+                {
+                    "geometry": asp.get("geometry"),
+                    "properties": {
+                        "id": asp.get("id"),
+                        "name": asp.get("name"),
+                        "icaoClass": asp.get("category"),
+                        "type": asp.get("type"),
+                        **{k: asp.get(k) for k in VERTICAL_LIMIT_KEYS},
+                    },
+                }
+                for asp in (raw if isinstance(raw, list) else [])
+                if isinstance(asp, dict)
+            ],
+            source=us_path,
+        )
+
+    return AirspaceStore(np.empty(0, dtype=object), [])
+
+
+register_index("airspace_store", _build_airspace_store)
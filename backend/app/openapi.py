@@ -34,6 +34,10 @@ OPENAPI_TAGS = [
         "name": "airspace",
         "description": "Airspace endpoints (currently not implemented).",
     },
+    {
+        "name": "tiles",
+        "description": "Mapbox Vector Tiles for the airspace and airport map layers.",
+    },
 ]
 
 
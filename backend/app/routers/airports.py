@@ -2,7 +2,19 @@ from __future__ import annotations
 
 from fastapi import APIRouter, HTTPException, Query
 
-from app.models.airport import get_airport_coordinates, search_airports_advanced
+from app.models.airport import (
+    BBOX_MAX_POINTS,
+    airports_in_bbox,
+    get_airport_coordinates,
+    resolve_airport_codes,
+    search_airports_advanced,
+)
+from app.schemas.airport import (
+    AirportBatchItem,
+    AirportBatchRequest,
+    AirportBatchResponse,
+    AirportBboxResponse,
+)
 
 
 router = APIRouter()
@@ -26,6 +38,54 @@ def airports_search(
     return search_airports_advanced(query=q, limit=limit, lat=lat, lon=lon, radius_nm=radius_nm)
 
 
+@router.get(
+    "/airports/bbox",
+    response_model=AirportBboxResponse,
+    summary="Airports in a map viewport",
+    description=(
+        "Return airports inside a bounding box, clustered/decimated by zoom level with larger "
+        "airports prioritized. west > east crosses the antimeridian."
+    ),
+)
+def airports_bbox(
+    west: float = Query(..., ge=-180, le=180),
+    south: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    zoom: int = Query(..., ge=0, le=22),
+    max_points: int = Query(BBOX_MAX_POINTS, ge=1, le=2000),
+) -> dict:
+    """Return viewport airports decimated for the map zoom level."""
+    if south > north:
+        raise HTTPException(status_code=400, detail="south must be <= north")
+    return airports_in_bbox(
+        west=west, south=south, east=east, north=north, zoom=zoom, max_points=max_points
+    )
+
+
+@router.post(
+    "/airports/batch",
+    response_model=AirportBatchResponse,
+    summary="Resolve airports in batch",
+    description="Look up many ICAO/IATA codes in one request; unknown codes are reported per item.",
+)
+def airports_batch(req: AirportBatchRequest) -> AirportBatchResponse:
+    """Resolve a list of airport codes in one request."""
+    results: list[AirportBatchItem] = []
+    unknown: list[str] = []
+    for query, (code, airport) in zip(req.codes, resolve_airport_codes(req.codes)):
+        if airport is None:
+            unknown.append(query)
+            results.append(
+                AirportBatchItem(
+                    query=query, code=code, found=False, error=f"Airport {query} not found"
+                )
+            )
+        else:
+            results.append(AirportBatchItem(query=query, code=code, found=True, airport=airport))
+    return AirportBatchResponse(results=results, unknown=unknown)
+
+
 @router.get(
     "/airports/{code}",
     summary="Get airport by code",
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-from functools import lru_cache
+import math
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
-
-from app.utils.data_loader import load_airspace
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Response
 
+from app.models.airspace_store import airspace_store
+from app.schemas.airspace import AirspaceAlongRouteRequest, AirspaceAlongRouteResponse
+from app.services.airspace_crossings import airspace_crossings
+from app.services.xctry_route_planner import haversine_nm
+from app.utils.vector_tiles import to_web_mercator
 
 router = APIRouter()
 
@@ -13,92 +18,76 @@ router = APIRouter()
 @router.get("/airspace")
 def airspace_status() -> dict:
     """Airspace support status."""
-    data = load_airspace()
-    features = data.get("features") if isinstance(data, dict) else None
     return {
         "enabled": True,
-        "feature_count": len(features) if isinstance(features, list) else 0,
+        "feature_count": len(airspace_store()),
     }
 
 
-@lru_cache(maxsize=1)
-def _airspace_gdfs():
-    import geopandas as gpd
-    from shapely.geometry import shape
-
-    raw = load_airspace()
-    features = raw.get("features") if isinstance(raw, dict) else None
-    if not isinstance(features, list) or not features:
-        empty = gpd.GeoDataFrame({"properties": []}, geometry=[], crs="EPSG:4326")
-        return empty, empty
-
-    rows: list[dict] = []
-    geoms = []
-    for feat in features:
-        if not isinstance(feat, dict):
-            continue
-        geom = feat.get("geometry")
-        if not geom:
-            continue
-        try:
-            geoms.append(shape(geom))
-        except Exception:
-            continue
-        props = feat.get("properties") if isinstance(feat.get("properties"), dict) else {}
-        rows.append({"properties": props})
-
-    gdf4326 = gpd.GeoDataFrame(rows, geometry=geoms, crs="EPSG:4326")
-    if gdf4326.empty:
-        return gdf4326, gdf4326
-
-    # EPSG:3857 enables buffering in meters.
-    gdf3857 = gdf4326.to_crs(epsg=3857)
-    return gdf4326, gdf3857
+_EMPTY_COLLECTION = b'{"type":"FeatureCollection","features":[]}'
 
 
 @router.get(
     "/airspace/nearby",
     summary="Nearby airspace",
     description="Return airspace GeoJSON features within a radius (NM) of a point.",
+    response_class=Response,
+    responses={200: {"content": {"application/json": {}}}},
 )
 def airspace_nearby(
     lat: float = Query(..., ge=-90, le=90),
     lon: float = Query(..., ge=-180, le=180),
     radius_nm: float = Query(20.0, ge=0.1, le=200.0),
     limit: int = Query(250, ge=1, le=2000),
-) -> dict:
+    zoom: Optional[int] = Query(
+        None, ge=0, le=24, description="Map zoom; selects a simplified geometry tier."
+    ),
+) -> Response:
     try:
-        import geopandas as gpd
-        from shapely.geometry import Point, mapping
+        import shapely
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Airspace dependencies unavailable: {e}")
 
-    gdf4326, gdf3857 = _airspace_gdfs()
-    if gdf3857.empty:
-        return {"type": "FeatureCollection", "features": []}
-
-    radius_m = float(radius_nm) * 1852.0
-    pt3857 = gpd.GeoSeries([Point(float(lon), float(lat))], crs="EPSG:4326").to_crs(epsg=3857)
-    buf = pt3857.iloc[0].buffer(radius_m)
-
-    hits = gdf3857[gdf3857.intersects(buf)]
-    if hits.empty:
-        return {"type": "FeatureCollection", "features": []}
+    store = airspace_store()
+    if store.empty:
+        return Response(content=_EMPTY_COLLECTION, media_type="application/json")
+
+    # Degree box around the radius (with slack for the latitude span), then an exact distance
+    # check on cached EPSG:3857 geometries. Web mercator is conformal, so scaling the radius
+    # by sec(lat) turns it into nautical miles at the query latitude.
+    dlat = float(radius_nm) / 60.0 * 1.25
+    dlon = dlat / max(math.cos(math.radians(min(abs(float(lat)) + dlat, 89.0))), 0.01)
+    candidates = np.sort(
+        store.tree.query(shapely.box(lon - dlon, lat - dlat, lon + dlon, lat + dlat))
+    )
+    if not candidates.size:
+        return Response(content=_EMPTY_COLLECTION, media_type="application/json")
+    radius_m = float(radius_nm) * 1852.0 / max(math.cos(math.radians(float(lat))), 0.01)
+    point = to_web_mercator(shapely.Point(float(lon), float(lat)))
+    hits = candidates[shapely.dwithin(store.web_mercator(candidates), point, radius_m)]
 
     # Preserve stable ordering but cap payload size.
-    hits = hits.head(int(limit))
-    sel = gdf4326.loc[hits.index]
-
-    out_features: list[dict] = []
-    for geom, props in zip(sel.geometry, sel["properties"], strict=False):
-        if geom is None:
-            continue
-        out_features.append(
-            {
-                "type": "Feature",
-                "geometry": mapping(geom),
-                "properties": props if isinstance(props, dict) else {},
-            }
-        )
-
-    return {"type": "FeatureCollection", "features": out_features}
+    features = store.geojson_features(hits[: int(limit)], store.column_for_zoom(zoom))
+    return Response(
+        content=b'{"type":"FeatureCollection","features":[' + b",".join(features) + b"]}",
+        media_type="application/json",
+    )
+
+
+@router.post(
+    "/airspace/along-route",
+    response_model=AirspaceAlongRouteResponse,
+    summary="Airspace along a route",
+    description=(
+        "List every airspace the route polyline penetrates, with entry/exit points and "
+        "distances, ordered along the route. No avoidance is applied."
+    ),
+)
+def airspace_along_route(req: AirspaceAlongRouteRequest) -> AirspaceAlongRouteResponse:
+    distance_nm = sum(
+        haversine_nm(a[0], a[1], b[0], b[1]) for a, b in zip(req.points, req.points[1:])
+    )
+    return AirspaceAlongRouteResponse(
+        distance_nm=round(distance_nm, 1),
+        crossings=airspace_crossings(req.points, airspace_store()),
+    )
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from fastapi import APIRouter, Request
 
+from app.utils.ttl_cache import fuel_stop_route_cache, map_tile_cache
+
 router = APIRouter()
 
 
@@ -9,8 +11,16 @@ router = APIRouter()
 def health(request: Request) -> dict:
     """Health check endpoint.
 
-    Also includes startup configuration issues (e.g. missing API keys).
+    Also includes startup configuration issues (e.g. missing API keys) and cache hit/miss
+    counters for sizing.
     """
 
     issues = getattr(request.app.state, "startup_config_issues", [])
-    return {"status": "ok", "startup_issues": issues}
+    return {
+        "status": "ok",
+        "startup_issues": issues,
+        "caches": {
+            "fuel_stop_routes": fuel_stop_route_cache.stats(),
+            "map_tiles": map_tile_cache.stats(),
+        },
+    }
@@ -4,14 +4,17 @@ from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from datetime import datetime, timedelta, timezone
 import logging
 import math
+import os
 import time
 from typing import Any, List, Literal, Optional
 
 from fastapi import APIRouter, HTTPException
 
-from app.models.airport import get_airport_coordinates, load_airport_cache
-from app.schemas.route import RouteLeg, RouteRequest, RouteResponse, Segment
+from app.models.airport import airport_table_for, get_airport_coordinates, load_airport_cache
+from app.models.airspace_store import airspace_store
+from app.schemas.route import RouteAlternative, RouteLeg, RouteRequest, RouteResponse, Segment
 from app.services import a_star
+from app.services.airspace_crossings import airspace_crossings
 from app.services.alternates import recommend_alternates
 from app.services import open_meteo
 from app.services.planning_runtime import (
@@ -32,12 +35,69 @@ from app.services.xctry_route_planner import (
     haversine_nm,
     plan_route,
 )
+from app.utils.data_loader import load_landmarks_snapshot
+from app.utils.data_versions import DataVersion, current_data, register_index
+from app.utils.ttl_cache import fuel_stop_route_cache
 
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _build_fuel_stop_landmarks(version: DataVersion) -> Optional[a_star.Landmarks]:
+    snapshot = load_landmarks_snapshot(version.files["landmarks"])
+    if snapshot is None:
+        return None
+    landmarks = a_star.Landmarks.from_snapshot(
+        snapshot, a_star.candidate_graph_for(version.airports)
+    )
+    if landmarks is None:
+        logger.warning(
+            "Ignoring fuel-stop landmarks %s: built for another airport set",
+            version.files["landmarks"],
+        )
+    return landmarks
+
+
+DEFAULT_FUEL_STOP_AIRPORT_TYPES = ("large_airport", "medium_airport", "small_airport")
+
+
+def _fuel_stop_airport_types() -> Optional[tuple[str, ...]]:
+    """Airport types usable as fuel stops (``FUEL_STOP_AIRPORT_TYPES``, comma-separated).
+
+    ``*`` allows every type.
+    """
+    raw = os.environ.get("FUEL_STOP_AIRPORT_TYPES")
+    if raw is None:
+        return DEFAULT_FUEL_STOP_AIRPORT_TYPES
+    types = tuple(t.strip() for t in raw.split(",") if t.strip())
+    if "*" in types:
+        return None
+    return types
+
+
+FUEL_STOP_LEG_BUCKET_NM = 5.0
+
+
+def _bucket_max_leg(max_leg: float) -> float:
+    """Round a max leg down to the cache bucket; shorter legs stay feasible for the aircraft."""
+    bucketed = math.floor(max_leg / FUEL_STOP_LEG_BUCKET_NM) * FUEL_STOP_LEG_BUCKET_NM
+    return bucketed if bucketed > 0 else max_leg
+
+
+def _fuel_stop_route_cache_ttl_s() -> float:
+    raw = os.environ.get("FUEL_STOP_ROUTE_CACHE_TTL_S")
+    try:
+        return float(raw) if raw is not None else 3600.0
+    except ValueError:
+        return 3600.0
+
+
+# Build the fuel-stop graph with each data version so the first routed request does not pay.
+register_index("fuel_stop_graph", lambda version: a_star.candidate_graph_for(version.airports))
+register_index("fuel_stop_landmarks", _build_fuel_stop_landmarks)
+
+
 @router.post(
     "/route",
     response_model=RouteResponse,
@@ -151,6 +211,7 @@ def calculate_route_internal(
     speed_kt = req.speed if req.speed_unit == "knots" else req.speed * 0.868976
 
     route_codes = [req.origin.upper(), req.destination.upper()]
+    alternative_routes: Optional[List[RouteAlternative]] = None
     if req.plan_fuel_stops or req.aircraft_range_nm is not None:
         t0 = time.perf_counter()
         ctx.emit_progress(phase="fuel_stops", message="Searching fuel stops", percent=0.12)
@@ -186,39 +247,72 @@ def calculate_route_internal(
         if max_leg is None or max_leg <= 0:
             raise HTTPException(status_code=400, detail="max leg distance must be > 0")
 
-        max_leg = min(float(max_leg), float(req.max_leg_distance))
-
-        candidates = []
-        for ap in load_airport_cache():
-            icao = str(ap.get("icao") or "").upper()
-            iata = str(ap.get("iata") or "").upper()
-            code = icao or iata
-            if not code:
-                continue
-            lat = ap.get("latitude")
-            lon = ap.get("longitude")
-            if lat is None or lon is None:
-                continue
-            candidates.append(a_star.AirportNode(code=code, lat=float(lat), lon=float(lon)))
+        max_leg = _bucket_max_leg(min(float(max_leg), float(req.max_leg_distance)))
+
+        per_leg_penalty = 0.0
+        if req.fuel_strategy == "economy":
+            per_leg_penalty = 25.0
+        airport_types = _fuel_stop_airport_types()
+        data = current_data()
+        # Resolved codes, so every spelling of an airport ("PAO", " kpao", "KPAO - Palo Alto")
+        # shares one cache entry and the cached itineraries name it the same way.
+        origin_code = origin["icao"] or origin["iata"]
+        dest_code = dest["icao"] or dest["iata"]
+        cache_key = "|".join(
+            [
+                origin_code,
+                dest_code,
+                f"{max_leg:g}",
+                f"{per_leg_penalty:g}",
+                ",".join(sorted(airport_types)) if airport_types is not None else "*",
+                req.fuel_stop_search_mode,
+                str(1 + req.alternatives),
+                str(data.number),
+            ]
+        )
 
+        search_stats: dict[str, Any] = {}
+        itineraries = fuel_stop_route_cache.get(cache_key)
+        timings["fuel_stop_cache_hit"] = 1.0 if itineraries is not None else 0.0
         try:
-            per_leg_penalty = 0.0
-            if req.fuel_strategy == "economy":
-                per_leg_penalty = 25.0
-
-            route_codes = a_star.find_route(
-                origin=a_star.AirportNode(
-                    code=req.origin.upper(), lat=float(o_lat), lon=float(o_lon)
-                ),
-                destination=a_star.AirportNode(
-                    code=req.destination.upper(), lat=float(d_lat), lon=float(d_lon)
-                ),
-                candidates=candidates,
-                max_leg_distance_nm=max_leg,
-                per_leg_penalty_nm=per_leg_penalty,
-            )
+            if itineraries is None:
+                graph = a_star.candidate_graph_for(airport_table_for(load_airport_cache()))
+                itineraries = a_star.find_routes(
+                    origin=a_star.AirportNode(code=origin_code, lat=float(o_lat), lon=float(o_lon)),
+                    destination=a_star.AirportNode(
+                        code=dest_code, lat=float(d_lat), lon=float(d_lon)
+                    ),
+                    graph=graph,
+                    landmarks=data.index("fuel_stop_landmarks"),
+                    max_leg_distance_nm=max_leg,
+                    per_leg_penalty_nm=per_leg_penalty,
+                    bidirectional=req.fuel_stop_search_mode == "bidirectional",
+                    airport_types=airport_types,
+                    corridor=True,
+                    k=1 + req.alternatives,
+                    stats=search_stats,
+                )
+                fuel_stop_route_cache.set(
+                    cache_key, itineraries, ttl_s=_fuel_stop_route_cache_ttl_s()
+                )
         except a_star.AStarError as e:
             raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            timings["fuel_stop_expansions"] = float(search_stats.get("expansions", 0))
+            timings["fuel_stop_candidates"] = float(search_stats.get("candidates", 0))
+
+        route_codes = list(itineraries[0].codes)
+        if req.alternatives:
+            alternative_routes = [
+                RouteAlternative(
+                    rank=rank,
+                    route=list(it.codes),
+                    fuel_stops=list(it.codes[1:-1]),
+                    distance_nm=round(it.distance_nm, 1),
+                    time_hr=round(it.distance_nm / speed_kt, 2) if speed_kt else 0.0,
+                )
+                for rank, it in enumerate(itineraries[1:], start=1)
+            ]
 
         _mark("fuel_stop_search", t0)
         ctx.emit_progress(phase="fuel_stops", message="Fuel stop search complete", percent=0.18)
@@ -255,6 +349,7 @@ def calculate_route_internal(
                 destination=(float(b_ap["latitude"]), float(b_ap["longitude"])),
                 cruising_altitude_ft=req.altitude,
                 avoid_airspaces_enabled=req.avoid_airspaces,
+                airspace_avoidance_mode=req.airspace_avoidance_mode,
             )
 
             leg_dist_nm = 0.0
@@ -313,7 +408,8 @@ def calculate_route_internal(
         raise HTTPException(
             status_code=503,
             detail=(
-                f"Airspace data file not found ({e}). Populate backend/data/airspaces_us.json or set AIRSPACES_FILE."
+                f"Airspace data file not found ({e}). Populate backend/data/airspace_cache.json "
+                "(AIRSPACE_CACHE_FILE) or backend/data/airspaces_us.json (AIRSPACES_FILE)."
             ),
         )
 
@@ -629,6 +725,12 @@ def calculate_route_internal(
         fuel_required = total_time * fuel_burn
         fuel_required_with_reserve = fuel_required + fuel_burn * (reserve_minutes / 60.0)
 
+    crossings = None
+    if req.include_airspace_report:
+        t0 = time.perf_counter()
+        crossings = airspace_crossings(points, airspace_store())
+        _mark("airspace_report", t0)
+
     timings["total"] = round(time.perf_counter() - t_total, 4)
     logger.info(
         "route.calculate_route timing origin=%s destination=%s points=%s segments=%s avoid_airspaces=%s avoid_terrain=%s include_alternates=%s timings=%s",
@@ -654,6 +756,7 @@ def calculate_route_internal(
         segments=segments,
         legs=legs,
         alternates=alternates,
+        alternative_routes=alternative_routes,
         fuel_stops=route_codes[1:-1] or None,
         fuel_burn_gph=fuel_burn,
         reserve_minutes=reserve_minutes,
@@ -666,6 +769,7 @@ def calculate_route_internal(
         headwind_kt=headwind_kt,
         crosswind_kt=crosswind_kt,
         groundspeed_kt=groundspeed_kt,
+        airspace_crossings=crossings,
     )
 
     ctx.emit_partial_plan(phase="complete", plan=resp.model_dump(mode="json"))
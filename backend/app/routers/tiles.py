@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Response
+from fastapi import Path as PathParam
+
+from app.models.airspace_store import AirspaceStore
+from app.utils import vector_tiles
+from app.utils.data_loader import tiles_dir
+from app.utils.data_versions import DataVersion, current_data, register_index
+from app.utils.ttl_cache import map_tile_cache
+
+router = APIRouter()
+
+TILE_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+# Tile layer -> the data file (`DataVersion.files` key) it is rendered from.
+TILE_LAYERS = {"airspace": "airspace", "airports": "airports"}
+
+
+def _map_tile_cache_ttl_s() -> float:
+    raw = os.environ.get("MAP_TILE_CACHE_TTL_S")
+    try:
+        return float(raw) if raw is not None else 86400.0
+    except ValueError:
+        return 86400.0
+
+
+def _build_prerendered_tiles(version: DataVersion) -> Dict[str, Tuple[Path, int]]:
+    """Pre-rendered tile directories (and their max zoom) built from this version's files."""
+    root = tiles_dir()
+    out: Dict[str, Tuple[Path, int]] = {}
+    for layer, source in TILE_LAYERS.items():
+        try:
+            meta = json.loads((root / layer / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        source_sha256 = version.file_sha256(source)
+        if isinstance(meta, dict) and source_sha256 and meta.get("sha256") == source_sha256:
+            out[layer] = (root / layer, int(meta.get("max_zoom", -1)))
+    return out
+
+
+register_index("prerendered_tiles", _build_prerendered_tiles)
+register_index(
+    "airport_tile_min_zoom",
+    lambda version: np.array(
+        [vector_tiles.airport_min_zoom(t) for t in version.airports.type], dtype=np.int8
+    ),
+)
+
+
+def _render_airspace(version: DataVersion, z: int, x: int, y: int) -> bytes:
+    import shapely
+
+    store: AirspaceStore = version.index("airspace_store")
+    if store.empty:
+        return b""
+    rows = np.sort(store.tree.query(shapely.box(*vector_tiles.tile_bounds(z, x, y, buffered=True))))
+    features = vector_tiles.airspace_layer(
+        store.web_mercator(rows, store.column_for_zoom(z)),
+        [store.properties[i] for i in rows.tolist()],
+        z,
+        x,
+        y,
+    )
+    return vector_tiles.encode_tile({"airspace": features})
+
+
+def _render_airports(version: DataVersion, z: int, x: int, y: int) -> bytes:
+    table = version.airports
+    rows = table.query_bbox(*vector_tiles.tile_bounds(z, x, y, buffered=True))
+    rows = rows[table.first_key[rows]]
+    min_zoom = version.index("airport_tile_min_zoom")[rows]
+    # Earliest zoom (most important) first, so the per-tile cap drops small fields first.
+    keep = min_zoom <= z
+    rows = rows[keep][np.lexsort((rows[keep], min_zoom[keep]))]
+    features = vector_tiles.airport_layer(
+        table.lon[rows],
+        table.lat[rows],
+        [
+            {"code": table.code(r), "name": table.name[r], "type": table.type[r]}
+            for r in rows.tolist()
+        ],
+        z,
+        x,
+        y,
+    )
+    return vector_tiles.encode_tile({"airports": features})
+
+
+def _load_tile(version: DataVersion, layer: str, z: int, x: int, y: int) -> bytes:
+    prerendered = version.index("prerendered_tiles").get(layer)
+    if prerendered is not None and z <= prerendered[1]:
+        # The build writes only non-empty tiles, so a missing file is an empty tile.
+        try:
+            return (prerendered[0] / str(z) / str(x) / f"{y}.mvt").read_bytes()
+        except FileNotFoundError:
+            return b""
+    if layer == "airspace":
+        return _render_airspace(version, z, x, y)
+    return _render_airports(version, z, x, y)
+
+
+@router.get(
+    "/tiles/{layer}/{z}/{x}/{y}.mvt",
+    summary="Map vector tile",
+    description=(
+        "Return a Mapbox Vector Tile of the `airspace` or `airports` layer, clipped and "
+        "simplified for zoom `z`."
+    ),
+    response_class=Response,
+    responses={200: {"content": {TILE_MEDIA_TYPE: {}}}},
+)
+def map_tile(
+    layer: str,
+    z: int = PathParam(..., ge=0, le=22),
+    x: int = PathParam(..., ge=0),
+    y: int = PathParam(..., ge=0),
+) -> Response:
+    if layer not in TILE_LAYERS:
+        raise HTTPException(status_code=404, detail=f"Unknown tile layer: {layer}")
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=404, detail="Tile outside the zoom level's grid")
+
+    version = current_data()
+    tile = map_tile_cache.get_or_set(
+        f"{version.number}:{layer}/{z}/{x}/{y}",
+        ttl_s=_map_tile_cache_ttl_s(),
+        fn=lambda: _load_tile(version, layer, z, x, y),
+    )
+    return Response(
+        content=tile,
+        media_type=TILE_MEDIA_TYPE,
+        headers={"Cache-Control": "public, max-age=3600"},
+    )
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AirportInfo(BaseModel):
@@ -15,3 +15,37 @@ class AirportInfo(BaseModel):
     longitude: float
     elevation: Optional[float] = None
     type: str = ""
+
+
+class AirportBatchRequest(BaseModel):
+    codes: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        description='ICAO/IATA codes; strings like "KPAO - Palo Alto" are accepted',
+    )
+
+
+class AirportBatchItem(BaseModel):
+    query: str
+    code: str = Field(..., description="Normalized code that was looked up")
+    found: bool
+    airport: Optional[AirportInfo] = None
+    error: Optional[str] = None
+
+
+class AirportBatchResponse(BaseModel):
+    results: List[AirportBatchItem]
+    unknown: List[str] = Field(default_factory=list, description="Inputs that did not resolve")
+
+
+class ViewportAirport(AirportInfo):
+    cluster_count: int = Field(1, description="Airports represented by this point (>1 = cluster)")
+
+
+class AirportBboxResponse(BaseModel):
+    zoom: int
+    total: int = Field(..., description="Airports inside the viewport before decimation")
+    clustered: bool
+    truncated: bool = Field(..., description="True when max_points dropped lower-priority points")
+    airports: List[ViewportAirport]
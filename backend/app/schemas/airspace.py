@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from typing import Annotated, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+Lat = Annotated[float, Field(ge=-90, le=90)]
+Lon = Annotated[float, Field(ge=-180, le=180)]
+
+
+class AirspaceAlongRouteRequest(BaseModel):
+    points: List[Tuple[Lat, Lon]] = Field(
+        ...,
+        min_length=2,
+        max_length=2000,
+        description="Route polyline as (lat, lon) points, e.g. a planned route's segment ends",
+    )
+
+
+class AirspaceCrossing(BaseModel):
+    id: Optional[str] = None
+    name: Optional[str] = None
+    airspace_class: Optional[str] = None
+    type: Optional[str] = None
+    entry: Tuple[float, float] = Field(..., description="(lat, lon) where the route enters")
+    exit: Tuple[float, float] = Field(..., description="(lat, lon) where the route leaves")
+    entry_nm: float = Field(..., description="Distance along the route to the entry point")
+    exit_nm: float = Field(..., description="Distance along the route to the exit point")
+
+
+class AirspaceAlongRouteResponse(BaseModel):
+    distance_nm: float
+    crossings: List[AirspaceCrossing] = Field(
+        ..., description="One entry per continuous stretch inside an airspace, by entry distance"
+    )
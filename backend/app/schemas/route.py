@@ -5,6 +5,8 @@ from typing import List, Literal, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
+from app.schemas.airspace import AirspaceCrossing
+
 
 class RouteRequest(BaseModel):
     origin: str
@@ -13,6 +15,10 @@ class RouteRequest(BaseModel):
     speed_unit: Literal["knots", "mph"] = "knots"
     altitude: int = Field(..., description="Requested cruising altitude (ft)")
     avoid_airspaces: bool = False
+    airspace_avoidance_mode: Literal["offset", "visibility"] = Field(
+        "offset",
+        description="Airspace avoidance: iterative boundary offsets, or a visibility-graph path.",
+    )
     avoid_terrain: bool = False
     max_leg_distance: float = 500.0
     plan_fuel_stops: bool = False
@@ -21,8 +27,17 @@ class RouteRequest(BaseModel):
     fuel_burn_gph: Optional[float] = None
     reserve_minutes: int = 45
     fuel_strategy: Literal["time", "economy"] = "time"
+    fuel_stop_search_mode: Literal["astar", "bidirectional"] = Field(
+        "astar", description="Fuel-stop search algorithm; both return equal-cost routes."
+    )
+    alternatives: int = Field(
+        0, ge=0, le=5, description="Extra fuel-stop itineraries to return, ranked by cost."
+    )
     apply_wind: bool = False
     include_alternates: bool = False
+    include_airspace_report: bool = Field(
+        False, description="Add the airspace crossings along the planned route to the response."
+    )
 
 
 class Segment(BaseModel):
@@ -64,6 +79,14 @@ class AlternateAirport(BaseModel):
     weather: Optional[AlternateWeather] = None
 
 
+class RouteAlternative(BaseModel):
+    rank: int
+    route: List[str]
+    fuel_stops: List[str]
+    distance_nm: float
+    time_hr: float
+
+
 class RouteResponse(BaseModel):
     planned_at_utc: datetime
     departure_time_utc: datetime
@@ -76,6 +99,7 @@ class RouteResponse(BaseModel):
     segments: List[Segment]
     legs: Optional[List[RouteLeg]] = None
     alternates: Optional[List[AlternateAirport]] = None
+    alternative_routes: Optional[List[RouteAlternative]] = None
     fuel_stops: Optional[List[str]] = None
     fuel_burn_gph: Optional[float] = None
     reserve_minutes: Optional[int] = None
@@ -86,3 +110,4 @@ class RouteResponse(BaseModel):
     headwind_kt: Optional[float] = None
     crosswind_kt: Optional[float] = None
     groundspeed_kt: Optional[float] = None
+    airspace_crossings: Optional[List[AirspaceCrossing]] = None
@@ -2,8 +2,22 @@ from __future__ import annotations
 
 import heapq
 import math
+import threading
+import weakref
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Sequence, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
 
 
 class AStarError(RuntimeError):
@@ -29,99 +43,952 @@ class AirportNode:
     lon: float
 
 
-def _cell_key(lat: float, lon: float, cell_deg: float) -> Tuple[int, int]:
-    return (int(math.floor(lat / cell_deg)), int(math.floor(lon / cell_deg)))
+_MIN_CELL_DEG = 0.25
+_R_NM = 3440.065
 
 
-def _build_spatial_index(
-    nodes: Sequence[AirportNode], cell_deg: float
-) -> Dict[Tuple[int, int], List[int]]:
-    buckets: Dict[Tuple[int, int], List[int]] = {}
-    for idx, n in enumerate(nodes):
-        k = _cell_key(n.lat, n.lon, cell_deg)
-        buckets.setdefault(k, []).append(idx)
-    return buckets
+def _haversine_many(
+    lat_rad: float,
+    cos_lat: float,
+    lon_rad: float,
+    lats: np.ndarray,
+    coss: np.ndarray,
+    lons: np.ndarray,
+) -> np.ndarray:
+    """Vectorized `haversine_nm` from one point to many, all in radians (cosines precomputed)."""
+    a = np.sin((lats - lat_rad) * 0.5) ** 2 + cos_lat * coss * np.sin((lons - lon_rad) * 0.5) ** 2
+    return (2.0 * _R_NM) * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
 
 
-def find_route(
+def _cell_deg_for(max_leg_nm: float) -> float:
+    """Smallest grid tier (0.25 deg * 2^k) whose cells are at least half a max leg tall."""
+    cell = _MIN_CELL_DEG
+    while cell * 120.0 < max_leg_nm:
+        cell *= 2.0
+    return cell
+
+
+class _Grid:
+    """Uniform lat/lon bucket grid over the candidate nodes (columns wrap at the antimeridian).
+
+    Nodes are stored sorted by cell key with their radian coordinates and latitude cosines, so
+    a row of adjacent cells is one contiguous slice that the distance kernel consumes directly.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_deg: float) -> None:
+        self.cell_deg = cell_deg
+        self.ncols = int(math.ceil(360.0 / cell_deg))
+
+        keys = self._row(lat) * self.ncols + self._col(lon)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.idx = order.astype(np.int64)
+        self.lat_rad = np.radians(lat[order])
+        self.lon_rad = np.radians(lon[order])
+        self.cos_lat = np.cos(self.lat_rad)
+
+    def _row(self, lat):
+        return np.floor(np.asarray(lat) / self.cell_deg).astype(np.int64)
+
+    def _col(self, lon):
+        return np.floor((np.asarray(lon) + 180.0) / self.cell_deg).astype(np.int64) % self.ncols
+
+    def near(self, lat: float, lon: float, radius_nm: float) -> List[slice]:
+        """Return slices of the sorted node arrays that can hold points within ``radius_nm``."""
+        row = int(self._row(lat))
+        col = int(self._col(lon))
+
+        row_span = int(math.ceil(radius_nm / 60.0 / self.cell_deg))
+        # Meridians converge towards the poles, so widen the column span accordingly.
+        cos_lat = math.cos(math.radians(min(90.0, abs(lat) + radius_nm / 60.0)))
+        if cos_lat <= 1e-9:
+            col_span = self.ncols
+        else:
+            col_span = int(math.ceil(radius_nm / (60.0 * cos_lat) / self.cell_deg))
+
+        if 2 * col_span + 1 >= self.ncols:
+            col_ranges = [(0, self.ncols - 1)]
+        else:
+            lo, hi = col - col_span, col + col_span
+            if lo < 0:
+                col_ranges = [(lo + self.ncols, self.ncols - 1), (0, hi)]
+            elif hi >= self.ncols:
+                col_ranges = [(lo, self.ncols - 1), (0, hi - self.ncols)]
+            else:
+                col_ranges = [(lo, hi)]
+
+        bounds = []
+        for r in range(row - row_span, row + row_span + 1):
+            base = r * self.ncols
+            for c0, c1 in col_ranges:
+                bounds.append((base + c0, base + c1 + 1))
+        flat = np.searchsorted(self.keys, np.asarray(bounds, dtype=np.int64).ravel())
+        return [slice(s, e) for s, e in zip(flat[0::2].tolist(), flat[1::2].tolist()) if e > s]
+
+    def candidates(
+        self, lat: float, lon: float, radius_nm: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return (node ids, lat rad, cos lat, lon rad) for every node in `near` cells."""
+        parts = self.near(lat, lon, radius_nm)
+        if len(parts) == 1:
+            sl = parts[0]
+            return self.idx[sl], self.lat_rad[sl], self.cos_lat[sl], self.lon_rad[sl]
+        sel = np.concatenate([np.arange(sl.start, sl.stop) for sl in parts]) if parts else []
+        sel = np.asarray(sel, dtype=np.int64)
+        return self.idx[sel], self.lat_rad[sel], self.cos_lat[sel], self.lon_rad[sel]
+
+
+class CandidateGraph:
+    """Fuel-stop candidates (one node per code) with grids cached per cell-size tier.
+
+    Build one per data version and pass it to `find_route`, so requests do not rebuild nodes
+    or spatial buckets.
+    """
+
+    def __init__(
+        self,
+        codes: Sequence[str],
+        lat: Sequence[float],
+        lon: Sequence[float],
+        types: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.codes: Tuple[str, ...] = tuple(codes)
+        self.types: Optional[Tuple[str, ...]] = tuple(types) if types is not None else None
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.lat_rad = np.radians(self.lat)
+        self.lon_rad = np.radians(self.lon)
+        self.cos_lat = np.cos(self.lat_rad)
+        self.index: Dict[str, int] = {}
+        for i, code in enumerate(self.codes):
+            self.index.setdefault(code, i)
+        self._grids: Dict[float, _Grid] = {}
+        self._type_masks: Dict[FrozenSet[str], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[AirportNode]) -> "CandidateGraph":
+        codes: List[str] = []
+        lat: List[float] = []
+        lon: List[float] = []
+        seen: set[str] = set()
+        for n in nodes:
+            if n.code in seen:
+                continue
+            seen.add(n.code)
+            codes.append(n.code)
+            lat.append(n.lat)
+            lon.append(n.lon)
+        return cls(codes, lat, lon)
+
+    @classmethod
+    def from_table(cls, table: Any) -> "CandidateGraph":
+        """Build from an `AirportTable`: one node per distinct ICAO (else IATA) code."""
+        codes: List[str] = []
+        lat: List[float] = []
+        lon: List[float] = []
+        types: List[str] = []
+        seen: set[str] = set()
+        for i, (lat_v, lon_v) in enumerate(zip(table.lat.tolist(), table.lon.tolist())):
+            code = table.code(i)
+            if not code or code in seen:
+                continue
+            seen.add(code)
+            codes.append(code)
+            lat.append(lat_v)
+            lon.append(lon_v)
+            types.append(table.type[i])
+        return cls(codes, lat, lon, types)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def node(self, i: int) -> AirportNode:
+        return AirportNode(code=self.codes[i], lat=float(self.lat[i]), lon=float(self.lon[i]))
+
+    def type_mask(self, airport_types: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        """Boolean mask of nodes whose airport type is allowed (untyped nodes always are).
+
+        Returns None when every node is allowed.
+        """
+
+        if airport_types is None or self.types is None:
+            return None
+        key = frozenset(airport_types)
+        mask = self._type_masks.get(key)
+        if mask is None:
+            mask = np.fromiter((not t or t in key for t in self.types), dtype=bool, count=len(self))
+            mask.setflags(write=False)
+            with self._lock:
+                self._type_masks[key] = mask
+        return mask
+
+    def grid(self, max_leg_distance_nm: float) -> _Grid:
+        cell_deg = _cell_deg_for(max_leg_distance_nm)
+        grid = self._grids.get(cell_deg)
+        if grid is None:
+            with self._lock:
+                grid = self._grids.get(cell_deg)
+                if grid is None:
+                    grid = _Grid(self.lat, self.lon, cell_deg)
+                    self._grids[cell_deg] = grid
+        return grid
+
+
+_graphs: "weakref.WeakKeyDictionary[Any, CandidateGraph]" = weakref.WeakKeyDictionary()
+_graphs_lock = threading.Lock()
+
+
+def candidate_graph_for(table: Any) -> CandidateGraph:
+    """Return the fuel-stop graph for an airport table, built once and dropped with it."""
+    with _graphs_lock:
+        graph = _graphs.get(table)
+        if graph is None:
+            graph = CandidateGraph.from_table(table)
+            _graphs[table] = graph
+        return graph
+
+
+# Max-leg tiers (nm) that landmark hop tables are built for. A request uses the smallest tier
+# that is at least its own max leg: every leg it may fly is also a leg in that tier's graph, so
+# tier hop counts never overestimate the request's.
+LANDMARK_TIERS_NM: Tuple[float, ...] = (100.0, 150.0, 250.0, 400.0, 600.0)
+LANDMARK_COUNT = 16
+HOPS_UNREACHED = int(np.iinfo(np.uint16).max)
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)))
+
+
+def select_landmarks(lat: np.ndarray, lon: np.ndarray, count: int = LANDMARK_COUNT) -> np.ndarray:
+    """Pick ``count`` spread-out nodes by farthest-point selection."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if len(lat) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    cos_lat = np.cos(lat_rad)
+
+    def dist_from(i: int) -> np.ndarray:
+        return _haversine_many(lat_rad[i], cos_lat[i], lon_rad[i], lat_rad, cos_lat, lon_rad)
+
+    # Start from the node farthest from node 0 rather than node 0 itself.
+    chosen = [int(np.argmax(dist_from(0)))]
+    nearest = dist_from(chosen[0])
+    while len(chosen) < min(count, len(lat)):
+        nxt = int(np.argmax(nearest))
+        if nearest[nxt] <= 0.0:
+            break
+        chosen.append(nxt)
+        nearest = np.minimum(nearest, dist_from(nxt))
+    return np.asarray(chosen, dtype=np.int64)
+
+
+def hop_counts(
+    lat: np.ndarray, lon: np.ndarray, sources: Sequence[int], max_leg_nm: float
+) -> np.ndarray:
+    """Return (len(sources), n) uint16 fewest-leg counts from each source to every node.
+
+    Legs are at most ``max_leg_nm``; unreachable nodes are `HOPS_UNREACHED`. The BFS runs one
+    layer at a time per grid cell, testing reachability with a single matrix product of unit
+    vectors (a leg is in range iff the dot product is at least cos(max_leg / R)).
+    """
+
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    grid = _Grid(lat, lon, _cell_deg_for(max_leg_nm))
+    xyz = _unit_vectors(lat[grid.idx], lon[grid.idx])
+    pos_of = np.empty(len(lat), dtype=np.int64)
+    pos_of[grid.idx] = np.arange(len(lat))
+
+    # Round the range up a hair so float error can only add legs, never drop them.
+    min_dot = math.cos(min(math.pi, (max_leg_nm + 1e-3) / _R_NM))
+    # Cell centers are up to half a diagonal from their nodes; one cell height is a safe margin.
+    reach_nm = max_leg_nm + grid.cell_deg * 60.0
+
+    out = np.full((len(sources), len(lat)), HOPS_UNREACHED, dtype=np.uint16)
+    for s, source in enumerate(sources):
+        hops = np.full(len(lat), HOPS_UNREACHED, dtype=np.uint16)
+        frontier = np.asarray([pos_of[int(source)]], dtype=np.int64)
+        hops[frontier] = 0
+        level = 0
+        while len(frontier) and level < HOPS_UNREACHED - 1:
+            level += 1
+            keys = grid.keys[frontier]
+            order = np.argsort(keys, kind="stable")
+            frontier, keys = frontier[order], keys[order]
+            cell_keys, starts = np.unique(keys, return_index=True)
+            ends = np.append(starts[1:], len(frontier))
+
+            reached = []
+            for key, start, end in zip(cell_keys.tolist(), starts.tolist(), ends.tolist()):
+                row, col = divmod(key, grid.ncols)
+                parts = grid.near(
+                    (row + 0.5) * grid.cell_deg,
+                    (col + 0.5) * grid.cell_deg - 180.0,
+                    reach_nm,
+                )
+                if not parts:
+                    continue
+                cand = np.concatenate([np.arange(sl.start, sl.stop) for sl in parts])
+                cand = cand[hops[cand] == HOPS_UNREACHED]
+                if not len(cand):
+                    continue
+                src_xyz = xyz[frontier[start:end]]
+                hit = np.zeros(len(cand), dtype=bool)
+                # Bound the size of each dot-product block.
+                step = max(1, 4_000_000 // max(1, end - start))
+                for c in range(0, len(cand), step):
+                    block = xyz[cand[c : c + step]] @ src_xyz.T
+                    hit[c : c + step] = (block >= min_dot).any(axis=1)
+                newly = cand[hit]
+                hops[newly] = level
+                reached.append(newly)
+
+            frontier = np.concatenate(reached) if reached else np.zeros(0, dtype=np.int64)
+        out[s, grid.idx] = hops
+    return out
+
+
+class Landmarks:
+    """Landmark hop tables aligned with one `CandidateGraph`, used for an ALT heuristic.
+
+    For nodes v and t and any landmark L, the legs needed from v to t are at least
+    |hops(L, v) - hops(L, t)| (triangle inequality on the hop metric), and if exactly one of
+    them is reachable from L there is no route at all.
+    """
+
+    def __init__(self, graph: CandidateGraph, tiers: Dict[float, np.ndarray]) -> None:
+        self.graph = graph
+        self.tiers = dict(sorted(tiers.items()))
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Any, graph: CandidateGraph) -> Optional["Landmarks"]:
+        """Align a ``landmarks`` snapshot with ``graph`` by code (and matching position).
+
+        Returns None unless every graph node is in the snapshot with the same coordinates: hop
+        counts from a smaller airport set can call real routes impossible and overestimate
+        legs. Airports dropped since the build are harmless (hops only grow without them).
+        """
+        count = int(snapshot.meta.get("landmarks") or 0)
+        n_snap = snapshot.count
+
+        snap_pos = np.full(len(graph), -1, dtype=np.int64)
+        for j, code in enumerate(snapshot.strings("codes")):
+            i = graph.index.get(code) if code else None
+            if i is not None and snap_pos[i] < 0:
+                snap_pos[i] = j
+        known = snap_pos >= 0
+        # Coordinates must match, or the tables describe a different airport set.
+        safe_pos = np.where(known, snap_pos, 0)
+        if n_snap:
+            known &= np.abs(snapshot.array("lat")[safe_pos] - graph.lat) < 1e-6
+            known &= np.abs(snapshot.array("lon")[safe_pos] - graph.lon) < 1e-6
+        if not len(graph) or not known.all():
+            return None
+
+        identity = np.array_equal(snap_pos, np.arange(n_snap))
+        tiers: Dict[float, np.ndarray] = {}
+        for tier in snapshot.meta.get("tiers") or []:
+            table = snapshot.array(f"hops_{int(tier)}").reshape(count, n_snap)
+            tiers[float(tier)] = table if identity else table[:, snap_pos]
+        return cls(graph, tiers)
+
+    def table_for(self, max_leg_distance_nm: float) -> Optional[np.ndarray]:
+        """Return the (landmarks, nodes) hop table of the smallest tier >= the max leg."""
+        for tier, table in self.tiers.items():
+            if tier >= max_leg_distance_nm:
+                return table
+        return None
+
+
+class _SearchSpace:
+    """Per-request view of a graph: endpoints, max-leg neighbor queries and heuristics.
+
+    Endpoints that are graph nodes use their node; others become extra nodes past the end of
+    the graph (origin first, then destination).
+    """
+
+    def __init__(
+        self,
+        graph: CandidateGraph,
+        origin: AirportNode,
+        destination: AirportNode,
+        *,
+        landmarks: Optional[Landmarks],
+        max_leg_distance_nm: float,
+        per_leg_penalty_nm: float,
+        allowed: Optional[np.ndarray] = None,
+    ) -> None:
+        self.graph = graph
+        self.grid = graph.grid(max_leg_distance_nm)
+        self.max_leg = max_leg_distance_nm
+        self.penalty = per_leg_penalty_nm
+        self.landmarks = landmarks if landmarks is not None and landmarks.graph is graph else None
+
+        self.n_graph = len(graph)
+        self.extra: List[AirportNode] = []
+        self.start = self._endpoint(origin)
+        self.dest = self._endpoint(destination)
+        self.n_total = self.n_graph + len(self.extra)
+
+        self.lat = np.concatenate([graph.lat, [n.lat for n in self.extra]])
+        self.lon = np.concatenate([graph.lon, [n.lon for n in self.extra]])
+        self.extra_ids = np.arange(self.n_graph, self.n_total, dtype=np.int64)
+        extra_lat_rad = np.radians(self.lat[self.n_graph :])
+        self.extra_lat_rad = extra_lat_rad
+        self.extra_cos = np.cos(extra_lat_rad)
+        self.extra_lon_rad = np.radians(self.lon[self.n_graph :])
+
+        self._neighbors: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._heuristics: Dict[int, Callable[[np.ndarray], np.ndarray]] = {}
+
+        # Nodes the route may stop at; the endpoints always qualify.
+        self.allowed: Optional[np.ndarray] = None
+        if allowed is not None:
+            self.allowed = np.concatenate([allowed, np.ones(len(self.extra), dtype=bool)])
+            self.allowed[[self.start, self.dest]] = True
+
+    def _endpoint(self, node: AirportNode) -> int:
+        idx = self.graph.index.get(node.code)
+        if idx is not None:
+            return idx
+        self.extra.append(node)
+        return self.n_graph + len(self.extra) - 1
+
+    def code(self, i: int) -> str:
+        return self.extra[i - self.n_graph].code if i >= self.n_graph else self.graph.codes[i]
+
+    def neighbors(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (ids, distances_nm) of every node within one max leg of node ``i``.
+
+        Legs are symmetric, so the same query serves forward and backward searches. Node ``i``
+        itself may be included at distance 0. Results are cached for the life of the space, so
+        repeated searches over it (alternative routes) do not query the grid again.
+        """
+
+        cached = self._neighbors.get(i)
+        if cached is not None:
+            return cached
+
+        here_lat = float(self.lat[i])
+        here_lon = float(self.lon[i])
+        here_lat_rad = math.radians(here_lat)
+        here_cos = math.cos(here_lat_rad)
+        here_lon_rad = math.radians(here_lon)
+
+        ids, lats, coss, lons = self.grid.candidates(here_lat, here_lon, self.max_leg)
+        if self.allowed is not None:
+            # Drop excluded nodes before the distance kernel rather than after.
+            ok = self.allowed[ids]
+            ids, lats, coss, lons = ids[ok], lats[ok], coss[ok], lons[ok]
+        d = _haversine_many(here_lat_rad, here_cos, here_lon_rad, lats, coss, lons)
+        if len(self.extra):
+            ids = np.concatenate([ids, self.extra_ids])
+            d = np.concatenate(
+                [
+                    d,
+                    _haversine_many(
+                        here_lat_rad,
+                        here_cos,
+                        here_lon_rad,
+                        self.extra_lat_rad,
+                        self.extra_cos,
+                        self.extra_lon_rad,
+                    ),
+                ]
+            )
+        keep = d <= self.max_leg
+        result = (ids[keep], d[keep])
+        self._neighbors[i] = result
+        return result
+
+    def path_cost(self, path: Sequence[int]) -> float:
+        return sum(
+            haversine_nm((self.lat[a], self.lon[a]), (self.lat[b], self.lon[b])) + self.penalty
+            for a, b in zip(path, path[1:])
+        )
+
+    def heuristic_to(self, target: int) -> Callable[[np.ndarray], np.ndarray]:
+        """Return a cached, consistent lower bound on the remaining cost to ``target``.
+
+        Straight-line distance plus a penalty for the fewest legs that could still be needed
+        (from the max leg and, when available, the landmark tables). Nodes that provably cannot
+        reach ``target`` get +inf.
+        """
+
+        cached = self._heuristics.get(target)
+        if cached is not None:
+            return cached
+
+        n_graph = self.n_graph
+        landmarks = self.landmarks
+        t_lat_rad = math.radians(float(self.lat[target]))
+        t_cos = math.cos(t_lat_rad)
+        t_lon_rad = math.radians(float(self.lon[target]))
+
+        # Landmark hop tables need the target to be one of their nodes.
+        hop_table: Optional[np.ndarray] = None
+        if landmarks is not None and target < n_graph:
+            hop_table = landmarks.table_for(self.max_leg)
+        if hop_table is not None:
+            t_hops = hop_table[:, target].astype(np.int32)[:, None]
+            t_reached = t_hops != HOPS_UNREACHED
+
+        h = np.full(self.n_total, np.nan)
+
+        def heuristic(ids: np.ndarray) -> np.ndarray:
+            missing = ids[np.isnan(h[ids])]
+            if len(missing):
+                lat_rad = np.radians(self.lat[missing])
+                dist = _haversine_many(
+                    t_lat_rad,
+                    t_cos,
+                    t_lon_rad,
+                    lat_rad,
+                    np.cos(lat_rad),
+                    np.radians(self.lon[missing]),
+                )
+                est = dist
+                if hop_table is not None:
+                    graph_ids = np.minimum(missing, n_graph - 1)
+                    known = missing < n_graph
+                    node_hops = hop_table[:, graph_ids].astype(np.int32)
+                    node_reached = node_hops != HOPS_UNREACHED
+                    cut = known & (node_reached != t_reached).any(axis=0)
+                    est = np.where(cut, np.inf, dist)
+                if self.penalty > 0:
+                    legs = np.maximum(np.ceil(dist / self.max_leg - 1e-9), 0.0)
+                    if hop_table is not None:
+                        both = node_reached & t_reached
+                        alt = np.where(both, np.abs(node_hops - t_hops), 0).max(axis=0)
+                        legs = np.where(known, np.maximum(legs, alt), legs)
+                    est = est + self.penalty * legs
+                h[missing] = est
+            return h[ids]
+
+        self._heuristics[target] = heuristic
+        return heuristic
+
+
+def _path(came_from: np.ndarray, node: int) -> List[int]:
+    path = [node]
+    while came_from[node] >= 0:
+        node = int(came_from[node])
+        path.append(node)
+    path.reverse()
+    return path
+
+
+def _astar(
+    space: _SearchSpace,
+    *,
+    max_expansions: int,
+    stats: Dict[str, Any],
+    start: Optional[int] = None,
+    banned: Optional[np.ndarray] = None,
+    banned_first: Iterable[int] = (),
+) -> List[int]:
+    """A* from ``start`` (default: the origin) to the destination.
+
+    ``banned`` masks nodes the path may not visit and ``banned_first`` lists nodes the first
+    leg may not go to (used for spur searches when enumerating alternatives).
+    """
+
+    if start is None:
+        start = space.start
+    heuristic = space.heuristic_to(space.dest)
+    g = np.full(space.n_total, np.inf)
+    came_from = np.full(space.n_total, -1, dtype=np.int64)
+    if banned is not None:
+        # Banned nodes look already reached at no cost, so they are never improved on.
+        g[banned] = -np.inf
+    first_banned = np.asarray(list(banned_first), dtype=np.int64)
+
+    g[start] = 0.0
+    start_f = float(heuristic(np.array([start]))[0])
+    if math.isinf(start_f):
+        raise AStarError("No route found")
+    open_heap: List[Tuple[float, int]] = [(start_f, start)]
+
+    expansions = 0
+    while open_heap:
+        f, current = heapq.heappop(open_heap)
+        g_cur = float(g[current])
+        if f > g_cur + float(heuristic(np.array([current]))[0]) + 1e-9:
+            # Stale entry: the node was re-queued with a better cost since.
+            continue
+
+        expansions += 1
+        stats["expansions"] = expansions
+        if expansions > max_expansions:
+            raise AStarError("Search exceeded max expansions")
+
+        if current == space.dest:
+            return _path(came_from, current)
+
+        ids, d = space.neighbors(current)
+        # The current node itself has d == 0 and never improves on its own g.
+        tentative = g_cur + d + space.penalty
+        better = tentative < g[ids]
+        if current == start and len(first_banned):
+            better &= ~np.isin(ids, first_banned)
+        if not better.any():
+            continue
+
+        ids = ids[better]
+        tentative = tentative[better]
+        g[ids] = tentative
+        came_from[ids] = current
+        f_next = tentative + heuristic(ids)
+        for nxt, f_nxt in zip(ids.tolist(), f_next.tolist()):
+            if f_nxt != math.inf:
+                heapq.heappush(open_heap, (f_nxt, nxt))
+
+    raise AStarError("No route found")
+
+
+def _alternatives(
+    space: _SearchSpace,
+    best: List[int],
+    k: int,
     *,
+    max_expansions: int,
+    stats: Dict[str, Any],
+) -> List[List[int]]:
+    """Yen's algorithm: the ``k`` cheapest loopless routes, starting from ``best``.
+
+    Spur searches share the space's cached neighbor lists and destination heuristic, so each
+    one only re-runs the heap search.
+    """
+
+    routes = [best]
+    seen = {tuple(best)}
+    candidates: List[Tuple[float, Tuple[int, ...]]] = []
+
+    while len(routes) < k:
+        prev = routes[-1]
+        for i in range(len(prev) - 1):
+            root = prev[: i + 1]
+            banned = np.zeros(space.n_total, dtype=bool)
+            banned[root[:-1]] = True
+            banned_first = {r[i + 1] for r in routes if len(r) > i + 1 and r[: i + 1] == root}
+
+            attempt: Dict[str, Any] = {}
+            try:
+                spur = _astar(
+                    space,
+                    max_expansions=max_expansions,
+                    stats=attempt,
+                    start=root[-1],
+                    banned=banned,
+                    banned_first=banned_first,
+                )
+            except AStarError:
+                continue
+            finally:
+                stats["expansions"] += attempt.get("expansions", 0)
+
+            path = tuple(root[:-1] + spur)
+            if path not in seen:
+                seen.add(path)
+                heapq.heappush(candidates, (space.path_cost(path), path))
+
+        if not candidates:
+            break
+        routes.append(list(heapq.heappop(candidates)[1]))
+    return routes
+
+
+def _bidirectional(space: _SearchSpace, *, max_expansions: int, stats: Dict[str, Any]) -> List[int]:
+    """Bidirectional A* with average potentials.
+
+    Both searches use p(v) = (h_dest(v) - h_origin(v)) / 2 (negated backwards), which keeps
+    reduced edge costs non-negative because both heuristics are consistent. The best meeting
+    cost ``mu`` is then optimal once the smallest forward and backward keys sum to at least
+    ``mu``. Legs are symmetric, so the backward search reuses the same grid queries.
+    """
+
+    h_dest = space.heuristic_to(space.dest)
+    h_origin = space.heuristic_to(space.start)
+
+    def potential(ids: np.ndarray) -> np.ndarray:
+        # +inf - finite or finite - +inf: the node is on no origin-destination route.
+        with np.errstate(invalid="ignore"):
+            return 0.5 * (h_dest(ids) - h_origin(ids))
+
+    start = np.array([space.start])
+    if math.isinf(float(h_dest(start)[0])):
+        raise AStarError("No route found")
+
+    g = (np.full(space.n_total, np.inf), np.full(space.n_total, np.inf))
+    came_from = (
+        np.full(space.n_total, -1, dtype=np.int64),
+        np.full(space.n_total, -1, dtype=np.int64),
+    )
+    # Forward keys are g + p, backward keys are g - p.
+    sign = (1.0, -1.0)
+    heaps: Tuple[List[Tuple[float, int]], List[Tuple[float, int]]] = ([], [])
+    for side, node in ((0, space.start), (1, space.dest)):
+        g[side][node] = 0.0
+        heapq.heappush(heaps[side], (sign[side] * float(potential(np.array([node]))[0]), node))
+
+    mu = math.inf
+    meet = -1
+    expansions = 0
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= mu:
+            break
+
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        other = 1 - side
+        key, current = heapq.heappop(heaps[side])
+        g_cur = float(g[side][current])
+        if key > g_cur + sign[side] * float(potential(np.array([current]))[0]) + 1e-9:
+            continue
+
+        expansions += 1
+        stats["expansions"] = expansions
+        if expansions > max_expansions:
+            raise AStarError("Search exceeded max expansions")
+
+        ids, d = space.neighbors(current)
+        tentative = g_cur + d + space.penalty
+        better = tentative < g[side][ids]
+        if not better.any():
+            continue
+
+        ids = ids[better]
+        tentative = tentative[better]
+        g[side][ids] = tentative
+        came_from[side][ids] = current
+
+        through = tentative + g[other][ids]
+        best = int(np.argmin(through))
+        if through[best] < mu:
+            mu = float(through[best])
+            meet = int(ids[best])
+
+        keys = tentative + sign[side] * potential(ids)
+        for nxt, k in zip(ids.tolist(), keys.tolist()):
+            if math.isfinite(k):
+                heapq.heappush(heaps[side], (k, nxt))
+
+    if meet < 0:
+        raise AStarError("No route found")
+
+    forward = _path(came_from[0], meet)
+    backward = _path(came_from[1], meet)
+    return forward + backward[::-1][1:]
+
+
+def corridor_mask(
+    graph: CandidateGraph,
     origin: AirportNode,
     destination: AirportNode,
-    candidates: Sequence[AirportNode],
+    budget_nm: float,
+    *,
+    max_leg_distance_nm: float,
+) -> Optional[np.ndarray]:
+    """Mask of graph nodes v with d(origin, v) + d(v, destination) <= ``budget_nm``.
+
+    Every node on a route costing at most ``budget_nm`` lies inside this ellipse. Candidates
+    come from the grid cells within (D + budget) / 2 of the great-circle midpoint, which
+    bounds the ellipse, so only nearby cells are tested. None means "no restriction".
+    """
+
+    xyz = _unit_vectors(
+        np.array([origin.lat, destination.lat]), np.array([origin.lon, destination.lon])
+    )
+    mid = xyz.sum(axis=0)
+    norm = float(np.linalg.norm(mid))
+    if norm < 1e-9:
+        # Antipodal endpoints: every node is "on the way".
+        return None
+    mid /= norm
+    mid_lat = math.degrees(math.asin(max(-1.0, min(1.0, float(mid[2])))))
+    mid_lon = math.degrees(math.atan2(float(mid[1]), float(mid[0])))
+
+    direct = haversine_nm((origin.lat, origin.lon), (destination.lat, destination.lon))
+    grid = graph.grid(max_leg_distance_nm)
+    parts = grid.near(mid_lat, mid_lon, (direct + budget_nm) / 2.0)
+
+    mask = np.zeros(len(graph), dtype=bool)
+    if not parts:
+        return mask
+    sel = np.concatenate([np.arange(sl.start, sl.stop) for sl in parts])
+    lats, coss, lons = grid.lat_rad[sel], grid.cos_lat[sel], grid.lon_rad[sel]
+    total = np.zeros(len(sel))
+    for node in (origin, destination):
+        lat_rad = math.radians(node.lat)
+        total += _haversine_many(
+            lat_rad, math.cos(lat_rad), math.radians(node.lon), lats, coss, lons
+        )
+    mask[grid.idx[sel[total <= budget_nm]]] = True
+    return mask
+
+
+def corridor_budget_nm(
+    direct_nm: float, max_leg_distance_nm: float, per_leg_penalty_nm: float
+) -> float:
+    """Initial corridor size: room for a couple of off-track legs, and more with penalties."""
+    return direct_nm + max(2.0 * max_leg_distance_nm, 0.25 * direct_nm) + 2.0 * per_leg_penalty_nm
+
+
+@dataclass(frozen=True)
+class Itinerary:
+    codes: Tuple[str, ...]
+    distance_nm: float
+    cost: float
+
+
+def find_routes(
+    *,
+    origin: AirportNode,
+    destination: AirportNode,
+    candidates: Sequence[AirportNode] = (),
+    graph: Optional[CandidateGraph] = None,
+    landmarks: Optional[Landmarks] = None,
     max_leg_distance_nm: float,
     per_leg_penalty_nm: float = 0.0,
     max_expansions: int = 20000,
-) -> List[str]:
+    bidirectional: bool = False,
+    airport_types: Optional[Iterable[str]] = None,
+    corridor: bool = False,
+    k: int = 1,
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[Itinerary]:
+    """Return up to ``k`` cheapest distinct airport chains from ``origin`` to ``destination``.
+
+    Each leg is at most ``max_leg_distance_nm`` and costs its distance plus
+    ``per_leg_penalty_nm``. ``bidirectional`` searches from both ends at once; it finds a route
+    of the same cost.
+
+    Intermediate stops are limited to ``airport_types`` (untyped nodes always qualify). With
+    ``corridor``, the search first only considers nodes inside an ellipse around the endpoints
+    and widens it only when that cannot be shown optimal (or finds nothing), so the result
+    is the same as an unrestricted search. When given, ``stats`` receives ``expansions``,
+    ``candidates`` and ``corridor_retries``.
+
+    Routes after the first come from Yen's algorithm over the same search space (so, with
+    ``corridor``, from inside the final corridor), ranked by cost.
+    """
+
     if max_leg_distance_nm <= 0:
         raise AStarError("max_leg_distance_nm must be > 0")
+    if stats is None:
+        stats = {}
+    stats["expansions"] = 0
 
     # If the direct leg is feasible, prefer direct.
-    if (
-        haversine_nm((origin.lat, origin.lon), (destination.lat, destination.lon))
-        <= max_leg_distance_nm
-    ):
-        return [origin.code, destination.code]
-
-    # Include endpoints in the node list.
-    nodes: List[AirportNode] = [origin]
-    seen = {origin.code}
-
-    for n in candidates:
-        if n.code in seen:
-            continue
-        nodes.append(n)
-        seen.add(n.code)
-
-    if destination.code not in seen:
-        nodes.append(destination)
-    dest_idx = len(nodes) - 1
-
-    cell_deg = max(0.25, max_leg_distance_nm / 60.0)
-    buckets = _build_spatial_index(nodes, cell_deg)
-
-    def neighbors(i: int) -> Iterable[Tuple[int, float]]:
-        n = nodes[i]
-        ck = _cell_key(n.lat, n.lon, cell_deg)
-        for dy in (-1, 0, 1):
-            for dx in (-1, 0, 1):
-                for j in buckets.get((ck[0] + dy, ck[1] + dx), []):
-                    if j == i:
-                        continue
-                    d = haversine_nm((n.lat, n.lon), (nodes[j].lat, nodes[j].lon))
-                    if d <= max_leg_distance_nm:
-                        yield j, d + per_leg_penalty_nm
-
-    open_heap: List[Tuple[float, int]] = []
-    heapq.heappush(open_heap, (0.0, 0))
-
-    came_from: Dict[int, int] = {}
-    g_score: Dict[int, float] = {0: 0.0}
+    direct = haversine_nm((origin.lat, origin.lon), (destination.lat, destination.lon))
+    if direct <= max_leg_distance_nm and k <= 1:
+        return [Itinerary((origin.code, destination.code), direct, direct + per_leg_penalty_nm)]
 
-    expansions = 0
-    while open_heap:
-        _, current = heapq.heappop(open_heap)
-        expansions += 1
-        if expansions > max_expansions:
-            raise AStarError("Search exceeded max expansions")
+    if graph is None:
+        graph = CandidateGraph.from_nodes(candidates)
+    search = _bidirectional if bidirectional else _astar
+    type_mask = graph.type_mask(airport_types)
 
-        if current == dest_idx:
-            # Reconstruct
-            path = [current]
-            while current in came_from:
-                current = came_from[current]
-                path.append(current)
-            path.reverse()
-            return [nodes[i].code for i in path]
-
-        for nxt, edge_cost in neighbors(current):
-            tentative = g_score[current] + edge_cost
-            if tentative >= g_score.get(nxt, float("inf")):
-                continue
-            came_from[nxt] = current
-            g_score[nxt] = tentative
-            h = haversine_nm(
-                (nodes[nxt].lat, nodes[nxt].lon), (nodes[dest_idx].lat, nodes[dest_idx].lon)
-            )
-            heapq.heappush(open_heap, (tentative + h, nxt))
+    def run(allowed: Optional[np.ndarray]) -> Tuple[List[int], _SearchSpace]:
+        space = _SearchSpace(
+            graph,
+            origin,
+            destination,
+            landmarks=landmarks,
+            max_leg_distance_nm=max_leg_distance_nm,
+            per_leg_penalty_nm=per_leg_penalty_nm,
+            allowed=allowed,
+        )
+        stats["candidates"] = (
+            int(space.allowed.sum()) if space.allowed is not None else space.n_total
+        )
+        attempt: Dict[str, Any] = {}
+        try:
+            return search(space, max_expansions=max_expansions, stats=attempt), space
+        finally:
+            stats["expansions"] += attempt.get("expansions", 0)
 
-    raise AStarError("No route found")
+    def restrict(budget_nm: Optional[float]) -> Optional[np.ndarray]:
+        if budget_nm is None:
+            return type_mask
+        corridor = corridor_mask(
+            graph, origin, destination, budget_nm, max_leg_distance_nm=max_leg_distance_nm
+        )
+        if corridor is None:
+            return type_mask
+        return corridor if type_mask is None else corridor & type_mask
+
+    def itineraries(path: List[int], space: _SearchSpace) -> List[Itinerary]:
+        paths = [path]
+        if k > 1:
+            paths = _alternatives(space, path, k, max_expansions=max_expansions, stats=stats)
+        out = []
+        for p in paths:
+            cost = space.path_cost(p)
+            distance = cost - per_leg_penalty_nm * (len(p) - 1)
+            out.append(Itinerary(tuple(space.code(i) for i in p), distance, cost))
+        return out
+
+    stats["corridor_retries"] = 0
+    if not corridor:
+        path, space = run(type_mask)
+        return itineraries(path, space)
+
+    budget = corridor_budget_nm(direct, max_leg_distance_nm, per_leg_penalty_nm)
+    try:
+        path, space = run(restrict(budget))
+    except AStarError as e:
+        if str(e) != "No route found":
+            raise
+        # Nothing inside the corridor: search every candidate instead.
+        stats["corridor_retries"] += 1
+        path, space = run(type_mask)
+        return itineraries(path, space)
+
+    # Any better route only visits nodes within its own cost of both ends, so a route that
+    # costs no more than the corridor budget is optimal; otherwise widen to that cost.
+    cost = space.path_cost(path)
+    if cost > budget:
+        stats["corridor_retries"] += 1
+        path, space = run(restrict(cost + 1e-6))
+    return itineraries(path, space)
+
+
+def find_route(
+    *,
+    origin: AirportNode,
+    destination: AirportNode,
+    candidates: Sequence[AirportNode] = (),
+    graph: Optional[CandidateGraph] = None,
+    landmarks: Optional[Landmarks] = None,
+    max_leg_distance_nm: float,
+    per_leg_penalty_nm: float = 0.0,
+    max_expansions: int = 20000,
+    bidirectional: bool = False,
+    airport_types: Optional[Iterable[str]] = None,
+    corridor: bool = False,
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    """Return the cheapest airport chain from ``origin`` to ``destination`` (see `find_routes`)."""
+    best = find_routes(
+        origin=origin,
+        destination=destination,
+        candidates=candidates,
+        graph=graph,
+        landmarks=landmarks,
+        max_leg_distance_nm=max_leg_distance_nm,
+        per_leg_penalty_nm=per_leg_penalty_nm,
+        max_expansions=max_expansions,
+        bidirectional=bidirectional,
+        airport_types=airport_types,
+        corridor=corridor,
+        stats=stats,
+    )[0]
+    return list(best.codes)
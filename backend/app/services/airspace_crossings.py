@@ -0,0 +1,106 @@
+"""Airspace penetrations along a route polyline, reported without running any avoidance."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.xctry_route_planner import haversine_nm
+
+if TYPE_CHECKING:
+    from app.models.airspace_store import AirspaceStore
+
+
+LatLon = Tuple[float, float]
+
+# Stretches of one airspace closer than this (nm) are one crossing (split only by a vertex).
+MERGE_GAP_NM = 1e-6
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _crossing(
+    props: Mapping[str, Any],
+    entry_lonlat: np.ndarray,
+    exit_lonlat: np.ndarray,
+    entry_nm: float,
+    exit_nm: float,
+) -> Dict[str, Any]:
+    return {
+        "id": _text(props.get("id")),
+        "name": _text(props.get("name")),
+        "airspace_class": _text(props.get("icaoClass", props.get("class", props.get("category")))),
+        "type": _text(props.get("type")),
+        "entry": (float(entry_lonlat[1]), float(entry_lonlat[0])),
+        "exit": (float(exit_lonlat[1]), float(exit_lonlat[0])),
+        "entry_nm": round(float(entry_nm), 2),
+        "exit_nm": round(float(exit_nm), 2),
+    }
+
+
+def airspace_crossings(points: Sequence[LatLon], store: "AirspaceStore") -> List[Dict[str, Any]]:
+    """Every continuous stretch of the ``points`` (lat, lon) polyline inside an airspace.
+
+    Segments are matched to airspaces with one STRtree query and intersected in one vectorized
+    shapely call; each resulting line piece is located on its segment to get entry/exit
+    distances. Pieces of one airspace that meet at a vertex are merged. Touching or following
+    a boundary without entering is not a crossing. Results are ordered by entry distance.
+    """
+    import shapely
+
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(pts) < 2 or store.empty:
+        return []
+
+    lonlat = pts[:, ::-1]
+    starts, ends = lonlat[:-1], lonlat[1:]
+    segments = shapely.linestrings(np.stack([starts, ends], axis=1))
+    seg_nm = np.array([haversine_nm(a[1], a[0], b[1], b[0]) for a, b in zip(starts, ends)])
+    cum_nm = np.concatenate([[0.0], np.cumsum(seg_nm)])
+
+    seg_idx, asp_idx = store.tree.query(segments, predicate="intersects")
+    if not seg_idx.size:
+        return []
+    pieces = shapely.intersection(segments[seg_idx], store.geometries[asp_idx])
+    parts, part_of = shapely.get_parts(pieces, return_index=True)
+    is_line = shapely.get_type_id(parts) == shapely.GeometryType.LINESTRING
+    parts, seg, asp = parts[is_line], seg_idx[part_of[is_line]], asp_idx[part_of[is_line]]
+
+    a = shapely.line_locate_point(segments[seg], shapely.get_point(parts, 0), normalized=True)
+    b = shapely.line_locate_point(segments[seg], shapely.get_point(parts, -1), normalized=True)
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    # Lines along the boundary intersect too; a crossing has to pass through the interior.
+    mid = shapely.line_interpolate_point(parts, 0.5, normalized=True)
+    keep = (hi > lo) & shapely.contains_properly(store.geometries[asp], mid)
+    seg, asp, lo, hi = seg[keep], asp[keep], lo[keep], hi[keep]
+
+    entry_nm = cum_nm[seg] + lo * seg_nm[seg]
+    exit_nm = cum_nm[seg] + hi * seg_nm[seg]
+    step = ends[seg] - starts[seg]
+    entry_xy = starts[seg] + lo[:, None] * step
+    exit_xy = starts[seg] + hi[:, None] * step
+
+    crossings: List[Tuple[int, int, int]] = []  # (airspace, first piece, last piece)
+    for k in np.lexsort((entry_nm, asp)).tolist():
+        if crossings and crossings[-1][0] == asp[k]:
+            last = crossings[-1][2]
+            if entry_nm[k] <= exit_nm[last] + MERGE_GAP_NM:
+                if exit_nm[k] > exit_nm[last]:
+                    crossings[-1] = (crossings[-1][0], crossings[-1][1], k)
+                continue
+        crossings.append((int(asp[k]), k, k))
+    crossings.sort(key=lambda c: (entry_nm[c[1]], exit_nm[c[2]], c[0]))
+
+    return [
+        _crossing(
+            store.properties[i],
+            entry_xy[first],
+            exit_xy[last],
+            entry_nm[first],
+            exit_nm[last],
+        )
+        for i, first, last in crossings
+    ]
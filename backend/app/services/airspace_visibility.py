@@ -0,0 +1,236 @@
+"""Visibility-graph airspace avoidance for a single leg.
+
+Airspaces near the leg are projected into a local planar frame (nm, equirectangular about the
+leg midpoint), buffered and merged into obstacles, and the shortest path from origin to
+destination is searched over the obstacles' convex vertices. Visibility edges are computed
+lazily, one vectorized batch per expanded vertex, so work is bounded by the corridor's vertex
+count rather than by the number of airspaces in the dataset.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import shapely
+
+if TYPE_CHECKING:
+    from app.models.airspace_store import AirspaceStore
+
+
+LatLon = Tuple[float, float]
+
+NM_PER_DEG = 60.0
+# Paths keep at least this fraction of the requested buffer; vertices sit at the full buffer,
+# and obstacle outlines are simplified by SIMPLIFY_FRACTION of it in between.
+CLEARANCE_FRACTION = 0.7
+SIMPLIFY_FRACTION = 0.05
+MAX_ROUNDS = 4
+
+
+def _wrap_deg(d):
+    return (np.asarray(d) + 180.0) % 360.0 - 180.0
+
+
+class _LocalProjection:
+    def __init__(self, lat0: float, lon0: float) -> None:
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.kx = NM_PER_DEG * max(math.cos(math.radians(lat0)), 1e-6)
+
+    def forward_coords(self, lonlat: np.ndarray) -> np.ndarray:
+        out = np.empty_like(lonlat, dtype=float)
+        out[:, 0] = _wrap_deg(lonlat[:, 0] - self.lon0) * self.kx
+        out[:, 1] = (lonlat[:, 1] - self.lat0) * NM_PER_DEG
+        return out
+
+    def forward(self, geoms):
+        return shapely.transform(geoms, self.forward_coords)
+
+    def point(self, lat: float, lon: float) -> np.ndarray:
+        return self.forward_coords(np.array([[lon, lat]], dtype=float))[0]
+
+    def inverse(self, x: float, y: float) -> LatLon:
+        lon = float(_wrap_deg(self.lon0 + x / self.kx))
+        return (float(self.lat0 + y / NM_PER_DEG), lon)
+
+    def lonlat_boxes(self, bounds: Sequence[float]) -> List[Tuple[float, float, float, float]]:
+        """Degree boxes covering planar ``bounds``, split at the antimeridian."""
+        min_x, min_y, max_x, max_y = bounds
+        lat_min = self.lat0 + min_y / NM_PER_DEG
+        lat_max = self.lat0 + max_y / NM_PER_DEG
+        lon_min = self.lon0 + min_x / self.kx
+        lon_max = self.lon0 + max_x / self.kx
+        lat_min, lat_max = max(lat_min, -90.0), min(lat_max, 90.0)
+        if lon_max - lon_min >= 360.0:
+            return [(-180.0, lat_min, 180.0, lat_max)]
+        boxes = []
+        if lon_min < -180.0:
+            boxes.append((lon_min + 360.0, lat_min, 180.0, lat_max))
+            lon_min = -180.0
+        if lon_max > 180.0:
+            boxes.append((-180.0, lat_min, lon_max - 360.0, lat_max))
+            lon_max = 180.0
+        boxes.append((lon_min, lat_min, lon_max, lat_max))
+        return boxes
+
+
+def _convex_vertices(obstacles) -> np.ndarray:
+    """Vertices of the merged obstacles that bulge into free space (left turns on CCW rings).
+
+    Shortest paths among polygons only bend at these, so the rest never enter the graph.
+    """
+    from shapely.geometry.polygon import orient
+
+    out: List[np.ndarray] = []
+    for poly in shapely.get_parts(obstacles):
+        if poly.is_empty or poly.geom_type != "Polygon":
+            continue
+        poly = orient(poly, 1.0)
+        for ring in [poly.exterior, *poly.interiors]:
+            pts = np.asarray(ring.coords)[:-1]
+            if len(pts) < 3:
+                continue
+            prev = np.roll(pts, 1, axis=0)
+            nxt = np.roll(pts, -1, axis=0)
+            a = pts - prev
+            b = nxt - pts
+            cross = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+            out.append(pts[cross > 0])
+    return np.concatenate(out) if out else np.empty((0, 2))
+
+
+def _blocked(geoms, blockers: shapely.STRtree) -> np.ndarray:
+    """Indexes of ``geoms`` crossing any of the (prepared) geometries in ``blockers``."""
+    geom_idx, blocker_idx = blockers.query(geoms)
+    hit = shapely.intersects(blockers.geometries[blocker_idx], np.asarray(geoms)[geom_idx])
+    return np.unique(geom_idx[hit])
+
+
+def _shortest_path(
+    start: np.ndarray, goal: np.ndarray, vertices: np.ndarray, blockers
+) -> Optional[List[np.ndarray]]:
+    """A* over the visibility graph of ``vertices``; edges are found per expansion."""
+    nodes = np.vstack([start, goal, vertices])
+    n = len(nodes)
+    h = np.hypot(nodes[:, 0] - goal[0], nodes[:, 1] - goal[1])
+    g = np.full(n, np.inf)
+    parent = np.full(n, -1)
+    closed = np.zeros(n, dtype=bool)
+    g[0] = 0.0
+    heap = [(h[0], 0)]
+    while heap:
+        _, u = heapq.heappop(heap)
+        if closed[u]:
+            continue
+        if u == 1:
+            path = [nodes[1]]
+            while parent[u] >= 0:
+                u = parent[u]
+                path.append(nodes[u])
+            return path[::-1]
+        closed[u] = True
+
+        targets = np.flatnonzero(~closed)
+        lines = shapely.linestrings(
+            np.stack([np.broadcast_to(nodes[u], (len(targets), 2)), nodes[targets]], axis=1)
+        )
+        visible = np.ones(len(targets), dtype=bool)
+        visible[_blocked(lines, blockers)] = False
+        targets = targets[visible]
+        cost = g[u] + np.hypot(nodes[targets, 0] - nodes[u, 0], nodes[targets, 1] - nodes[u, 1])
+        better = cost < g[targets]
+        for v, c in zip(targets[better].tolist(), cost[better].tolist()):
+            g[v] = c
+            parent[v] = u
+            heapq.heappush(heap, (c + h[v], v))
+    return None
+
+
+def visibility_route(
+    origin: LatLon,
+    destination: LatLon,
+    store: "AirspaceStore",
+    *,
+    buffer_nm: float = 5.0,
+    altitude_ft: Optional[float] = None,
+) -> List[LatLon]:
+    """Shortest origin-destination polyline keeping ``buffer_nm`` clear of nearby airspace.
+
+    Turn points sit ``buffer_nm`` out and every leg keeps at least ``CLEARANCE_FRACTION`` of it.
+    Airspace about that close to the origin or destination is ignored (departing from or
+    arriving into it is not avoidable). Paths are checked against every airspace afterwards;
+    any the corridor missed are added and the search repeats, at most ``MAX_ROUNDS`` times,
+    after which the last path is returned. Returns the direct leg when no path exists.
+    With ``altitude_ft`` (MSL), airspace whose vertical limits exclude it is ignored too.
+    """
+    direct = [origin, destination]
+    if store.empty or buffer_nm <= 0:
+        return direct
+
+    o_lon = float(origin[1])
+    d_lon = o_lon + float(_wrap_deg(float(destination[1]) - o_lon))
+    proj = _LocalProjection(
+        (float(origin[0]) + float(destination[0])) / 2.0, float(_wrap_deg((o_lon + d_lon) / 2.0))
+    )
+    start = proj.point(*origin)
+    goal = proj.point(*destination)
+    leg = shapely.linestrings([start, goal])
+    clearance = buffer_nm * CLEARANCE_FRACTION
+    tol = buffer_nm * SIMPLIFY_FRACTION
+    # How far a blocker can reach past its raw airspace (simplification plus padded buffer).
+    reach = clearance + 2.0 * tol
+    endpoints = shapely.points([start, goal])
+
+    tree = store.avoidance_tree
+    geoms = store.avoidance_geometries
+    projected: Dict[int, object] = {}
+    ignored: Set[int] = set(np.flatnonzero(~store.altitude_mask(altitude_ft)).tolist())
+
+    def near(path_xy, dist_nm: float) -> Set[int]:
+        """Indexes of non-ignored airspaces within ``dist_nm`` of the planar ``path_xy``."""
+        boxes = proj.lonlat_boxes(shapely.buffer(path_xy, dist_nm).bounds)
+        idx = np.unique(np.concatenate([tree.query(shapely.box(*b)) for b in boxes]))
+        out: Set[int] = set()
+        for i in idx.tolist():
+            if i in ignored:
+                continue
+            if i not in projected:
+                projected[i] = proj.forward(geoms[i])
+                if shapely.dwithin(projected[i], endpoints, reach).any():
+                    ignored.add(i)
+                    continue
+            if shapely.dwithin(projected[i], path_xy, dist_nm):
+                out.add(i)
+        return out
+
+    corridor = near(leg, max(4.0 * buffer_nm, 0.25 * float(shapely.length(leg))))
+    route = direct
+    for _ in range(MAX_ROUNDS):
+        if not corridor:
+            return direct
+        # Simplify once, then pad every buffer by the tolerance so nothing is lost.
+        raw = shapely.simplify(shapely.union_all([projected[i] for i in sorted(corridor)]), tol)
+        blocked = shapely.get_parts(shapely.buffer(raw, clearance + tol, quad_segs=2))
+        shapely.prepare(blocked)
+        blockers = shapely.STRtree(blocked)
+        if _blocked([leg], blockers).size == 0:
+            return direct
+
+        hull = shapely.simplify(shapely.buffer(raw, buffer_nm + tol, quad_segs=3), tol)
+        vertices = _convex_vertices(hull)
+        if len(vertices):
+            vertices = np.delete(vertices, _blocked(shapely.points(vertices), blockers), axis=0)
+
+        path = _shortest_path(start, goal, vertices, blockers)
+        if path is None:
+            return direct
+
+        route = [origin, *[proj.inverse(*p) for p in path[1:-1]], destination]
+        missed = near(shapely.linestrings(np.asarray(path)), clearance) - corridor
+        if not missed:
+            return route
+        corridor |= missed
+    return route
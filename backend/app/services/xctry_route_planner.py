@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import json
 import math
-import os
 from dataclasses import dataclass
-from functools import lru_cache
-from pathlib import Path
-from typing import List, Tuple
+from typing import List, Literal, Optional, Tuple
+
+from app.models.airspace_obstacles import ObstacleLayers
+from app.models.airspace_store import AirspaceStore, airspace_store
+from app.utils.data_loader import load_obstacles_snapshot
+from app.utils.data_versions import DataVersion, current_data, register_index
 
 
 def haversine_nm(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -43,50 +44,105 @@ class RouteSegment:
     vfr_altitude_ft: int
 
 
-def _default_airspaces_path() -> Path:
-    repo_root = Path(__file__).resolve().parents[3]
-    return repo_root / "backend" / "data" / "airspaces_us.json"
-
-
-@lru_cache
-def load_airspaces_gdf():
-    path = Path(os.environ.get("AIRSPACES_FILE", str(_default_airspaces_path())))
-    if not path.exists():
-        raise FileNotFoundError(str(path))
-
-    import geopandas as gpd
-    from shapely.geometry import shape
-
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    features = []
-    for asp in raw:
-        geom = asp.get("geometry")
-        if not geom:
-            continue
-        try:
-            features.append(
-                {
-                    "geometry": shape(geom),
-                    "name": asp.get("name"),
-                    "class": asp.get("category"),
-                    "type": asp.get("type"),
-                    "id": asp.get("id"),
-                }
-            )
-        except Exception:
-            continue
+def load_airspace_store() -> AirspaceStore:
+    """The shared airspace store; raises FileNotFoundError when no airspace file exists."""
+    store = airspace_store()
+    if store.source is None:
+        raise FileNotFoundError(str(current_data().files["airspace"]))
+    return store
+
+
+def load_obstacle_layers() -> Optional[ObstacleLayers]:
+    return current_data().index("airspace_obstacles")
+
+
+def _build_obstacle_layers(version: DataVersion) -> Optional[ObstacleLayers]:
+    snapshot = load_obstacles_snapshot(version.files["obstacles"])
+    if snapshot is None:
+        return None
+    # Built from, and checked against, the same file the airspace store loads.
+    source = "airspace" if version.files["airspace"].exists() else "airspaces_us"
+    return ObstacleLayers.from_snapshot(snapshot, version.file_sha256(source))
+
+
+register_index("airspace_obstacles", _build_obstacle_layers)
+
+# Detour points on a prebuffered obstacle are pushed this far (~0.1 nm) past its boundary.
+_OBSTACLE_MARGIN_DEG = 0.00167
 
-    return gpd.GeoDataFrame(features, crs="EPSG:4326")
+
+def _exit_point(seg, obstacle) -> Tuple[float, float]:
+    """(lat, lon) just outside a prebuffered ``obstacle``, beside the segment's crossing.
+
+    From the middle of the part of ``seg`` inside the obstacle, step perpendicular to the
+    segment to the nearer boundary crossing, then ``_OBSTACLE_MARGIN_DEG`` beyond it.
+    """
+    import shapely
+    from shapely.geometry import LineString
+
+    parts = shapely.get_parts(seg.intersection(obstacle))
+    inside = max(
+        (p for p in parts if p.geom_type == "LineString" and p.length > 0),
+        key=lambda g: g.length,
+    )
+    mid = inside.interpolate(0.5, normalized=True)
+    (x0, y0), (x1, y1) = seg.coords[0], seg.coords[-1]
+    length = math.hypot(x1 - x0, y1 - y0) or 1.0
+    nx, ny = -(y1 - y0) / length, (x1 - x0) / length
+    minx, miny, maxx, maxy = obstacle.bounds
+    reach = math.hypot(maxx - minx, maxy - miny) + 1.0
+    normal = LineString(
+        [(mid.x - nx * reach, mid.y - ny * reach), (mid.x + nx * reach, mid.y + ny * reach)]
+    )
+    crossings = shapely.get_coordinates(normal.intersection(obstacle.boundary))
+    ex, ey = min(crossings.tolist(), key=lambda c: math.hypot(c[0] - mid.x, c[1] - mid.y))
+    dx, dy = ex - mid.x, ey - mid.y
+    norm = math.hypot(dx, dy) or 1.0
+    return (ey + _OBSTACLE_MARGIN_DEG * dy / norm, ex + _OBSTACLE_MARGIN_DEG * dx / norm)
 
 
 def avoid_airspaces(
-    route_points: List[Tuple[float, float]], buffer_nm: float = 5.0
+    route_points: List[Tuple[float, float]],
+    buffer_nm: float = 5.0,
+    altitude_ft: Optional[float] = None,
 ) -> List[Tuple[float, float]]:
+    """Detour ``route_points`` around airspace; with ``altitude_ft`` (MSL), only around
+    airspace whose vertical limits may contain it."""
+    import numpy as np
+    import shapely
     from shapely.geometry import LineString
 
-    airspaces_gdf = load_airspaces_gdf()
-    if airspaces_gdf.empty:
-        return route_points
+    # Prefer obstacle layers prebuffered by exactly `buffer_nm`: a few merged polygons instead
+    # of every overlapping raw airspace. The STRtrees and prepared geometries live as long as
+    # the data version, so each segment only pays exact tests against its bbox candidates.
+    # Airspace over- or underflown at `altitude_ft` is dropped from the candidates up front.
+    layers = load_obstacle_layers()
+    obstacle_layers = layers.for_buffer(buffer_nm) if layers is not None else []
+    prebuffered = bool(obstacle_layers)
+    if prebuffered:
+        sources = [
+            (layer.tree, layer.geometries, layer.altitude_mask(altitude_ft))
+            for layer in obstacle_layers
+        ]
+    else:
+        store = load_airspace_store()
+        if store.empty:
+            return route_points
+        sources = [
+            (store.avoidance_tree, store.avoidance_geometries, store.altitude_mask(altitude_ft))
+        ]
+
+    def first_hit(seg):
+        for tree, geoms, allowed in sources:
+            candidates = np.sort(tree.query(seg))
+            candidates = candidates[allowed[candidates]]
+            shapely.prepare(geoms[candidates])
+            hits = candidates[shapely.intersects(geoms[candidates], seg)]
+            # Touching a vertex or running along the boundary is not entering the airspace.
+            hits = hits[shapely.relate_pattern(geoms[hits], seg, "T********")]
+            if hits.size:
+                return geoms[hits[0]]
+        return None
 
     changed = True
     max_iter = 10
@@ -103,14 +159,16 @@ def avoid_airspaces(
                     (route_points[i + 1][1], route_points[i + 1][0]),
                 ]
             )
-            intersecting = airspaces_gdf[airspaces_gdf.intersects(seg)]
-            if not intersecting.empty:
-                asp = intersecting.iloc[0]
-                boundary = asp.geometry.boundary
-                mid = seg.interpolate(0.5, normalized=True)
-                closest = boundary.interpolate(boundary.project(mid))
-                offset_lat = closest.y + buffer_nm * 0.0167
-                offset_lon = closest.x + buffer_nm * 0.0167
+            obstacle = first_hit(seg)
+            if obstacle is not None:
+                if prebuffered:
+                    offset_lat, offset_lon = _exit_point(seg, obstacle)
+                else:
+                    boundary = obstacle.boundary
+                    mid = seg.interpolate(0.5, normalized=True)
+                    closest = boundary.interpolate(boundary.project(mid))
+                    offset_lat = closest.y + buffer_nm * 0.0167
+                    offset_lon = closest.x + buffer_nm * 0.0167
                 new_points.append((offset_lat, offset_lon))
 
                 # Preserve the remaining route points (including the destination).
@@ -166,12 +224,26 @@ def plan_route(
     *,
     avoid_airspaces_enabled: bool = False,
     airspace_buffer_nm: float = 5.0,
+    airspace_avoidance_mode: Literal["offset", "visibility"] = "offset",
 ) -> Tuple[List[Tuple[float, float]], List[RouteSegment]]:
     points, _ = plan_direct_route(
         origin=origin, destination=destination, cruising_altitude_ft=cruising_altitude_ft
     )
 
     if avoid_airspaces_enabled:
-        points = avoid_airspaces(points, buffer_nm=airspace_buffer_nm)
+        if airspace_avoidance_mode == "visibility":
+            from app.services.airspace_visibility import visibility_route
+
+            points = visibility_route(
+                origin,
+                destination,
+                load_airspace_store(),
+                buffer_nm=airspace_buffer_nm,
+                altitude_ft=cruising_altitude_ft,
+            )
+        else:
+            points = avoid_airspaces(
+                points, buffer_nm=airspace_buffer_nm, altitude_ft=cruising_altitude_ft
+            )
 
     return points, _build_segments(points, cruising_altitude_ft)
@@ -3,9 +3,11 @@ from __future__ import annotations
 import json
 import logging
 import os
-from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Mapping, Optional
+from typing import Any, Dict, Mapping, Optional
+
+from app.models.airport_table import AirportTable
+from app.utils.snapshot import Snapshot, SnapshotError, open_snapshot, snapshot_path_for
 
 
 logger = logging.getLogger(__name__)
@@ -27,74 +29,146 @@ def _default_airspace_path() -> Path:
     return _backend_data_dir() / "airspace_cache.json"
 
 
+def _default_airspaces_us_path() -> Path:
+    return _backend_data_dir() / "airspaces_us.json"
+
+
+def _default_landmarks_path() -> Path:
+    return _backend_data_dir() / "fuel_stop_landmarks.bin"
+
+
+def _default_obstacles_path() -> Path:
+    return _backend_data_dir() / "airspace_obstacles.bin"
+
+
+def _default_tiles_dir() -> Path:
+    return _backend_data_dir() / "tiles"
+
+
+def airports_path() -> Path:
+    return Path(os.environ.get("AIRPORT_CACHE_FILE", str(_default_airports_path())))
+
+
+def airspace_path() -> Path:
+    return Path(os.environ.get("AIRSPACE_CACHE_FILE", str(_default_airspace_path())))
+
+
+def airspaces_us_path() -> Path:
+    return Path(os.environ.get("AIRSPACES_FILE", str(_default_airspaces_us_path())))
+
+
+def landmarks_path() -> Path:
+    return Path(os.environ.get("FUEL_STOP_LANDMARKS_FILE", str(_default_landmarks_path())))
+
+
+def obstacles_path() -> Path:
+    return Path(os.environ.get("AIRSPACE_OBSTACLES_FILE", str(_default_obstacles_path())))
+
+
+def tiles_dir() -> Path:
+    return Path(os.environ.get("MAP_TILES_DIR", str(_default_tiles_dir())))
+
+
 def read_json(path: Path) -> Any:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-@lru_cache(maxsize=32)
-def read_json_cached(path_str: str, mtime_ns: int) -> Any:
-    path = Path(path_str)
-    return read_json(path)
+def _fresh_snapshot_path(json_path: Path) -> Optional[Path]:
+    """Return the binary snapshot built alongside ``json_path``, unless the JSON is newer."""
+    snapshot_path = snapshot_path_for(json_path)
+    if not snapshot_path.exists():
+        return None
+    if json_path.exists() and json_path.stat().st_mtime_ns > snapshot_path.stat().st_mtime_ns:
+        logger.warning("Ignoring stale snapshot %s (older than %s)", snapshot_path, json_path)
+        return None
+    return snapshot_path
+
+
+def load_snapshot(json_path: Path, *, kind: str) -> Optional[Snapshot]:
+    """Return the memory-mapped snapshot for a JSON cache file, or None to use the JSON."""
+    snapshot_path = _fresh_snapshot_path(json_path)
+    if snapshot_path is None:
+        return None
+
+    try:
+        return open_snapshot(snapshot_path, kind=kind)
+    except (OSError, SnapshotError) as e:
+        logger.warning("Failed to open snapshot %s, falling back to JSON: %s", snapshot_path, e)
+        return None
+
 
+def load_airports(path: Optional[Path] = None) -> AirportTable:
+    """Read the airport cache (snapshot if fresh, else JSON) into a new `AirportTable`.
 
-def load_json_cached(path: Path) -> Any:
-    if not path.exists():
-        raise FileNotFoundError(path)
-    stat = path.stat()
-    return read_json_cached(str(path), stat.st_mtime_ns)
+    This always reads from disk; the shared per-version table lives in `app.utils.data_versions`.
+    """
 
+    airports_file = path or airports_path()
 
-def load_airports(path: Optional[Path] = None) -> List[Dict[str, Any]]:
-    airports_path = path or Path(
-        os.environ.get("AIRPORT_CACHE_FILE", str(_default_airports_path()))
-    )
-    if not airports_path.exists():
-        logger.warning("Airport cache file not found at %s", airports_path)
-        return []
+    snapshot = load_snapshot(airports_file, kind="airports")
+    if snapshot is not None:
+        return AirportTable.from_snapshot(snapshot)
+
+    if not airports_file.exists():
+        logger.warning("Airport cache file not found at %s", airports_file)
+        return AirportTable.from_records([])
 
     try:
-        data = load_json_cached(airports_path)
-        if isinstance(data, list):
-            return [v for v in data if isinstance(v, dict)]
-        logger.error("Airport cache at %s did not contain a JSON list", airports_path)
-        return []
+        data = read_json(airports_file)
     except Exception as e:
-        logger.error("Failed to load airport cache from %s: %s", airports_path, e)
-        return []
+        logger.error("Failed to load airport cache from %s: %s", airports_file, e)
+        return AirportTable.from_records([])
 
+    if isinstance(data, list):
+        return AirportTable.from_records(v for v in data if isinstance(v, dict))
+    logger.error("Airport cache at %s did not contain a JSON list", airports_file)
+    return AirportTable.from_records([])
 
-def build_airport_index(airports: Iterable[Mapping[str, Any]]) -> Dict[str, Dict[str, Any]]:
-    index: Dict[str, Dict[str, Any]] = {}
-    for airport in airports:
-        icao = str(airport.get("icao") or airport.get("icaoCode") or "").strip().upper()
-        iata = str(airport.get("iata") or airport.get("iataCode") or "").strip().upper()
 
-        normalized: Dict[str, Any] = dict(airport)
+def load_airspace_snapshot(path: Optional[Path] = None) -> Optional[Snapshot]:
+    return load_snapshot(path or airspace_path(), kind="airspaces")
 
-        if icao:
-            index[icao] = normalized
-        if iata and iata not in index:
-            index[iata] = normalized
 
-    return index
+def load_landmarks_snapshot(path: Optional[Path] = None) -> Optional[Snapshot]:
+    """Open the fuel-stop landmark tables built by ``scripts/build_landmarks.py``, if present."""
+    landmarks_file = path or landmarks_path()
+    if not landmarks_file.exists():
+        return None
+
+    try:
+        return open_snapshot(landmarks_file, kind="landmarks")
+    except (OSError, SnapshotError) as e:
+        logger.warning("Failed to open landmark tables %s: %s", landmarks_file, e)
+        return None
+
+
+def load_obstacles_snapshot(path: Optional[Path] = None) -> Optional[Snapshot]:
+    """Open the buffered airspace obstacle layers built by ``scripts/build_data_caches.py``."""
+    obstacles_file = path or obstacles_path()
+    if not obstacles_file.exists():
+        return None
+
+    try:
+        return open_snapshot(obstacles_file, kind="obstacles")
+    except (OSError, SnapshotError) as e:
+        logger.warning("Failed to open airspace obstacle layers %s: %s", obstacles_file, e)
+        return None
 
 
 def load_airspace(path: Optional[Path] = None) -> Dict[str, Any]:
-    airspace_path = path or Path(
-        os.environ.get("AIRSPACE_CACHE_FILE", str(_default_airspace_path()))
-    )
-    if not airspace_path.exists():
-        logger.warning("Airspace cache file not found at %s", airspace_path)
+    airspace_file = path or airspace_path()
+    if not airspace_file.exists():
+        logger.warning("Airspace cache file not found at %s", airspace_file)
         return {}
 
     try:
-        data = load_json_cached(airspace_path)
+        data = read_json(airspace_file)
         if isinstance(data, dict):
             return data
-        logger.error("Airspace cache at %s did not contain a JSON object", airspace_path)
+        logger.error("Airspace cache at %s did not contain a JSON object", airspace_file)
         return {}
     except Exception as e:
-        logger.error("Failed to load airspace cache from %s: %s", airspace_path, e)
+        logger.error("Failed to load airspace cache from %s: %s", airspace_file, e)
         return {}
 
 
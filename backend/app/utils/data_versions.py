@@ -0,0 +1,244 @@
+"""Hot-reloadable, versioned data caches.
+
+All request-path readers go through `current_data()`, which is a single attribute read: no
+`stat`, no parse. A background poller (started from the app lifespan) watches the cache files,
+loads a changed generation off the request path, builds every registered index for it, and then
+swaps one reference. In-flight requests keep the generation they started with; once they finish
+the old generation is garbage collected, so at most two generations are ever resident.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from app.models.airport_table import AirportTable
+from app.utils.data_loader import (
+    airports_path,
+    airspace_path,
+    airspaces_us_path,
+    landmarks_path,
+    load_airports,
+    obstacles_path,
+)
+from app.utils.snapshot import snapshot_path_for
+
+
+logger = logging.getLogger(__name__)
+
+
+IndexBuilder = Callable[["DataVersion"], Any]
+FileSignature = Tuple[Tuple[str, Optional[Tuple[int, int]]], ...]
+
+_INDEX_BUILDERS: Dict[str, IndexBuilder] = {}
+
+
+def register_index(name: str, build: IndexBuilder) -> None:
+    """Register a derived index that is built once per data version.
+
+    Registered indexes are built by the background reloader before a new version is swapped
+    in, and lazily on first use otherwise.
+    """
+
+    _INDEX_BUILDERS[name] = build
+
+
+def data_files() -> Dict[str, Path]:
+    return {
+        "airports": airports_path(),
+        "airspace": airspace_path(),
+        "airspaces_us": airspaces_us_path(),
+        "landmarks": landmarks_path(),
+        "obstacles": obstacles_path(),
+    }
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def file_signature(files: Mapping[str, Path]) -> FileSignature:
+    """Return the (mtime, size) of every cache file and its binary snapshot."""
+    out = []
+    for name in sorted(files):
+        path = files[name]
+        for p in dict.fromkeys((path, snapshot_path_for(path))):
+            out.append((str(p), _stat_key(p)))
+    return tuple(out)
+
+
+class DataVersion:
+    """One immutable generation of the cached datasets and their derived indexes."""
+
+    def __init__(
+        self,
+        *,
+        number: int,
+        files: Mapping[str, Path],
+        signature: FileSignature,
+        airports: AirportTable,
+    ) -> None:
+        self.number = number
+        self.files = dict(files)
+        self.signature = signature
+        self.airports = airports
+        self._indexes: Dict[str, Any] = {}
+        self._hashes: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        # Separate from `_lock`, which is held while index builders (that may hash) run.
+        self._hash_lock = threading.Lock()
+
+    def index(self, name: str) -> Any:
+        """Return the registered index ``name`` for this version, building it on first use."""
+        try:
+            return self._indexes[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = _INDEX_BUILDERS[name](self)
+            return self._indexes[name]
+
+    def file_sha256(self, name: str) -> Optional[str]:
+        """SHA-256 hex digest of ``files[name]`` (None if unreadable), hashed once per version.
+
+        Derived files record their source's digest (see ``scripts/build_data_caches.py``);
+        comparing it catches edits that keep the file size.
+        """
+        with self._hash_lock:
+            if name not in self._hashes:
+                try:
+                    digest = hashlib.sha256()
+                    with self.files[name].open("rb") as f:
+                        for chunk in iter(lambda: f.read(1 << 20), b""):
+                            digest.update(chunk)
+                    self._hashes[name] = digest.hexdigest()
+                except OSError:
+                    self._hashes[name] = None
+            return self._hashes[name]
+
+    def warm(self) -> "DataVersion":
+        """Build the airport indexes and every registered index ahead of the first request."""
+        self.airports.warm()
+        for name in list(_INDEX_BUILDERS):
+            try:
+                self.index(name)
+            except Exception as e:
+                logger.warning("Data version %s: failed to build %s: %s", self.number, name, e)
+        return self
+
+
+class DataVersionManager:
+    def __init__(self) -> None:
+        self._current: Optional[DataVersion] = None
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self, number: int) -> DataVersion:
+        files = data_files()
+        # Take the signature before reading so a write racing the load triggers another reload.
+        signature = file_signature(files)
+        return DataVersion(
+            number=number,
+            files=files,
+            signature=signature,
+            airports=load_airports(files["airports"]),
+        )
+
+    def current(self) -> DataVersion:
+        version = self._current
+        if version is not None:
+            return version
+
+        with self._load_lock:
+            if self._current is None:
+                self._current = self._load(1)
+            return self._current
+
+    def refresh(self) -> bool:
+        """Swap in a new, fully indexed version if any cache file changed.
+
+        Returns True when a new version was published.
+        """
+
+        with self._refresh_lock:
+            current = self.current()
+            if file_signature(data_files()) == current.signature:
+                return False
+
+            version = self._load(current.number + 1).warm()
+            self._current = version
+
+        logger.info("Loaded data version %s", version.number)
+        return True
+
+    def reset(self) -> None:
+        with self._load_lock:
+            self._current = None
+
+    def _run(self, interval_s: float) -> None:
+        try:
+            self.current().warm()
+        except Exception as e:
+            logger.error("Failed to warm data version: %s", e)
+
+        if interval_s <= 0:
+            return
+        while not self._stop.wait(interval_s):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Data reload failed: %s", e)
+
+    def start(self, *, interval_s: Optional[float] = None) -> None:
+        """Warm the current version and poll the cache files in a daemon thread.
+
+        ``interval_s`` defaults to ``DATA_RELOAD_INTERVAL_S`` (30s); 0 disables polling.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        if interval_s is None:
+            interval_s = _reload_interval_s()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(interval_s,),
+            name="data-version-reloader",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5.0)
+
+
+def _reload_interval_s() -> float:
+    raw = os.environ.get("DATA_RELOAD_INTERVAL_S")
+    if raw is None:
+        return 30.0
+    try:
+        return float(raw)
+    except Exception:
+        return 30.0
+
+
+data_versions = DataVersionManager()
+
+
+def current_data() -> DataVersion:
+    return data_versions.current()
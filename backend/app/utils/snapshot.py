@@ -0,0 +1,248 @@
+"""Binary, memory-mappable data snapshots.
+
+A snapshot is a single file:
+
+    MAGIC (8 bytes) | manifest length (uint64 LE) | JSON manifest | 8-byte aligned sections
+
+Every section is a flat little-endian array described in the manifest by dtype, offset and
+count. String and blob columns are stored as an int64 offsets section plus a byte section
+(and, for nullable strings, a bool mask), so readers can `mmap` the file and slice columns
+without a parse step. The OS page cache shares the mapped pages across worker processes.
+
+This module only depends on NumPy so the offline build script can load it directly.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+SNAPSHOT_MAGIC = b"FPSNAP\x00\x00"
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = ".bin"
+
+_ALIGN = 8
+_HEADER = struct.Struct("<8sQ")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def snapshot_path_for(path: Path) -> Path:
+    """Return the snapshot file that sits next to the JSON cache at ``path``."""
+    return path.with_suffix(SNAPSHOT_SUFFIX)
+
+
+class BlobColumn(Sequence[bytes]):
+    """Variable-length byte strings backed by an offsets array and one byte buffer."""
+
+    def __init__(self, offsets: np.ndarray, data: memoryview) -> None:
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return max(0, len(self._offsets) - 1)
+
+    def _bounds(self, i: int) -> tuple[int, int]:
+        i = range(len(self))[i]
+        return int(self._offsets[i]), int(self._offsets[i + 1])
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        start, end = self._bounds(i)
+        return bytes(self._data[start:end])
+
+    def __iter__(self) -> Iterator[bytes]:
+        offsets = self._offsets.tolist()
+        data = self._data
+        for start, end in zip(offsets, offsets[1:]):
+            yield bytes(data[start:end])
+
+
+class StringColumn(Sequence[Optional[str]]):
+    """UTF-8 strings decoded on access from a `BlobColumn`; masked rows read as None."""
+
+    def __init__(self, blobs: BlobColumn, nulls: Optional[np.ndarray] = None) -> None:
+        self._blobs = blobs
+        self._nulls = nulls
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if self._nulls is not None and self._nulls[i]:
+            return None
+        start, end = self._blobs._bounds(i)
+        return str(self._blobs._data[start:end], "utf-8")
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        offsets = self._blobs._offsets.tolist()
+        data = self._blobs._data
+        nulls = self._nulls.tolist() if self._nulls is not None else None
+        for i, (start, end) in enumerate(zip(offsets, offsets[1:])):
+            if nulls is not None and nulls[i]:
+                yield None
+            else:
+                yield str(data[start:end], "utf-8")
+
+
+class Snapshot:
+    """A read-only, memory-mapped snapshot file.
+
+    Arrays returned by `array` are zero-copy views of the mapping. The mapping stays open for
+    the lifetime of the object, so keep the snapshot alive while its columns are in use.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise SnapshotError(f"Empty snapshot file: {self.path}") from e
+
+        if len(self._mm) < _HEADER.size:
+            raise SnapshotError(f"Truncated snapshot header: {self.path}")
+        magic, manifest_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"Not a snapshot file: {self.path}")
+
+        manifest_end = _HEADER.size + manifest_len
+        manifest = json.loads(bytes(self._mm[_HEADER.size : manifest_end]).decode("utf-8"))
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError(
+                f"Unsupported snapshot format {manifest.get('format')!r} in {self.path}"
+            )
+
+        self.kind: str = str(manifest.get("kind") or "")
+        self.count: int = int(manifest.get("count") or 0)
+        self.meta: Dict[str, Any] = dict(manifest.get("meta") or {})
+        self._sections: Dict[str, Dict[str, Any]] = dict(manifest.get("sections") or {})
+
+        for name, section in self._sections.items():
+            nbytes = int(section["count"]) * np.dtype(section["dtype"]).itemsize
+            if int(section["offset"]) + nbytes > len(self._mm):
+                raise SnapshotError(f"Section {name!r} extends past the end of {self.path}")
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._sections or f"{name}.offsets" in self._sections
+
+    def array(self, name: str) -> np.ndarray:
+        try:
+            section = self._sections[name]
+        except KeyError as e:
+            raise SnapshotError(f"Snapshot {self.path} has no section {name!r}") from e
+        return np.frombuffer(
+            self._mm,
+            dtype=np.dtype(section["dtype"]),
+            count=int(section["count"]),
+            offset=int(section["offset"]),
+        )
+
+    def blobs(self, name: str) -> BlobColumn:
+        data = self.array(f"{name}.data")
+        return BlobColumn(self.array(f"{name}.offsets"), memoryview(data))
+
+    def strings(self, name: str) -> StringColumn:
+        nulls = self.array(f"{name}.nulls") if f"{name}.nulls" in self._sections else None
+        return StringColumn(self.blobs(name), nulls)
+
+
+def open_snapshot(path: Path, *, kind: str) -> Snapshot:
+    snapshot = Snapshot(path)
+    if snapshot.kind != kind:
+        raise SnapshotError(f"Expected a {kind!r} snapshot, found {snapshot.kind!r} in {path}")
+    return snapshot
+
+
+def _blob_sections(values: Sequence[bytes]) -> tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(values) + 1, dtype="<i8")
+    if len(values):
+        np.cumsum([len(v) for v in values], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(values), dtype=np.uint8)
+
+
+def write_snapshot(
+    path: Path,
+    *,
+    kind: str,
+    count: int,
+    arrays: Optional[Mapping[str, np.ndarray]] = None,
+    strings: Optional[Mapping[str, Sequence[Optional[str]]]] = None,
+    blobs: Optional[Mapping[str, Sequence[bytes]]] = None,
+    meta: Optional[Mapping[str, Any]] = None,
+) -> None:
+    """Write a snapshot atomically (temp file + rename).
+
+    Replacing the file never disturbs processes that still have the previous version mapped.
+    """
+
+    sections: Dict[str, np.ndarray] = {}
+    for name, values in (arrays or {}).items():
+        arr = np.asarray(values)
+        sections[name] = arr.astype(arr.dtype.newbyteorder("<"), copy=False)
+    for name, str_values in (strings or {}).items():
+        encoded = [(v or "").encode("utf-8") for v in str_values]
+        sections[f"{name}.offsets"], sections[f"{name}.data"] = _blob_sections(encoded)
+        if any(v is None for v in str_values):
+            sections[f"{name}.nulls"] = np.array([v is None for v in str_values], dtype=bool)
+    for name, blob_values in (blobs or {}).items():
+        sections[f"{name}.offsets"], sections[f"{name}.data"] = _blob_sections(list(blob_values))
+
+    def manifest_bytes(offsets: Mapping[str, int]) -> bytes:
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "kind": kind,
+            "count": int(count),
+            "meta": dict(meta or {}),
+            "sections": {
+                name: {"dtype": arr.dtype.str, "offset": offsets[name], "count": int(arr.size)}
+                for name, arr in sections.items()
+            },
+        }
+        return json.dumps(manifest, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+    def layout(data_start: int) -> Dict[str, int]:
+        offsets: Dict[str, int] = {}
+        pos = data_start
+        for name, arr in sections.items():
+            pos = -(-pos // _ALIGN) * _ALIGN
+            offsets[name] = pos
+            pos += arr.nbytes
+        return offsets
+
+    # Section offsets are written into the manifest, whose length depends on those offsets;
+    # iterate until the layout is stable (in practice, twice).
+    offsets = layout(0)
+    while True:
+        header = manifest_bytes(offsets)
+        data_start = _HEADER.size + len(header)
+        new_offsets = layout(data_start)
+        if new_offsets == offsets:
+            break
+        offsets = new_offsets
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("wb") as f:
+        f.write(_HEADER.pack(SNAPSHOT_MAGIC, len(header)))
+        f.write(header)
+        pos = data_start
+        for name, arr in sections.items():
+            pad = offsets[name] - pos
+            if pad:
+                f.write(b"\x00" * pad)
+            f.write(np.ascontiguousarray(arr).tobytes())
+            pos = offsets[name] + arr.nbytes
+    os.replace(tmp, path)
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)))
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    lat_r = math.radians(lat)
+    lon_r = math.radians(lon)
+    cos_lat = math.cos(lat_r)
+    return (cos_lat * math.cos(lon_r), cos_lat * math.sin(lon_r), math.sin(lat_r))
+
+
+def _chord_for_nm(nm: float) -> float:
+    theta = min(math.pi, max(0.0, float(nm)) / EARTH_RADIUS_NM)
+    return 2.0 * math.sin(theta / 2.0)
+
+
+def _nm_for_chord(chord: np.ndarray) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_NM * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+
+
+class SphericalIndex:
+    """KD-tree over points on the unit sphere.
+
+    Points are stored as 3D unit vectors, so straight-line (chord) distance is monotonic in
+    great-circle distance and the usual axis-aligned box pruning applies without any special
+    handling of the poles or the antimeridian. Leaves are scanned with vectorized NumPy.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, *, leaf_size: int = 32) -> None:
+        self._xyz = _unit_vectors(
+            np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        )
+        n = len(self._xyz)
+
+        perm = np.arange(n, dtype=np.int64)
+        starts: List[int] = []
+        ends: List[int] = []
+        lows: List[Tuple[float, float, float]] = []
+        highs: List[Tuple[float, float, float]] = []
+        children: List[Tuple[int, int]] = []
+
+        def add_node(start: int, end: int) -> int:
+            pts = self._xyz[perm[start:end]]
+            lo = pts.min(axis=0) if end > start else np.zeros(3)
+            hi = pts.max(axis=0) if end > start else np.zeros(3)
+            starts.append(start)
+            ends.append(end)
+            lows.append((float(lo[0]), float(lo[1]), float(lo[2])))
+            highs.append((float(hi[0]), float(hi[1]), float(hi[2])))
+            children.append((-1, -1))
+            return len(starts) - 1
+
+        stack = [add_node(0, n)]
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            if end - start <= leaf_size:
+                continue
+
+            lo, hi = lows[node], highs[node]
+            axis = max(range(3), key=lambda a: hi[a] - lo[a])
+            mid = (start + end) // 2
+            seg = perm[start:end]
+            order = np.argpartition(self._xyz[seg, axis], mid - start)
+            perm[start:end] = seg[order]
+
+            left = add_node(start, mid)
+            right = add_node(mid, end)
+            children[node] = (left, right)
+            stack.extend((left, right))
+
+        self._perm = perm
+        self._starts = starts
+        self._ends = ends
+        self._lows = lows
+        self._highs = highs
+        self._children = children
+
+    def __len__(self) -> int:
+        return len(self._xyz)
+
+    @staticmethod
+    def _box_dist2(q: Tuple[float, float, float], lo, hi) -> float:
+        d2 = 0.0
+        for a in range(3):
+            if q[a] < lo[a]:
+                d2 += (lo[a] - q[a]) ** 2
+            elif q[a] > hi[a]:
+                d2 += (q[a] - hi[a]) ** 2
+        return d2
+
+    def _leaf_chords(self, q: Tuple[float, float, float], rows: np.ndarray) -> np.ndarray:
+        diff = self._xyz[rows] - np.asarray(q)
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def query_radius(self, lat: float, lon: float, nm: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, distances_nm) for every point within ``nm``, ordered by row."""
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        q = _unit_vector(lat, lon)
+        chord = _chord_for_nm(nm)
+        chord2 = chord * chord
+
+        chunks: List[np.ndarray] = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_dist2(q, self._lows[node], self._highs[node]) > chord2:
+                continue
+            left, right = self._children[node]
+            if left < 0:
+                chunks.append(self._perm[self._starts[node] : self._ends[node]])
+            else:
+                stack.extend((left, right))
+
+        if not chunks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        rows = np.concatenate(chunks)
+        chords = self._leaf_chords(q, rows)
+        keep = chords <= chord
+        rows, chords = rows[keep], chords[keep]
+        order = np.argsort(rows, kind="stable")
+        return rows[order], _nm_for_chord(chords[order])
+
+    def query_knn(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (rows, distances_nm) of the ``k`` nearest points, nearest first."""
+        k = min(int(k), len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        q = _unit_vector(lat, lon)
+        best_rows = np.empty(0, dtype=np.int64)
+        best_chords = np.empty(0, dtype=np.float64)
+        worst2 = math.inf
+
+        heap: List[Tuple[float, int]] = [(0.0, 0)]
+        while heap:
+            d2, node = heapq.heappop(heap)
+            if d2 > worst2:
+                break
+            left, right = self._children[node]
+            if left >= 0:
+                for child in (left, right):
+                    cd2 = self._box_dist2(q, self._lows[child], self._highs[child])
+                    if cd2 <= worst2:
+                        heapq.heappush(heap, (cd2, child))
+                continue
+
+            rows = self._perm[self._starts[node] : self._ends[node]]
+            best_rows = np.concatenate((best_rows, rows))
+            best_chords = np.concatenate((best_chords, self._leaf_chords(q, rows)))
+            if len(best_rows) > k:
+                keep = np.argpartition(best_chords, k - 1)[:k]
+                best_rows, best_chords = best_rows[keep], best_chords[keep]
+            if len(best_rows) == k:
+                worst2 = float(best_chords.max()) ** 2
+
+        order = np.lexsort((best_rows, best_chords))
+        return best_rows[order], _nm_for_chord(best_chords[order])
+
+
+class GridIndex:
+    """Uniform lat/lon grid over points, stored CSR-style for bounding-box queries.
+
+    Rows are sorted by cell id; a query gathers the contiguous row range of every
+    intersecting cell row-band, then filters exactly.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, *, cell_deg: float = 1.0) -> None:
+        self.cell_deg = float(cell_deg)
+        self._lat = np.asarray(lat, dtype=np.float64)
+        self._lon = np.asarray(lon, dtype=np.float64)
+        self._ncols = int(math.ceil(360.0 / self.cell_deg))
+        self._nrows = int(math.ceil(180.0 / self.cell_deg))
+
+        cells = self._cells(self._lat, self._lon)
+        order = np.argsort(cells, kind="stable")
+        self._rows = order.astype(np.int64)
+        self._starts = np.searchsorted(
+            cells[order], np.arange(self._nrows * self._ncols + 1), side="left"
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _col(self, lon: np.ndarray) -> np.ndarray:
+        return np.clip(((lon + 180.0) // self.cell_deg).astype(np.int64), 0, self._ncols - 1)
+
+    def _row(self, lat: np.ndarray) -> np.ndarray:
+        return np.clip(((lat + 90.0) // self.cell_deg).astype(np.int64), 0, self._nrows - 1)
+
+    def _cells(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        return self._row(lat) * self._ncols + self._col(lon)
+
+    def _lon_ranges(self, west: float, east: float) -> List[Tuple[float, float]]:
+        if east - west >= 360.0:
+            return [(-180.0, 180.0)]
+        west = ((west + 180.0) % 360.0) - 180.0
+        east = ((east + 180.0) % 360.0) - 180.0
+        if west <= east:
+            return [(west, east)]
+        # The box crosses the antimeridian.
+        return [(west, 180.0), (-180.0, east)]
+
+    def query_bbox(self, west: float, south: float, east: float, north: float) -> np.ndarray:
+        """Return the sorted rows inside the box; ``west > east`` wraps the antimeridian."""
+        south, north = max(-90.0, float(south)), min(90.0, float(north))
+        if south > north or not len(self._rows):
+            return np.empty(0, dtype=np.int64)
+
+        r0, r1 = (int(v) for v in self._row(np.array([south, north])))
+        chunks: List[np.ndarray] = []
+        masks: List[np.ndarray] = []
+        for lo, hi in self._lon_ranges(float(west), float(east)):
+            c0, c1 = (int(v) for v in self._col(np.array([lo, hi])))
+            for r in range(r0, r1 + 1):
+                a = self._starts[r * self._ncols + c0]
+                b = self._starts[r * self._ncols + c1 + 1]
+                if a < b:
+                    rows = self._rows[a:b]
+                    chunks.append(rows)
+                    lat, lon = self._lat[rows], self._lon[rows]
+                    masks.append((lat >= south) & (lat <= north) & (lon >= lo) & (lon <= hi))
+
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(chunks)[np.concatenate(masks)])
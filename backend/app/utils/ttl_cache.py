@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, Generic, Optional, TypeVar
 
@@ -17,22 +18,39 @@ class _Entry(Generic[T]):
 
 
 class TTLCache:
-    def __init__(self) -> None:
+    """Thread-safe TTL cache; with ``max_entries`` it also evicts least-recently-used keys."""
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
         self._lock = threading.Lock()
-        self._cache: Dict[str, _Entry[Any]] = {}
+        self._cache: "OrderedDict[str, _Entry[Any]]" = OrderedDict()
+        self._max_entries = max_entries
+        self._hits = 0
+        self._misses = 0
 
     def clear(self) -> None:
         with self._lock:
             self._cache.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
 
     def get(self, key: str) -> Optional[Any]:
         now = time.time()
         with self._lock:
             entry = self._cache.get(key)
-            if not entry:
-                return None
-            if now - entry.stored_at > entry.ttl_s:
+            if not entry or now - entry.stored_at > entry.ttl_s:
+                self._misses += 1
                 return None
+            self._hits += 1
+            self._cache.move_to_end(key)
             return entry.value
 
     def get_stale(self, key: str) -> Optional[Any]:
@@ -43,6 +61,10 @@ class TTLCache:
     def set(self, key: str, value: Any, ttl_s: float) -> None:
         with self._lock:
             self._cache[key] = _Entry(value=value, stored_at=time.time(), ttl_s=ttl_s)
+            self._cache.move_to_end(key)
+            if self._max_entries is not None:
+                while len(self._cache) > self._max_entries:
+                    self._cache.popitem(last=False)
 
     def get_or_set(
         self, key: str, *, ttl_s: float, fn: Callable[[], T], allow_stale_on_error: bool = False
@@ -65,3 +87,5 @@ class TTLCache:
 
 
 weather_cache = TTLCache()
+fuel_stop_route_cache = TTLCache(max_entries=1024)
+map_tile_cache = TTLCache(max_entries=4096)
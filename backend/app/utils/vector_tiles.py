@@ -0,0 +1,304 @@
+"""Web-mercator tiling and Mapbox Vector Tile (v2.1) encoding.
+
+Only NumPy and shapely are needed, so the data build can load this module by path to
+pre-render tiles exactly as the API renders them.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import struct
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+WEB_MERCATOR_RADIUS_M = 6_378_137.0
+WEB_MERCATOR_HALF_M = math.pi * WEB_MERCATOR_RADIUS_M
+MAX_MERCATOR_LAT = 85.05112878
+
+TILE_EXTENT = 4096
+# Features are kept this many tile units past each edge so strokes and icons join seamlessly.
+TILE_BUFFER = 64
+# Outlines are simplified to half a screen pixel (a 256 px tile spans TILE_EXTENT units).
+SIMPLIFY_TILE_UNITS = TILE_EXTENT / 256.0 / 2.0
+MAX_TILE_AIRPORTS = 2000
+
+# First zoom at which an airport of each OurAirports type appears in the airports layer.
+AIRPORT_MIN_ZOOM = {
+    "large_airport": 0,
+    "medium_airport": 5,
+    "small_airport": 7,
+    "seaplane_base": 8,
+    "balloonport": 9,
+    "heliport": 9,
+    "closed": 10,
+}
+_DEFAULT_AIRPORT_MIN_ZOOM = 8
+
+Feature = Tuple[Any, Mapping[str, Any]]
+
+_MOVE_TO = 1
+_LINE_TO = 2
+_CLOSE_PATH = 7
+_POINT = 1
+_LINESTRING = 2
+_POLYGON = 3
+
+
+def _web_mercator_coords(lonlat: np.ndarray) -> np.ndarray:
+    lat = np.clip(lonlat[:, 1], -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    out = np.empty_like(lonlat, dtype=float)
+    out[:, 0] = np.radians(lonlat[:, 0]) * WEB_MERCATOR_RADIUS_M
+    out[:, 1] = np.log(np.tan(np.pi / 4.0 + np.radians(lat) / 2.0)) * WEB_MERCATOR_RADIUS_M
+    return out
+
+
+def to_web_mercator(geoms):
+    """Project lon/lat shapely geometries to EPSG:3857 meters (no pyproj round trip)."""
+    import shapely
+
+    return shapely.transform(geoms, _web_mercator_coords)
+
+
+def airport_min_zoom(airport_type: str) -> int:
+    return AIRPORT_MIN_ZOOM.get(airport_type, _DEFAULT_AIRPORT_MIN_ZOOM)
+
+
+def tile_bounds_3857(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    size = 2.0 * WEB_MERCATOR_HALF_M / (1 << z)
+    west = -WEB_MERCATOR_HALF_M + x * size
+    north = WEB_MERCATOR_HALF_M - y * size
+    return (west, north - size, west + size, north)
+
+
+def tile_bounds(z: int, x: int, y: int, *, buffered: bool = False) -> Tuple[float, ...]:
+    """Lon/lat ``(west, south, east, north)`` of a tile, optionally including its buffer."""
+    west, south, east, north = tile_bounds_3857(z, x, y)
+    if buffered:
+        pad = (east - west) * TILE_BUFFER / TILE_EXTENT
+        west, south, east, north = west - pad, south - pad, east + pad, north + pad
+    lon = np.degrees(np.array([west, east]) / WEB_MERCATOR_RADIUS_M)
+    lat = np.degrees(
+        2.0 * np.arctan(np.exp(np.array([south, north]) / WEB_MERCATOR_RADIUS_M)) - np.pi / 2.0
+    )
+    return (float(lon[0]), float(lat[0]), float(lon[1]), float(lat[1]))
+
+
+def tiles_covering(
+    west: float, south: float, east: float, north: float, z: int
+) -> Iterator[Tuple[int, int]]:
+    """Tiles at zoom ``z`` whose buffered extent overlaps the lon/lat box."""
+    n = 1 << z
+    pad = TILE_BUFFER / TILE_EXTENT
+    (x0, y1), (x1, y0) = _web_mercator_coords(np.array([[west, south], [east, north]], float))
+    scale = n / (2.0 * WEB_MERCATOR_HALF_M)
+    tx0 = max(int(math.floor((x0 + WEB_MERCATOR_HALF_M) * scale - pad)), 0)
+    tx1 = min(int(math.floor((x1 + WEB_MERCATOR_HALF_M) * scale + pad)), n - 1)
+    ty0 = max(int(math.floor((WEB_MERCATOR_HALF_M - y0) * scale - pad)), 0)
+    ty1 = min(int(math.floor((WEB_MERCATOR_HALF_M - y1) * scale + pad)), n - 1)
+    for tx in range(tx0, tx1 + 1):
+        for ty in range(ty0, ty1 + 1):
+            yield tx, ty
+
+
+def _tile_transform(z: int, x: int, y: int):
+    west, south, east, north = tile_bounds_3857(z, x, y)
+    scale = TILE_EXTENT / (east - west)
+
+    def forward(xy: np.ndarray) -> np.ndarray:
+        out = np.empty_like(xy, dtype=float)
+        out[:, 0] = (xy[:, 0] - west) * scale
+        out[:, 1] = (north - xy[:, 1]) * scale
+        return out
+
+    return forward
+
+
+def airspace_layer(
+    geoms_3857: np.ndarray, properties: Sequence[Mapping[str, Any]], z: int, x: int, y: int
+) -> List[Feature]:
+    """Clip EPSG:3857 outlines to the buffered tile and simplify them to tile resolution.
+
+    Returns ``(geometry in integer tile units, properties)`` pairs; empty results are dropped.
+    """
+    import shapely
+
+    if not len(geoms_3857):
+        return []
+    west, south, east, north = tile_bounds_3857(z, x, y)
+    pad = (east - west) * TILE_BUFFER / TILE_EXTENT
+    clipped = shapely.clip_by_rect(
+        np.asarray(geoms_3857, dtype=object), west - pad, south - pad, east + pad, north + pad
+    )
+    local = shapely.transform(clipped, _tile_transform(z, x, y))
+    local = shapely.simplify(local, SIMPLIFY_TILE_UNITS, preserve_topology=True)
+    local = shapely.set_precision(local, 1.0)
+    keep = ~(shapely.is_missing(local) | shapely.is_empty(local))
+    return [(g, properties[i]) for i, g in zip(np.flatnonzero(keep).tolist(), local[keep])]
+
+
+def airport_layer(
+    lon: np.ndarray,
+    lat: np.ndarray,
+    properties: Sequence[Mapping[str, Any]],
+    z: int,
+    x: int,
+    y: int,
+) -> List[Feature]:
+    """Airport points inside the buffered tile, in input order and capped at MAX_TILE_AIRPORTS."""
+    import shapely
+
+    xy = _tile_transform(z, x, y)(_web_mercator_coords(np.column_stack([lon, lat]).astype(float)))
+    xy = np.round(xy)
+    inside = np.flatnonzero(
+        np.all((xy >= -TILE_BUFFER) & (xy <= TILE_EXTENT + TILE_BUFFER), axis=1)
+    )[:MAX_TILE_AIRPORTS]
+    points = shapely.points(xy[inside])
+    return [(p, properties[i]) for i, p in zip(inside.tolist(), points)]
+
+
+# --- Protobuf encoding (vector_tile.proto v2.1) ---
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    return _varint((number << 3) | 2) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: Sequence[int]) -> bytes:
+    return _field(number, b"".join(_varint(v) for v in values))
+
+
+def _value(v: Any) -> bytes:
+    if isinstance(v, bool):
+        return _varint((7 << 3) | 0) + _varint(int(v))
+    if isinstance(v, int):
+        return _varint((6 << 3) | 0) + _varint(_zigzag(v))
+    if isinstance(v, float):
+        return _varint((3 << 3) | 1) + struct.pack("<d", v)
+    if not isinstance(v, str):
+        v = json.dumps(v, separators=(",", ":"))
+    return _field(1, v.encode("utf-8"))
+
+
+class _Cursor:
+    def __init__(self) -> None:
+        self.x = 0
+        self.y = 0
+        self.commands: List[int] = []
+
+    def path(self, pts: np.ndarray, *, close: bool) -> None:
+        self.commands.append(_MOVE_TO | (1 << 3))
+        for i, (px, py) in enumerate(pts.tolist()):
+            if i == 1:
+                self.commands.append(_LINE_TO | ((len(pts) - 1) << 3))
+            self.commands.append(_zigzag(px - self.x))
+            self.commands.append(_zigzag(py - self.y))
+            self.x, self.y = px, py
+        if close:
+            self.commands.append(_CLOSE_PATH | (1 << 3))
+
+
+def _path_points(coords: np.ndarray, *, ring: bool) -> np.ndarray:
+    pts = np.asarray(coords, dtype=float)[:, :2].astype(np.int64)
+    if ring and len(pts) > 1 and (pts[0] == pts[-1]).all():
+        pts = pts[:-1]
+    if len(pts) > 1:
+        pts = pts[np.r_[True, (np.diff(pts, axis=0) != 0).any(axis=1)]]
+    return pts
+
+
+def _ring_area2(pts: np.ndarray) -> int:
+    """Twice the signed area; positive for clockwise rings in y-down tile space."""
+    x, y = pts[:, 0], pts[:, 1]
+    return int(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+
+
+def _geometry(geom) -> Tuple[Optional[int], List[int]]:
+    import shapely
+
+    parts = shapely.get_parts(geom)
+    kinds = {p.geom_type for p in parts}
+    cursor = _Cursor()
+    if kinds <= {"Point"}:
+        pts = np.asarray([p.coords[0][:2] for p in parts], dtype=float).astype(np.int64)
+        if not len(pts):
+            return None, []
+        cursor.commands.append(_MOVE_TO | (len(pts) << 3))
+        for px, py in pts.tolist():
+            cursor.commands += [_zigzag(px - cursor.x), _zigzag(py - cursor.y)]
+            cursor.x, cursor.y = px, py
+        return _POINT, cursor.commands
+    if kinds <= {"LineString", "LinearRing"}:
+        for part in parts:
+            pts = _path_points(part.coords, ring=False)
+            if len(pts) >= 2:
+                cursor.path(pts, close=False)
+        return (_LINESTRING if cursor.commands else None), cursor.commands
+
+    for part in parts:
+        if part.geom_type != "Polygon":
+            continue
+        exterior = _path_points(part.exterior.coords, ring=True)
+        if len(exterior) < 3 or _ring_area2(exterior) == 0:
+            continue
+        cursor.path(exterior if _ring_area2(exterior) > 0 else exterior[::-1], close=True)
+        for interior in part.interiors:
+            pts = _path_points(interior.coords, ring=True)
+            if len(pts) < 3 or _ring_area2(pts) == 0:
+                continue
+            cursor.path(pts if _ring_area2(pts) < 0 else pts[::-1], close=True)
+    return (_POLYGON if cursor.commands else None), cursor.commands
+
+
+def _layer(name: str, features: Sequence[Feature]) -> bytes:
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[str, Any], int] = {}
+    encoded_values: List[bytes] = []
+    body = bytearray()
+    for geom, props in features:
+        geom_type, commands = _geometry(geom)
+        if geom_type is None:
+            continue
+        tags: List[int] = []
+        for k, v in props.items():
+            if v is None:
+                continue
+            vkey = (type(v).__name__, v if isinstance(v, (str, int, float)) else json.dumps(v))
+            if vkey not in values:
+                values[vkey] = len(encoded_values)
+                encoded_values.append(_value(v))
+            tags += [keys.setdefault(str(k), len(keys)), values[vkey]]
+        feature = _packed(2, tags) + _varint((3 << 3) | 0) + _varint(geom_type)
+        body += _field(2, feature + _packed(4, commands))
+
+    out = bytearray(_varint((15 << 3) | 0) + _varint(2))
+    out += _field(1, name.encode("utf-8"))
+    out += body
+    for k in keys:
+        out += _field(3, k.encode("utf-8"))
+    for v in encoded_values:
+        out += _field(4, v)
+    out += _varint((5 << 3) | 0) + _varint(TILE_EXTENT)
+    return bytes(out)
+
+
+def encode_tile(layers: Mapping[str, Sequence[Feature]]) -> bytes:
+    """Encode ``{layer name: [(tile-unit geometry, properties), ...]}`` as an MVT tile."""
+    return b"".join(_field(3, _layer(name, feats)) for name, feats in layers.items() if feats)
@@ -34,6 +34,8 @@ import { validateRequired } from '../utils'
 import type { Airport } from '../types'
 
 const AIRSPACE_RADIUS_NM = 20
+// Matches AirportAirspaceMap's initial zoom so the API can send a simplified geometry tier.
+const AIRSPACE_MAP_ZOOM = 10
 
 const AirportsPage: React.FC = () => {
   const [searchTerm, setSearchTerm] = useState('')
@@ -115,6 +117,7 @@ const AirportsPage: React.FC = () => {
         lat: selectedAirport?.latitude as number,
         lon: selectedAirport?.longitude as number,
         radiusNm: AIRSPACE_RADIUS_NM,
+        zoom: AIRSPACE_MAP_ZOOM,
       }),
     {
       enabled:
@@ -1,5 +1,5 @@
 import { apiClient } from './apiClient'
-import type { Airport } from '../types'
+import type { Airport, AirportBatchResponse, AirportBboxResponse } from '../types'
 
 export const airportService = {
   search: async (query: string): Promise<Airport[]> => {
@@ -13,4 +13,20 @@ export const airportService = {
     const response = await apiClient.get<Airport>(`/airports/${icao}`)
     return response.data
   },
+
+  getInBbox: async (
+    bounds: { west: number; south: number; east: number; north: number },
+    zoom: number,
+    maxPoints?: number
+  ): Promise<AirportBboxResponse> => {
+    const response = await apiClient.get<AirportBboxResponse>('/airports/bbox', {
+      params: { ...bounds, zoom: Math.round(zoom), max_points: maxPoints },
+    })
+    return response.data
+  },
+
+  getBatch: async (codes: string[]): Promise<AirportBatchResponse> => {
+    const response = await apiClient.post<AirportBatchResponse>('/airports/batch', { codes })
+    return response.data
+  },
 }
@@ -1,5 +1,5 @@
 import { apiClient } from './apiClient'
-import type { GeoJsonFeatureCollection } from '../types'
+import type { AirspaceAlongRouteResponse, GeoJsonFeatureCollection } from '../types'
 
 export const airspaceService = {
   getNearby: async (params: {
@@ -7,6 +7,7 @@ export const airspaceService = {
     lon: number
     radiusNm?: number
     limit?: number
+    zoom?: number
   }): Promise<GeoJsonFeatureCollection> => {
     const response = await apiClient.get<GeoJsonFeatureCollection>('/airspace/nearby', {
       params: {
@@ -14,8 +15,15 @@ export const airspaceService = {
         lon: params.lon,
         radius_nm: params.radiusNm ?? 20,
         limit: params.limit ?? 250,
+        zoom: params.zoom,
       },
     })
     return response.data
   },
+  alongRoute: async (points: [number, number][]): Promise<AirspaceAlongRouteResponse> => {
+    const response = await apiClient.post<AirspaceAlongRouteResponse>('/airspace/along-route', {
+      points,
+    })
+    return response.data
+  },
 }
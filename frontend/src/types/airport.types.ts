@@ -9,3 +9,28 @@ export interface Airport {
   elevation: number
   type: string
 }
+
+export interface AirportBatchItem {
+  query: string
+  code: string
+  found: boolean
+  airport?: Airport | null
+  error?: string | null
+}
+
+export interface AirportBatchResponse {
+  results: AirportBatchItem[]
+  unknown: string[]
+}
+
+export interface ViewportAirport extends Airport {
+  cluster_count: number
+}
+
+export interface AirportBboxResponse {
+  zoom: number
+  total: number
+  clustered: boolean
+  truncated: boolean
+  airports: ViewportAirport[]
+}
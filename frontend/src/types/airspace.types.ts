@@ -13,3 +13,19 @@ export type GeoJsonFeatureCollection = {
   type: 'FeatureCollection'
   features: GeoJsonFeature[]
 }
+
+export interface AirspaceCrossing {
+  id?: string | null
+  name?: string | null
+  airspace_class?: string | null
+  type?: string | null
+  entry: [number, number]
+  exit: [number, number]
+  entry_nm: number
+  exit_nm: number
+}
+
+export interface AirspaceAlongRouteResponse {
+  distance_nm: number
+  crossings: AirspaceCrossing[]
+}
@@ -1,3 +1,5 @@
+import type { AirspaceCrossing } from './airspace.types'
+
 export type PlanMode = 'local' | 'route'
 
 export type SpeedUnit = 'knots' | 'mph'
@@ -41,6 +43,14 @@ export interface AlternateAirport {
   weather?: AlternateWeather | null
 }
 
+export interface RouteAlternative {
+  rank: number
+  route: string[]
+  fuel_stops: string[]
+  distance_nm: number
+  time_hr: number
+}
+
 export interface FlightPlan {
   planned_at_utc?: string | null
   departure_time_utc?: string | null
@@ -55,6 +65,7 @@ export interface FlightPlan {
   legs?: RouteLeg[] | null
 
   alternates?: AlternateAirport[] | null
+  alternative_routes?: RouteAlternative[] | null
 
   fuel_stops?: string[] | null
   fuel_burn_gph?: number | null
@@ -67,6 +78,8 @@ export interface FlightPlan {
   headwind_kt?: number | null
   crosswind_kt?: number | null
   groundspeed_kt?: number | null
+
+  airspace_crossings?: AirspaceCrossing[] | null
 }
 
 export type RoutePlanRequest = {
@@ -77,8 +90,10 @@ export type RoutePlanRequest = {
   speed_unit: SpeedUnit
   altitude: number
   avoid_airspaces?: boolean
+  airspace_avoidance_mode?: 'offset' | 'visibility'
   avoid_terrain?: boolean
   include_alternates?: boolean
+  include_airspace_report?: boolean
 
   plan_fuel_stops?: boolean
   aircraft_range_nm?: number
@@ -87,6 +102,8 @@ export type RoutePlanRequest = {
   fuel_burn_gph?: number
   reserve_minutes?: number
   fuel_strategy?: 'time' | 'economy'
+  fuel_stop_search_mode?: 'astar' | 'bidirectional'
+  alternatives?: number
   apply_wind?: boolean
 }
 
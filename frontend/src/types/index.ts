@@ -11,6 +11,7 @@ export type {
   Segment,
   AlternateAirport,
   AlternateWeather,
+  RouteAlternative,
 } from './flight.types'
 export type {
   WeatherData,
@@ -22,6 +23,18 @@ export type {
   RouteWeatherPoint,
   RouteWeatherResponse,
 } from './weather.types'
-export type { Airport } from './airport.types'
+export type {
+  Airport,
+  AirportBatchItem,
+  AirportBatchResponse,
+  AirportBboxResponse,
+  ViewportAirport,
+} from './airport.types'
 export type { TerrainProfilePoint, TerrainProfileResponse } from './terrain.types'
-export type { GeoJsonFeatureCollection, GeoJsonFeature, GeoJsonGeometry } from './airspace.types'
+export type {
+  AirspaceAlongRouteResponse,
+  AirspaceCrossing,
+  GeoJsonFeatureCollection,
+  GeoJsonFeature,
+  GeoJsonGeometry,
+} from './airspace.types'
@@ -2,15 +2,57 @@ from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
+import importlib.util
 import json
+import math
+import shutil
+import sys
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 
 def _repo_root() -> Path:
     return Path(__file__).resolve().parents[1]
 
 
+def _snapshot_module() -> ModuleType:
+    # The snapshot format lives next to its reader in the backend. Load that module by path so
+    # building caches does not import (and configure) the whole FastAPI app package.
+    name = "flightplanner_snapshot"
+    if name not in sys.modules:
+        path = _repo_root() / "backend" / "app" / "utils" / "snapshot.py"
+        spec = importlib.util.spec_from_file_location(name, path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def _vector_tiles_module() -> ModuleType:
+    # Same tiling and encoding code the /api/tiles endpoint uses (NumPy and shapely only).
+    name = "flightplanner_vector_tiles"
+    if name not in sys.modules:
+        path = _repo_root() / "backend" / "app" / "utils" / "vector_tiles.py"
+        spec = importlib.util.spec_from_file_location(name, path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def _source_meta(path: Path) -> Dict[str, Any]:
+    data = path.read_bytes()
+    return {
+        "source": path.name,
+        "source_size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
 def _pick_code(row: Dict[str, Any]) -> str:
     gps = (row.get("gps_code") or "").strip().upper()
     icao = (row.get("icao_code") or "").strip().upper()
@@ -71,6 +113,51 @@ def build_airports_cache(*, airports_csv: Path, out_json: Path) -> None:
     out_json.write_text(json.dumps(out, separators=(",", ":")), encoding="utf-8")
 
 
+# OpenAIP vertical limit units (meters, feet, flight level) in feet. `referenceDatum`
+# (0 = GND, 1 = MSL, 2 = STD) is kept as-is.
+_LIMIT_UNIT_FT = {0: 3.28084, 1: 1.0, 6: 100.0}
+VERTICAL_LIMIT_KEYS = ("lower_ft", "lower_ref", "upper_ft", "upper_ref")
+
+
+def _limit_ft(limit: Any) -> Tuple[Optional[float], Optional[int]]:
+    """OpenAIP ``{value, unit, referenceDatum}`` as (feet, reference datum); Nones if unknown."""
+    if not isinstance(limit, dict):
+        return None, None
+    value = _to_float(limit.get("value"))
+    unit = limit.get("unit")
+    ref = limit.get("referenceDatum")
+    if value is None or unit not in _LIMIT_UNIT_FT or ref not in (0, 1, 2):
+        return None, None
+    return round(value * _LIMIT_UNIT_FT[unit], 1), int(ref)
+
+
+def _vertical_limits(asp: Dict[str, Any]) -> Dict[str, Any]:
+    lower_ft, lower_ref = _limit_ft(asp.get("lowerLimit"))
+    upper_ft, upper_ref = _limit_ft(asp.get("upperLimit"))
+    return {
+        "lower_ft": lower_ft,
+        "lower_ref": lower_ref,
+        "upper_ft": upper_ft,
+        "upper_ref": upper_ref,
+    }
+
+
+def _vertical_columns(props: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Vertical limit columns for a snapshot: NaN feet and -1 reference when unknown."""
+    import numpy as np
+
+    out: Dict[str, Any] = {}
+    for side in ("lower", "upper"):
+        ft = [_to_float(p.get(f"{side}_ft")) for p in props]
+        ref = [p.get(f"{side}_ref") for p in props]
+        out[f"{side}_ft"] = np.array([math.nan if v is None else v for v in ft], dtype="<f8")
+        out[f"{side}_ref"] = np.array(
+            [r if isinstance(r, int) and f is not None else -1 for r, f in zip(ref, ft)],
+            dtype="<i1",
+        )
+    return out
+
+
 def build_airspaces_us(*, airspaces_json: Path, out_json: Path) -> None:
     raw = json.loads(airspaces_json.read_text(encoding="utf-8"))
     if not isinstance(raw, list):
@@ -90,6 +177,7 @@ def build_airspaces_us(*, airspaces_json: Path, out_json: Path) -> None:
                 "name": asp.get("name"),
                 "category": asp.get("icaoClass"),
                 "type": asp.get("type"),
+                **_vertical_limits(asp),
                 "geometry": geom,
             }
         )
@@ -121,6 +209,7 @@ def build_airspace_geojson(
                     "name": asp.get("name"),
                     "icaoClass": asp.get("category"),
                     "type": asp.get("type"),
+                    **{k: asp.get(k) for k in VERTICAL_LIMIT_KEYS},
                 },
             }
         )
@@ -130,6 +219,10 @@ def build_airspace_geojson(
         if isinstance(ch, dict) and isinstance(ch.get("features"), list):
             for feat in ch["features"]:
                 if isinstance(feat, dict) and feat.get("geometry"):
+                    props = feat.get("properties")
+                    props = props if isinstance(props, dict) else {}
+                    if "lower_ft" not in props:
+                        feat = {**feat, "properties": {**props, **_vertical_limits(props)}}
                     features.append(feat)
 
     out_geojson.parent.mkdir(parents=True, exist_ok=True)
@@ -139,6 +232,371 @@ def build_airspace_geojson(
     )
 
 
+def build_airports_snapshot(*, airports_json: Path, out_bin: Path) -> None:
+    """Write the airports cache as fixed-width numeric columns plus string tables."""
+    import numpy as np
+
+    snapshot = _snapshot_module()
+    raw = json.loads(airports_json.read_text(encoding="utf-8"))
+    if not isinstance(raw, list):
+        raise ValueError("Expected a list in airports cache JSON")
+
+    rows = []
+    for a in raw:
+        if not isinstance(a, dict):
+            continue
+        lat = _to_float(a.get("latitude"))
+        lon = _to_float(a.get("longitude"))
+        if lat is None or lon is None:
+            continue
+        rows.append((a, lat, lon))
+
+    def column(key: str) -> List[str]:
+        return [str(a.get(key) or "") for a, _, _ in rows]
+
+    elevations = [_to_float(a.get("elevation")) for a, _, _ in rows]
+    snapshot.write_snapshot(
+        out_bin,
+        kind="airports",
+        count=len(rows),
+        arrays={
+            "lat": np.array([lat for _, lat, _ in rows], dtype="<f8"),
+            "lon": np.array([lon for _, _, lon in rows], dtype="<f8"),
+            "elevation": np.array(
+                [math.nan if e is None else e for e in elevations], dtype="<f8"
+            ),
+        },
+        strings={
+            "icao": [c.upper() for c in column("icao")],
+            "iata": [c.upper() for c in column("iata")],
+            "name": [str(a["name"]) if a.get("name") else None for a, _, _ in rows],
+            "city": column("city"),
+            "country": column("country"),
+            "type": column("type"),
+        },
+        meta=_source_meta(airports_json),
+    )
+
+
+# Topology-preserving simplification tiers (meters) written next to the full geometry.
+SIMPLIFY_TOLERANCES_M = (50, 250, 1000)
+# Avoidance uses this tier grown outward by its tolerance, so it always covers the original.
+AVOIDANCE_TOLERANCE_M = 250
+_M_PER_DEG_LAT = 111_320.0
+
+
+def _simplify_m(geom: Any, tolerance_m: float, *, outward: bool = False) -> Any:
+    """Simplify a lon/lat geometry by ``tolerance_m``; ``outward`` re-grows it to cover ``geom``."""
+    tol_deg = tolerance_m / _M_PER_DEG_LAT
+    simplified = geom.simplify(tol_deg, preserve_topology=True)
+    if not outward:
+        return simplified
+    # A degree of longitude is shorter than one of latitude, so growing by the longitude-sized
+    # tolerance covers at least `tolerance_m` in every direction.
+    cos_lat = max(math.cos(math.radians(abs(geom.centroid.y))), 0.01)
+    return simplified.buffer(tol_deg / cos_lat, quad_segs=2)
+
+
+def _airspace_snapshot(*, features: List[Dict[str, Any]], source: Path, out_bin: Path) -> None:
+    import numpy as np
+    from shapely.geometry import shape
+
+    snapshot = _snapshot_module()
+
+    wkb: List[bytes] = []
+    tiers: Dict[str, List[bytes]] = {f"wkb_{t}m": [] for t in SIMPLIFY_TOLERANCES_M}
+    tiers["wkb_avoid"] = []
+    bounds: List[tuple] = []
+    props_out: List[Dict[str, Any]] = []
+    for geom, props in ((f.get("geometry"), f.get("properties") or {}) for f in features):
+        if not geom:
+            continue
+        try:
+            g = shape(geom)
+        except Exception:
+            continue
+        wkb.append(g.wkb)
+        for t in SIMPLIFY_TOLERANCES_M:
+            tiers[f"wkb_{t}m"].append(_simplify_m(g, t).wkb)
+        tiers["wkb_avoid"].append(_simplify_m(g, AVOIDANCE_TOLERANCE_M, outward=True).wkb)
+        bounds.append(g.bounds if not g.is_empty else (math.nan,) * 4)
+        props_out.append(props)
+
+    box = np.array(bounds, dtype="<f8").reshape(-1, 4)
+    snapshot.write_snapshot(
+        out_bin,
+        kind="airspaces",
+        count=len(wkb),
+        arrays={
+            "minx": box[:, 0].copy(),
+            "miny": box[:, 1].copy(),
+            "maxx": box[:, 2].copy(),
+            "maxy": box[:, 3].copy(),
+            **_vertical_columns(props_out),
+        },
+        strings={"properties": [json.dumps(p, separators=(",", ":")) for p in props_out]},
+        blobs={"wkb": wkb, **tiers},
+        meta={
+            **_source_meta(source),
+            "simplify_tolerances_m": list(SIMPLIFY_TOLERANCES_M),
+            "avoidance_tolerance_m": AVOIDANCE_TOLERANCE_M,
+        },
+    )
+
+
+def build_airspaces_snapshot(*, airspaces_us_json: Path, out_bin: Path) -> None:
+    """Write simplified airspaces as WKB geometry blobs (plus simplified tiers) with bboxes."""
+    raw = json.loads(airspaces_us_json.read_text(encoding="utf-8"))
+    if not isinstance(raw, list):
+        raise ValueError("Expected a list in simplified airspaces JSON")
+
+    features = [
+        {
+            "geometry": asp.get("geometry"),
+            "properties": {
+                "id": asp.get("id"),
+                "name": asp.get("name"),
+                "icaoClass": asp.get("category"),
+                "type": asp.get("type"),
+                **{k: asp.get(k) for k in VERTICAL_LIMIT_KEYS},
+            },
+        }
+        for asp in raw
+        if isinstance(asp, dict)
+    ]
+    _airspace_snapshot(features=features, source=airspaces_us_json, out_bin=out_bin)
+
+
+def build_airspace_geojson_snapshot(*, geojson: Path, out_bin: Path) -> None:
+    """Write an airspace GeoJSON FeatureCollection as a WKB snapshot."""
+    raw = json.loads(geojson.read_text(encoding="utf-8"))
+    features = raw.get("features") if isinstance(raw, dict) else None
+    if not isinstance(features, list):
+        raise ValueError("Expected a GeoJSON FeatureCollection")
+
+    _airspace_snapshot(
+        features=[f for f in features if isinstance(f, dict)], source=geojson, out_bin=out_bin
+    )
+
+
+OBSTACLE_BUFFERS_NM = (3.0, 5.0, 10.0)
+
+
+def _buffer_nm(geom: Any, buffer_nm: float) -> Any:
+    """Buffer a lon/lat geometry by ``buffer_nm`` in a local equirectangular frame."""
+    import numpy as np
+    import shapely
+
+    lat0 = geom.centroid.y
+    kx = 60.0 * max(math.cos(math.radians(lat0)), 1e-6)
+
+    def forward(c: Any) -> Any:
+        return np.column_stack([c[:, 0] * kx, c[:, 1] * 60.0])
+
+    def inverse(c: Any) -> Any:
+        return np.column_stack([c[:, 0] / kx, c[:, 1] / 60.0])
+
+    return shapely.transform(shapely.transform(geom, forward).buffer(buffer_nm), inverse)
+
+
+def _obstacle_records(raw: Any) -> List[Dict[str, Any]]:
+    """Flat airspace records from the map GeoJSON cache or the simplified US list."""
+    if isinstance(raw, dict) and isinstance(raw.get("features"), list):
+        records = []
+        for feat in raw["features"]:
+            if not isinstance(feat, dict):
+                continue
+            props = feat.get("properties")
+            props = props if isinstance(props, dict) else {}
+            records.append(
+                {
+                    **props,
+                    "category": props.get("icaoClass", props.get("class", props.get("category"))),
+                    "geometry": feat.get("geometry"),
+                }
+            )
+        return records
+    if isinstance(raw, list):
+        return [asp for asp in raw if isinstance(asp, dict)]
+    raise ValueError("Expected a FeatureCollection or a list of airspaces")
+
+
+def build_obstacle_layers_snapshot(
+    *, airspace_json: Path, out_bin: Path, buffers_nm: tuple = OBSTACLE_BUFFERS_NM
+) -> None:
+    """Write airspaces buffered per distance and merged per class and vertical band.
+
+    ``airspace_json`` is the file the backend's airspace store loads: the map cache
+    (``airspace_cache.json``), or ``airspaces_us.json`` where there is none. One row per
+    polygon part, carrying its band's vertical limit columns.
+    """
+    import numpy as np
+    import shapely
+    from shapely.geometry import shape
+
+    raw = json.loads(airspace_json.read_text(encoding="utf-8"))
+
+    # Airspaces are merged per class and vertical band, so each part keeps exact limits.
+    groups: Dict[tuple, List[Any]] = {}
+    for asp in _obstacle_records(raw):
+        if not asp.get("geometry"):
+            continue
+        try:
+            g = shape(asp["geometry"])
+        except Exception:
+            continue
+        if g.is_empty:
+            continue
+        category = asp.get("category")
+        band = tuple(asp.get(k) for k in VERTICAL_LIMIT_KEYS)
+        groups.setdefault(("" if category is None else str(category), band), []).append(g)
+
+    buffers: List[float] = []
+    classes: List[str] = []
+    limits: List[Dict[str, Any]] = []
+    parts: List[Any] = []
+    for buffer_nm in buffers_nm:
+        for (category, band), geoms in sorted(groups.items(), key=lambda kv: repr(kv[0])):
+            merged = shapely.union_all([_buffer_nm(g, buffer_nm) for g in geoms])
+            for part in shapely.get_parts(merged):
+                buffers.append(float(buffer_nm))
+                classes.append(category)
+                limits.append(dict(zip(VERTICAL_LIMIT_KEYS, band)))
+                parts.append(part)
+
+    box = np.array([p.bounds for p in parts], dtype="<f8").reshape(-1, 4)
+    meta = _source_meta(airspace_json)
+    meta["buffers_nm"] = [float(b) for b in buffers_nm]
+    _snapshot_module().write_snapshot(
+        out_bin,
+        kind="obstacles",
+        count=len(parts),
+        arrays={
+            "buffer_nm": np.array(buffers, dtype="<f8"),
+            "minx": box[:, 0].copy(),
+            "miny": box[:, 1].copy(),
+            "maxx": box[:, 2].copy(),
+            "maxy": box[:, 3].copy(),
+            **_vertical_columns(limits),
+        },
+        strings={"class": classes},
+        blobs={"wkb": [p.wkb for p in parts]},
+        meta=meta,
+    )
+
+
+def _write_tiles(
+    layer_dir: Path,
+    source: Path,
+    max_zoom: int,
+    bounds: Any,
+    render: Callable[[int, int, int], Optional[bytes]],
+) -> int:
+    """Render every tile touched by ``bounds`` (one lon/lat box per feature) up to ``max_zoom``.
+
+    Only non-empty tiles are written; ``meta.json`` goes last so a partial directory is never
+    mistaken for a complete one.
+    """
+    tiles = _vector_tiles_module()
+    if layer_dir.exists():
+        shutil.rmtree(layer_dir)
+    written = 0
+    for z in range(max_zoom + 1):
+        todo = sorted({t for b in bounds for t in tiles.tiles_covering(*b, z)})
+        for x, y in todo:
+            data = render(z, x, y)
+            if not data:
+                continue
+            path = layer_dir / str(z) / str(x) / f"{y}.mvt"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            written += 1
+    meta = _source_meta(source)
+    meta["max_zoom"] = max_zoom
+    layer_dir.mkdir(parents=True, exist_ok=True)
+    (layer_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    return written
+
+
+def build_map_tiles(
+    *, airports_json: Path, airspace_geojson: Path, out_dir: Path, max_zoom: int
+) -> None:
+    """Pre-render the /api/tiles airspace and airports layers for zooms 0..``max_zoom``."""
+    import numpy as np
+    import shapely
+    from shapely.geometry import shape
+
+    tiles = _vector_tiles_module()
+
+    raw = json.loads(airspace_geojson.read_text(encoding="utf-8"))
+    geoms: List[Any] = []
+    props: List[Dict[str, Any]] = []
+    for feat in raw.get("features", []) if isinstance(raw, dict) else []:
+        if not isinstance(feat, dict) or not feat.get("geometry"):
+            continue
+        try:
+            geoms.append(shape(feat["geometry"]))
+        except Exception:
+            continue
+        p = feat.get("properties")
+        props.append(p if isinstance(p, dict) else {})
+    lonlat = np.array(geoms, dtype=object)
+    merc = tiles.to_web_mercator(lonlat)
+    tree = shapely.STRtree(lonlat)
+
+    def render_airspace(z: int, x: int, y: int) -> Optional[bytes]:
+        rows = np.sort(tree.query(shapely.box(*tiles.tile_bounds(z, x, y, buffered=True))))
+        features = tiles.airspace_layer(merc[rows], [props[i] for i in rows.tolist()], z, x, y)
+        return tiles.encode_tile({"airspace": features}) if features else None
+
+    n = _write_tiles(
+        out_dir / "airspace", airspace_geojson, max_zoom, shapely.bounds(lonlat), render_airspace
+    )
+    print(f"Wrote {n} airspace tiles (z0-{max_zoom})")
+
+    airports = json.loads(airports_json.read_text(encoding="utf-8"))
+    rows_in: List[Dict[str, Any]] = []
+    for a in airports if isinstance(airports, list) else []:
+        if not isinstance(a, dict):
+            continue
+        lat, lon = _to_float(a.get("latitude")), _to_float(a.get("longitude"))
+        if lat is None or lon is None:
+            continue
+        rows_in.append({**a, "latitude": lat, "longitude": lon})
+    # Same order as the API: earliest zoom (most important type) first, then file order.
+    rows_in.sort(key=lambda a: tiles.airport_min_zoom(str(a.get("type") or "")))
+    lat_a = np.array([a["latitude"] for a in rows_in], dtype=float)
+    lon_a = np.array([a["longitude"] for a in rows_in], dtype=float)
+    min_zoom = np.array([tiles.airport_min_zoom(str(a.get("type") or "")) for a in rows_in])
+    airport_props = [
+        {
+            "code": str(a.get("icao") or "").upper() or str(a.get("iata") or "").upper(),
+            "name": a.get("name") or None,
+            "type": str(a.get("type") or ""),
+        }
+        for a in rows_in
+    ]
+    points = shapely.points(lon_a, lat_a)
+    point_tree = shapely.STRtree(points)
+
+    def render_airports(z: int, x: int, y: int) -> Optional[bytes]:
+        rows = np.sort(point_tree.query(shapely.box(*tiles.tile_bounds(z, x, y, buffered=True))))
+        rows = rows[min_zoom[rows] <= z]
+        features = tiles.airport_layer(
+            lon_a[rows], lat_a[rows], [airport_props[i] for i in rows.tolist()], z, x, y
+        )
+        return tiles.encode_tile({"airports": features}) if features else None
+
+    n = _write_tiles(
+        out_dir / "airports",
+        airports_json,
+        max_zoom,
+        [(lo, la, lo, la) for lo, la in zip(lon_a.tolist(), lat_a.tolist())],
+        render_airports,
+    )
+    print(f"Wrote {n} airport tiles (z0-{max_zoom})")
+
+
 def main() -> None:
     root = _repo_root()
     src = root / "sources" / "xctry-planner" / "backend"
@@ -151,6 +609,24 @@ def main() -> None:
     parser.add_argument("--out-airports", default=str(out_dir / "airports_cache.json"))
     parser.add_argument("--out-airspaces-us", default=str(out_dir / "airspaces_us.json"))
     parser.add_argument("--out-airspace-geojson", default=str(out_dir / "airspace_cache.json"))
+    parser.add_argument("--out-obstacles", default=str(out_dir / "airspace_obstacles.bin"))
+    parser.add_argument(
+        "--obstacle-buffers",
+        default=",".join(f"{b:g}" for b in OBSTACLE_BUFFERS_NM),
+        help="Comma-separated airspace avoidance buffers (nm) to precompute obstacle layers for.",
+    )
+    parser.add_argument("--out-tiles", default=str(out_dir / "tiles"))
+    parser.add_argument(
+        "--tiles-max-zoom",
+        type=int,
+        default=-1,
+        help="Pre-render map vector tiles for zooms 0..N (e.g. 8) into --out-tiles; off by default.",
+    )
+    parser.add_argument(
+        "--no-snapshots",
+        action="store_true",
+        help="Skip writing the binary .bin snapshots next to the JSON caches.",
+    )
     args = parser.parse_args()
 
     build_airports_cache(airports_csv=Path(args.airports_csv), out_json=Path(args.out_airports))
@@ -163,6 +639,36 @@ def main() -> None:
         out_geojson=Path(args.out_airspace_geojson),
     )
 
+    if args.tiles_max_zoom >= 0:
+        build_map_tiles(
+            airports_json=Path(args.out_airports),
+            airspace_geojson=Path(args.out_airspace_geojson),
+            out_dir=Path(args.out_tiles),
+            max_zoom=args.tiles_max_zoom,
+        )
+
+    if args.no_snapshots:
+        return
+
+    snapshot_path_for = _snapshot_module().snapshot_path_for
+    build_airports_snapshot(
+        airports_json=Path(args.out_airports),
+        out_bin=snapshot_path_for(Path(args.out_airports)),
+    )
+    build_airspaces_snapshot(
+        airspaces_us_json=Path(args.out_airspaces_us),
+        out_bin=snapshot_path_for(Path(args.out_airspaces_us)),
+    )
+    build_airspace_geojson_snapshot(
+        geojson=Path(args.out_airspace_geojson),
+        out_bin=snapshot_path_for(Path(args.out_airspace_geojson)),
+    )
+    build_obstacle_layers_snapshot(
+        airspace_json=Path(args.out_airspace_geojson),
+        out_bin=Path(args.out_obstacles),
+        buffers_nm=tuple(float(b) for b in args.obstacle_buffers.split(",") if b.strip()),
+    )
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import List, Tuple
+
+from build_data_caches import _repo_root, _snapshot_module, _source_meta, _to_float
+
+
+def _a_star_module() -> ModuleType:
+    # Load the search module by path (it only needs NumPy) so the tables are built with exactly
+    # the grid and hop semantics the API uses, without importing the FastAPI app package.
+    name = "flightplanner_a_star"
+    if name not in sys.modules:
+        path = _repo_root() / "backend" / "app" / "services" / "a_star.py"
+        spec = importlib.util.spec_from_file_location(name, path)
+        assert spec is not None and spec.loader is not None
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def _graph_nodes(airports_json: Path) -> Tuple[List[str], List[float], List[float]]:
+    """Return fuel-stop graph nodes in `CandidateGraph.from_table` order (first row per code)."""
+    raw = json.loads(airports_json.read_text(encoding="utf-8"))
+    if not isinstance(raw, list):
+        raise ValueError("Expected a list in airports cache JSON")
+
+    codes: List[str] = []
+    lat: List[float] = []
+    lon: List[float] = []
+    seen: set[str] = set()
+    for a in raw:
+        if not isinstance(a, dict):
+            continue
+        lat_v = _to_float(a.get("latitude"))
+        lon_v = _to_float(a.get("longitude"))
+        if lat_v is None or lon_v is None:
+            continue
+        code = str(a.get("icao") or "").upper() or str(a.get("iata") or "").upper()
+        if not code or code in seen:
+            continue
+        seen.add(code)
+        codes.append(code)
+        lat.append(lat_v)
+        lon.append(lon_v)
+    return codes, lat, lon
+
+
+def build_landmarks_snapshot(
+    *,
+    airports_json: Path,
+    out_bin: Path,
+    tiers: Tuple[float, ...],
+    count: int,
+) -> None:
+    """Write per-tier landmark hop tables for the fuel-stop A* heuristic."""
+    import numpy as np
+
+    a_star = _a_star_module()
+    codes, lat_l, lon_l = _graph_nodes(airports_json)
+    lat = np.array(lat_l, dtype="<f8")
+    lon = np.array(lon_l, dtype="<f8")
+
+    landmarks = a_star.select_landmarks(lat, lon, count)
+    arrays = {"lat": lat, "lon": lon, "landmarks": landmarks.astype("<i8")}
+    for tier in tiers:
+        t0 = time.perf_counter()
+        hops = a_star.hop_counts(lat, lon, landmarks.tolist(), tier)
+        arrays[f"hops_{int(tier)}"] = hops.astype("<u2").ravel()
+        print(f"tier {tier:g} nm: {time.perf_counter() - t0:.1f}s")
+
+    meta = _source_meta(airports_json)
+    meta.update({"tiers": [int(t) for t in tiers], "landmarks": int(len(landmarks))})
+    _snapshot_module().write_snapshot(
+        out_bin,
+        kind="landmarks",
+        count=len(codes),
+        arrays=arrays,
+        strings={"codes": codes},
+        meta=meta,
+    )
+
+
+def main() -> None:
+    out_dir = _repo_root() / "backend" / "data"
+    a_star = _a_star_module()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--airports", default=str(out_dir / "airports_cache.json"))
+    parser.add_argument("--out", default=str(out_dir / "fuel_stop_landmarks.bin"))
+    parser.add_argument(
+        "--tiers",
+        default=",".join(f"{t:g}" for t in a_star.LANDMARK_TIERS_NM),
+        help="Comma-separated max-leg tiers (nm) to build hop tables for.",
+    )
+    parser.add_argument("--landmarks", type=int, default=a_star.LANDMARK_COUNT)
+    args = parser.parse_args()
+
+    tiers = tuple(sorted(float(t) for t in args.tiers.split(",") if t.strip()))
+    build_landmarks_snapshot(
+        airports_json=Path(args.airports),
+        out_bin=Path(args.out),
+        tiers=tiers,
+        count=args.landmarks,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
 import pytest
 from fastapi.testclient import TestClient
 
-from app.utils.ttl_cache import weather_cache
+from app.utils.ttl_cache import fuel_stop_route_cache, map_tile_cache, weather_cache
 from main import app
 
 
 @pytest.fixture(autouse=True)
 def _clear_weather_cache() -> None:
     weather_cache.clear()
+    fuel_stop_route_cache.clear()
+    map_tile_cache.clear()
 
 
 @pytest.fixture()
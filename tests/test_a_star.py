@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import pytest
+
+from app.models.airport_table import AirportTable
+from app.services import a_star
+from app.services.a_star import AirportNode, CandidateGraph, candidate_graph_for, find_route
+from app.utils.snapshot import open_snapshot, write_snapshot
+
+
+def _chain_table() -> AirportTable:
+    # Airports one degree of longitude apart along the equator (~60 nm).
+    return AirportTable.from_records(
+        [
+            {"icao": f"X{i:03d}", "iata": "", "latitude": 0.0, "longitude": float(i)}
+            for i in range(10)
+        ]
+    )
+
+
+def test_candidate_graph_is_reused_per_table() -> None:
+    table = _chain_table()
+    graph = candidate_graph_for(table)
+    assert candidate_graph_for(table) is graph
+    assert len(graph) == 10
+    assert graph.grid(100.0) is graph.grid(110.0)
+
+
+def test_find_route_uses_graph_endpoints_and_virtual_nodes() -> None:
+    graph = candidate_graph_for(_chain_table())
+
+    path = find_route(
+        origin=AirportNode("X000", 0.0, 0.0),
+        destination=AirportNode("X009", 0.0, 9.0),
+        graph=graph,
+        max_leg_distance_nm=130.0,
+    )
+    assert path[0] == "X000" and path[-1] == "X009"
+    assert len(path) == 6
+
+    # Endpoints that are not graph nodes are routed as extra nodes.
+    path = find_route(
+        origin=AirportNode("ORIG", 0.0, -0.5),
+        destination=AirportNode("DEST", 0.0, 9.5),
+        graph=graph,
+        max_leg_distance_nm=130.0,
+    )
+    assert path[0] == "ORIG" and path[-1] == "DEST"
+
+
+def test_find_route_crosses_antimeridian() -> None:
+    graph = CandidateGraph.from_nodes(
+        [AirportNode("WEST", 60.0, 179.0), AirportNode("EAST", 60.0, -179.0)]
+    )
+    path = a_star.find_route(
+        origin=AirportNode("ORIG", 60.0, 177.0),
+        destination=AirportNode("DEST", 60.0, -177.0),
+        graph=graph,
+        max_leg_distance_nm=70.0,
+    )
+    assert path == ["ORIG", "WEST", "EAST", "DEST"]
+
+
+def test_find_route_matches_dijkstra_cost() -> None:
+    import heapq
+    import random
+
+    rng = random.Random(3)
+    nodes = [
+        AirportNode(f"N{i:03d}", rng.uniform(30, 50), rng.uniform(-120, -80)) for i in range(300)
+    ]
+    origin = nodes[0]
+    destination = max(
+        nodes, key=lambda n: a_star.haversine_nm((origin.lat, origin.lon), (n.lat, n.lon))
+    )
+    max_leg, penalty = 250.0, 20.0
+
+    def cost(path):
+        pos = {n.code: (n.lat, n.lon) for n in nodes}
+        return sum(a_star.haversine_nm(pos[a], pos[b]) + penalty for a, b in zip(path, path[1:]))
+
+    best = {origin.code: 0.0}
+    heap = [(0.0, 0)]
+    while heap:
+        g, i = heapq.heappop(heap)
+        if g > best[nodes[i].code]:
+            continue
+        here = (nodes[i].lat, nodes[i].lon)
+        for j, n in enumerate(nodes):
+            d = a_star.haversine_nm(here, (n.lat, n.lon))
+            if j != i and d <= max_leg and g + d + penalty < best.get(n.code, float("inf")):
+                best[n.code] = g + d + penalty
+                heapq.heappush(heap, (g + d + penalty, j))
+
+    path = find_route(
+        origin=origin,
+        destination=destination,
+        candidates=nodes,
+        max_leg_distance_nm=max_leg,
+        per_leg_penalty_nm=penalty,
+    )
+    assert path[0] == origin.code and path[-1] == destination.code
+    assert len(path) > 3
+    assert abs(cost(path) - best[destination.code]) < 1e-6
+
+
+def test_landmark_hops_prune_and_keep_routes_optimal(tmp_path) -> None:
+    import random
+
+    rng = random.Random(5)
+    nodes = [
+        AirportNode(f"N{i:03d}", rng.uniform(30, 45), rng.uniform(-120, -90)) for i in range(250)
+    ]
+    nodes += [AirportNode(f"I{i}", 20.0 + 0.1 * i, -157.0) for i in range(3)]
+    graph = CandidateGraph.from_nodes(nodes)
+
+    landmarks = a_star.select_landmarks(graph.lat, graph.lon, 4)
+    hops = a_star.hop_counts(graph.lat, graph.lon, landmarks.tolist(), 150.0)
+
+    # Brute-force BFS from the first landmark.
+    expected = {int(landmarks[0]): 0}
+    frontier = [int(landmarks[0])]
+    while frontier:
+        nxt = []
+        for i in frontier:
+            for j, n in enumerate(nodes):
+                d = a_star.haversine_nm((nodes[i].lat, nodes[i].lon), (n.lat, n.lon))
+                if j not in expected and d <= 150.0:
+                    expected[j] = expected[i] + 1
+                    nxt.append(j)
+        frontier = nxt
+    assert {j: int(h) for j, h in enumerate(hops[0]) if h != a_star.HOPS_UNREACHED} == expected
+
+    path = tmp_path / "fuel_stop_landmarks.bin"
+    write_snapshot(
+        path,
+        kind="landmarks",
+        count=len(graph),
+        arrays={"lat": graph.lat, "lon": graph.lon, "hops_150": hops.ravel()},
+        strings={"codes": list(graph.codes)},
+        meta={"tiers": [150], "landmarks": len(landmarks)},
+    )
+    table = a_star.Landmarks.from_snapshot(open_snapshot(path, kind="landmarks"), graph)
+    assert table.table_for(120.0) is not None and table.table_for(200.0) is None
+
+    origin = nodes[0]
+    destination = max(
+        nodes[:250], key=lambda n: a_star.haversine_nm((origin.lat, origin.lon), (n.lat, n.lon))
+    )
+    kwargs = dict(
+        origin=origin,
+        destination=destination,
+        graph=graph,
+        max_leg_distance_nm=120.0,
+        per_leg_penalty_nm=25.0,
+    )
+    assert find_route(landmarks=table, **kwargs) == find_route(**kwargs)
+
+    # The island is unreachable: landmarks rule it out before any expansion.
+    with pytest.raises(a_star.AStarError, match="No route found"):
+        find_route(
+            origin=origin,
+            destination=nodes[-1],
+            graph=graph,
+            landmarks=table,
+            max_leg_distance_nm=120.0,
+            max_expansions=1,
+        )
+
+
+def test_landmarks_built_before_airports_were_added_are_not_used(tmp_path) -> None:
+    # KBBB (added after the build) is the only stop joining KAAA to KCCC at a 100 nm max leg.
+    built = [
+        AirportNode("KAAA", 0.0, 0.0),
+        AirportNode("KCCC", 0.0, 3.0),
+        AirportNode("KDDD", 0.0, 4.5),
+        AirportNode("KEEE", 0.0, 6.0),
+    ]
+    old = CandidateGraph.from_nodes(built)
+    landmarks = a_star.select_landmarks(old.lat, old.lon, 2)
+    path = tmp_path / "fuel_stop_landmarks.bin"
+    write_snapshot(
+        path,
+        kind="landmarks",
+        count=len(old),
+        arrays={
+            "lat": old.lat,
+            "lon": old.lon,
+            "hops_100": a_star.hop_counts(old.lat, old.lon, landmarks.tolist(), 100.0).ravel(),
+        },
+        strings={"codes": list(old.codes)},
+        meta={"tiers": [100], "landmarks": len(landmarks)},
+    )
+    snapshot = open_snapshot(path, kind="landmarks")
+
+    grown = CandidateGraph.from_nodes([*built, AirportNode("KBBB", 0.0, 1.5)])
+    assert a_star.Landmarks.from_snapshot(snapshot, grown) is None
+    assert find_route(
+        origin=built[0], destination=built[1], graph=grown, max_leg_distance_nm=100.0
+    ) == ["KAAA", "KBBB", "KCCC"]
+
+    # Airports removed since the build leave valid (if looser) bounds.
+    assert (
+        a_star.Landmarks.from_snapshot(snapshot, CandidateGraph.from_nodes(built[1:])) is not None
+    )
+
+
+def test_bidirectional_search_matches_astar() -> None:
+    import random
+
+    rng = random.Random(9)
+    nodes = [
+        AirportNode(f"N{i:03d}", rng.uniform(30, 45), rng.uniform(-120, -90)) for i in range(300)
+    ]
+    graph = CandidateGraph.from_nodes(nodes)
+
+    for k in range(10):
+        origin, destination = rng.sample(nodes, 2)
+        if k % 3 == 0:
+            destination = AirportNode("DEST", destination.lat, destination.lon)
+        kwargs = dict(
+            origin=origin,
+            destination=destination,
+            graph=graph,
+            max_leg_distance_nm=rng.choice([120.0, 200.0]),
+            per_leg_penalty_nm=rng.choice([0.0, 25.0]),
+        )
+        stats: dict = {}
+        assert find_route(bidirectional=True, stats=stats, **kwargs) == find_route(**kwargs)
+        assert stats["expansions"] >= 0
+
+
+def test_corridor_and_type_filter() -> None:
+    import random
+
+    rng = random.Random(13)
+    nodes = [
+        AirportNode(f"N{i:03d}", rng.uniform(30, 45), rng.uniform(-120, -80)) for i in range(400)
+    ]
+    types = [rng.choice(["small_airport", "small_airport", "heliport"]) for _ in nodes]
+    graph = CandidateGraph(
+        [n.code for n in nodes], [n.lat for n in nodes], [n.lon for n in nodes], types
+    )
+    allowed = ("small_airport",)
+
+    for _ in range(10):
+        origin, destination = rng.sample(nodes, 2)
+        kwargs = dict(
+            origin=origin,
+            destination=destination,
+            graph=graph,
+            max_leg_distance_nm=rng.choice([100.0, 180.0]),
+            per_leg_penalty_nm=rng.choice([0.0, 25.0]),
+            airport_types=allowed,
+        )
+        stats: dict = {}
+        path = find_route(corridor=True, stats=stats, **kwargs)
+        assert path == find_route(**kwargs)
+        assert all(types[graph.index[code]] in allowed for code in path[1:-1])
+        assert stats["candidates"] <= len(nodes)
+
+    # The ellipse only keeps nodes near the direct track.
+    origin, destination = nodes[0], nodes[1]
+    direct = a_star.haversine_nm((origin.lat, origin.lon), (destination.lat, destination.lon))
+    mask = a_star.corridor_mask(
+        graph, origin, destination, direct + 50.0, max_leg_distance_nm=100.0
+    )
+    for i, n in enumerate(nodes):
+        total = a_star.haversine_nm((origin.lat, origin.lon), (n.lat, n.lon)) + a_star.haversine_nm(
+            (n.lat, n.lon), (destination.lat, destination.lon)
+        )
+        assert bool(mask[i]) == (total <= direct + 50.0)
+
+
+def test_find_routes_returns_k_cheapest_distinct_itineraries() -> None:
+    import random
+
+    rng = random.Random(21)
+    nodes = [
+        AirportNode(f"N{i:02d}", rng.uniform(40, 42), rng.uniform(-80, -76)) for i in range(10)
+    ]
+    graph = CandidateGraph.from_nodes(nodes)
+    origin = min(nodes, key=lambda n: n.lon)
+    destination = max(nodes, key=lambda n: n.lon)
+    max_leg, penalty = 90.0, 10.0
+
+    def leg(a, b):
+        return a_star.haversine_nm((a.lat, a.lon), (b.lat, b.lon))
+
+    # Brute force: every loopless route.
+    costs = []
+
+    def walk(path, cost):
+        here = path[-1]
+        if here is destination:
+            costs.append(cost)
+            return
+        for n in nodes:
+            if n not in path and leg(here, n) <= max_leg:
+                walk(path + [n], cost + leg(here, n) + penalty)
+
+    walk([origin], 0.0)
+    costs.sort()
+
+    routes = a_star.find_routes(
+        origin=origin,
+        destination=destination,
+        graph=graph,
+        max_leg_distance_nm=max_leg,
+        per_leg_penalty_nm=penalty,
+        k=4,
+    )
+    assert len(routes) == min(4, len(costs))
+    assert len({r.codes for r in routes}) == len(routes)
+    assert [round(r.cost, 6) for r in routes] == [round(c, 6) for c in costs[: len(routes)]]
+    assert list(routes[0].codes) == find_route(
+        origin=origin,
+        destination=destination,
+        graph=graph,
+        max_leg_distance_nm=max_leg,
+        per_leg_penalty_nm=penalty,
+    )
@@ -80,3 +80,160 @@ def test_airports_search_and_lookup(monkeypatch) -> None:
     assert resp3.status_code == 200
     airport2 = resp3.json()
     assert airport2["icao"] == "K7S5"
+
+
+def test_airport_code_index_resolves_aliases_and_is_reused(monkeypatch) -> None:
+    import app.models.airport as airport_model
+
+    airports = [
+        {"icao": "K7S5", "iata": "", "latitude": 44.867, "longitude": -123.198},
+        {"icao": "KPAO", "iata": "PAO", "latitude": 37.4611, "longitude": -122.115},
+        {"icao": "EGLL", "iata": "LHR", "latitude": 51.47, "longitude": -0.4543},
+        {"icaoCode": " lfpg ", "iataCode": "cdg", "latitude": 49.0097, "longitude": 2.5479},
+    ]
+    monkeypatch.setattr(airport_model, "load_airport_cache", lambda: airports)
+
+    assert airport_model.get_airport_coordinates("7S5")["icao"] == "K7S5"
+    assert airport_model.get_airport_coordinates("KPAO - Palo Alto")["icao"] == "KPAO"
+    assert airport_model.get_airport_coordinates("pao")["icao"] == "KPAO"
+    assert airport_model.get_airport_coordinates("LHR")["icao"] == "EGLL"
+    assert airport_model.get_airport_coordinates("CDG")["icao"] == "LFPG"
+    assert airport_model.get_airport_coordinates("ZZZZ") is None
+
+    table = airport_model.get_airport_table()
+    assert airport_model.get_airport_table() is table
+    assert table.code_index["K7S5"] == table.code_index["7S5"] == 0
+
+
+def test_trigram_index_candidates() -> None:
+    from app.utils.text_index import TrigramIndex, padded_trigrams, trigrams
+
+    index = TrigramIndex(["kpao pao palo alto", "ksql sql san carlos", "k7s5 7s5 independence"])
+
+    assert index.containing_all(trigrams("palo")).tolist() == [0]
+    assert index.containing_all(trigrams("carlos")).tolist() == [1]
+    assert index.containing_all(trigrams("zzz")).tolist() == []
+    assert index.containing_all(trigrams("pa")) is None
+
+    # A typo shares some (but not all) grams with the intended row.
+    assert index.shared_counts(trigrams("san carslo"), min_shared=2).tolist()[0] == 1
+    assert padded_trigrams("ab") == {"  a", " ab", "ab "}
+
+
+def test_fuzzy_search_keeps_short_close_names_among_long_ones(monkeypatch) -> None:
+    import app.models.airport as airport_model
+
+    def airport(icao: str, name: str) -> dict:
+        return {"icao": icao, "name": name, "latitude": 0.0, "longitude": 0.0}
+
+    # Long names sharing every query gram (without containing the query) outnumber the
+    # fuzzy candidate budget; none of them is close enough to score.
+    crowd = [
+        airport(f"X{i:03d}", f"Municipal Airport Hall M Field {i:03d}")
+        for i in range(airport_model.FUZZY_CANDIDATE_LIMIT + 50)
+    ]
+    monkeypatch.setattr(
+        airport_model, "load_airport_cache", lambda: [*crowd, airport("KGLZ", "Municipal")]
+    )
+
+    results = airport_model.search_airports_advanced(query="Municipal M", limit=5)
+
+    assert [r["icao"] for r in results] == ["KGLZ"]
+
+
+def test_prefix_index_and_tiered_type_ahead(monkeypatch) -> None:
+    import app.models.airport as airport_model
+    from app.utils.text_index import PrefixIndex
+
+    index = PrefixIndex([("kpao", 0), ("ksql", 1), ("kpae", 2), ("", 3)])
+    assert len(index) == 3
+    assert sorted(index.prefix("kpa").tolist()) == [0, 2]
+    assert index.exact("ksql").tolist() == [1]
+    assert index.exact("ksq").tolist() == []
+
+    airports = [
+        {"icao": "EPAO", "iata": "", "name": "Somewhere", "latitude": 50.0, "longitude": 20.0},
+        {"icao": "KSQL", "iata": "PAO", "name": "San Carlos", "latitude": 37.5, "longitude": -122.2},
+        {"icao": "KPAO", "iata": "", "name": "Palo Alto", "latitude": 37.46, "longitude": -122.1},
+        {"icao": "PAOM", "iata": "", "name": "Nome", "latitude": 64.5, "longitude": -165.4},
+        {"icao": "XXXX", "iata": "", "name": "Pao Field", "latitude": 10.0, "longitude": 10.0},
+    ]
+    monkeypatch.setattr(airport_model, "load_airport_cache", lambda: airports)
+
+    # exact code/alias (1.0), ICAO prefix (0.95), code substring (0.85), name (0.65)
+    results = airport_model.search_airports_advanced(query="pao", limit=10)
+    assert [r["icao"] for r in results] == ["KSQL", "KPAO", "PAOM", "EPAO", "XXXX"]
+
+    assert [r["icao"] for r in airport_model.search_airports_advanced(query="pao", limit=3)] == [
+        "KSQL",
+        "KPAO",
+        "PAOM",
+    ]
+
+    nearby = airport_model.search_airports_advanced(query="pao", limit=2, lat=37.46, lon=-122.1)
+    assert [r["icao"] for r in nearby] == ["KPAO", "KSQL"]
+
+
+def test_airports_batch_resolves_codes_and_reports_unknown(monkeypatch) -> None:
+    import app.models.airport as airport_model
+
+    airports = [
+        {"icao": "KPAO", "iata": "PAO", "name": "Palo Alto", "latitude": 37.46, "longitude": -122.1},
+        {"icao": "KSQL", "iata": "SQL", "name": "San Carlos", "latitude": 37.5, "longitude": -122.2},
+        {"icao": "K7S5", "iata": "", "name": "Independence", "latitude": 44.9, "longitude": -123.2},
+    ]
+    monkeypatch.setattr(airport_model, "load_airport_cache", lambda: airports)
+
+    client = TestClient(app)
+    resp = client.post(
+        "/api/airports/batch", json={"codes": ["KPAO - Palo Alto", "sql", "7S5", "ZZZZ", ""]}
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+
+    results = body["results"]
+    assert [r["found"] for r in results] == [True, True, True, False, False]
+    assert [r["airport"]["icao"] for r in results[:3]] == ["KPAO", "KSQL", "K7S5"]
+    assert results[0]["code"] == "KPAO"
+    assert results[3]["error"] == "Airport ZZZZ not found"
+    assert body["unknown"] == ["ZZZZ", ""]
+
+    assert client.post("/api/airports/batch", json={"codes": []}).status_code == 422
+
+
+def test_airports_bbox_decimates_by_zoom(monkeypatch) -> None:
+    import app.models.airport as airport_model
+
+    airports = [
+        {"icao": "KHAF", "latitude": 37.51, "longitude": -122.50, "type": "small_airport"},
+        {"icao": "KSFO", "latitude": 37.62, "longitude": -122.38, "type": "large_airport"},
+        {"icao": "CA01", "latitude": 37.60, "longitude": -122.40, "type": "heliport"},
+        {"icao": "KSQL", "latitude": 37.51, "longitude": -122.25, "type": "small_airport"},
+        {"icao": "NZCH", "latitude": -43.49, "longitude": 172.53, "type": "large_airport"},
+    ]
+    monkeypatch.setattr(airport_model, "load_airport_cache", lambda: airports)
+    client = TestClient(app)
+
+    params = {"west": -123.0, "south": 37.0, "east": -122.0, "north": 38.0}
+    detail = client.get("/api/airports/bbox", params={**params, "zoom": 14}).json()
+    assert detail["total"] == 4
+    assert [a["icao"] for a in detail["airports"]] == ["KHAF", "KSFO", "CA01", "KSQL"]
+    assert not detail["clustered"]
+
+    # Zoomed out, the whole area collapses onto its most important airport.
+    overview = client.get("/api/airports/bbox", params={**params, "zoom": 3}).json()
+    assert [(a["icao"], a["cluster_count"]) for a in overview["airports"]] == [("KSFO", 4)]
+    assert overview["clustered"]
+
+    capped = client.get("/api/airports/bbox", params={**params, "zoom": 14, "max_points": 2})
+    assert [a["icao"] for a in capped.json()["airports"]] == ["KHAF", "KSFO"]
+    assert capped.json()["truncated"]
+
+    across = client.get(
+        "/api/airports/bbox",
+        params={"west": 170, "south": -50, "east": -170, "north": -40, "zoom": 10},
+    )
+    assert [a["icao"] for a in across.json()["airports"]] == ["NZCH"]
+
+    bad = client.get("/api/airports/bbox", params={**params, "south": 39.0, "zoom": 5})
+    assert bad.status_code == 400
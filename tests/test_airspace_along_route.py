@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import numpy as np
+import shapely
+from fastapi.testclient import TestClient
+
+from app.models.airspace_store import AirspaceStore
+from app.routers import airspace as airspace_router
+from main import app
+
+
+def _store() -> AirspaceStore:
+    return AirspaceStore(
+        np.array(
+            [
+                shapely.box(-75.8, 39.8, -75.2, 40.2),
+                shapely.box(-74.6, 39.9, -74.4, 40.1),
+                shapely.box(-76.0, 42.0, -75.0, 43.0),
+            ],
+            dtype=object,
+        ),
+        [
+            {"id": "a", "name": "ALPHA", "icaoClass": "C"},
+            {"id": "b", "name": "BRAVO", "category": "D", "type": "CTR"},
+            {"id": "far", "name": "FAR AWAY"},
+        ],
+    )
+
+
+def test_airspace_along_route_reports_ordered_crossings(monkeypatch) -> None:
+    store = _store()
+    monkeypatch.setattr(airspace_router, "airspace_store", lambda: store)
+    client = TestClient(app)
+
+    # East through ALPHA (turning inside it), through BRAVO, then back west through ALPHA.
+    points = [[40.0, -76.0], [40.0, -75.5], [40.0, -74.0], [40.15, -74.0], [40.15, -76.0]]
+    resp = client.post("/api/airspace/along-route", json={"points": points})
+    assert resp.status_code == 200
+    body = resp.json()
+    crossings = body["crossings"]
+
+    assert [c["name"] for c in crossings] == ["ALPHA", "BRAVO", "ALPHA"]
+    first, bravo, back = crossings
+    # The turn inside ALPHA does not split the first crossing.
+    assert first["entry"] == [40.0, -75.8]
+    assert first["exit"] == [40.0, -75.2]
+    assert first["airspace_class"] == "C"
+    assert bravo["airspace_class"] == "D"
+    assert bravo["type"] == "CTR"
+    assert bravo["entry"] == [40.0, -74.6]
+    assert back["entry"][1] > back["exit"][1]
+    assert 0 < first["entry_nm"] < first["exit_nm"] < bravo["entry_nm"] < bravo["exit_nm"]
+    assert bravo["exit_nm"] < back["entry_nm"] < back["exit_nm"] < body["distance_nm"]
+    assert abs((first["exit_nm"] - first["entry_nm"]) - 0.6 * 60 * np.cos(np.radians(40))) < 0.2
+
+
+def test_airspace_along_route_ignores_boundary_touches(monkeypatch) -> None:
+    store = _store()
+    monkeypatch.setattr(airspace_router, "airspace_store", lambda: store)
+    client = TestClient(app)
+
+    # Runs along BRAVO's southern edge and touches ALPHA's corner without entering either.
+    points = [[39.9, -74.7], [39.9, -74.3], [39.7, -75.0], [39.8, -75.2]]
+    resp = client.post("/api/airspace/along-route", json={"points": points})
+    assert resp.status_code == 200
+    assert resp.json()["crossings"] == []
+
+    assert (
+        client.post("/api/airspace/along-route", json={"points": [[40.0, -75.0]]}).status_code
+        == 422
+    )
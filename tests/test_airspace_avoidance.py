@@ -1,48 +1,42 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, List
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Optional
 
+import numpy as np
+import pytest
+import shapely
 from shapely.geometry import Polygon
 
+from app.models.airspace_obstacles import ObstacleLayers
+from app.models.airspace_store import REF_GND, REF_MSL, REF_STD, AirspaceStore
 from app.services import xctry_route_planner
+from app.utils import data_versions as dv
+from app.utils.snapshot import open_snapshot, write_snapshot
 
 
-@dataclass
-class _FakeRow:
-    geometry: object
+@pytest.fixture(autouse=True)
+def _no_obstacle_layers(monkeypatch) -> None:
+    monkeypatch.setattr(xctry_route_planner, "load_obstacle_layers", lambda: None)
 
 
-class _FakeILoc:
-    def __init__(self, rows: List[_FakeRow]):
-        self._rows = rows
-
-    def __getitem__(self, idx: int) -> _FakeRow:
-        return self._rows[idx]
-
-
-class _FakeGDF:
-    def __init__(self, rows: List[_FakeRow]):
-        self._rows = rows
-
-    @property
-    def empty(self) -> bool:
-        return len(self._rows) == 0
-
-    @property
-    def iloc(self) -> _FakeILoc:
-        return _FakeILoc(self._rows)
+def _store(geoms: List[object], properties: Optional[List[dict]] = None) -> AirspaceStore:
+    return AirspaceStore(
+        np.array(geoms, dtype=object),
+        properties if properties is not None else [{} for _ in geoms],
+        source=Path("test"),
+    )
 
-    def intersects(self, seg) -> List[bool]:
-        # Only return an intersection for the initial direct leg. This simulates
-        # a detour insertion without requiring geopandas.
-        coords = list(seg.coords)
-        is_initial_leg = coords == [(0.0, 0.0), (2.0, 0.0)]
-        return [bool(is_initial_leg and r.geometry.intersects(seg)) for r in self._rows]
 
-    def __getitem__(self, mask: Iterable[bool]):
-        filtered = [r for r, m in zip(self._rows, mask) if m]
-        return _FakeGDF(filtered)
+def _limits(lower_ft, lower_ref, upper_ft, upper_ref) -> dict:
+    return {
+        "lower_ft": lower_ft,
+        "lower_ref": lower_ref,
+        "upper_ft": upper_ft,
+        "upper_ref": upper_ref,
+    }
 
 
 def test_avoid_airspaces_preserves_destination(monkeypatch) -> None:
@@ -54,8 +48,8 @@ def test_avoid_airspaces_preserves_destination(monkeypatch) -> None:
 
     monkeypatch.setattr(
         xctry_route_planner,
-        "load_airspaces_gdf",
-        lambda: _FakeGDF([_FakeRow(poly)]),
+        "load_airspace_store",
+        lambda: _store([poly]),
     )
 
     out = xctry_route_planner.avoid_airspaces([origin, destination], buffer_nm=5.0)
@@ -66,3 +60,261 @@ def test_avoid_airspaces_preserves_destination(monkeypatch) -> None:
 
     # No consecutive duplicates (avoids zero-length legs).
     assert all(out[i] != out[i + 1] for i in range(len(out) - 1))
+
+
+def test_avoid_airspaces_detours_around_first_intersecting_airspace(monkeypatch) -> None:
+    origin = (0.0, 0.0)
+    destination = (0.0, 2.0)
+
+    # Far-away airspace first so index order differs from candidate order; the detour must be
+    # built from the lowest-index airspace that actually intersects the leg.
+    far = Polygon([(10.0, 10.0), (11.0, 10.0), (11.0, 11.0), (10.0, 11.0)])
+    big = Polygon([(0.5, -0.3), (1.5, -0.3), (1.5, 0.3), (0.5, 0.3)])
+    small = Polygon([(0.9, -0.1), (1.1, -0.1), (1.1, 0.1), (0.9, 0.1)])
+    monkeypatch.setattr(
+        xctry_route_planner, "load_airspace_store", lambda: _store([far, big, small])
+    )
+
+    out = xctry_route_planner.avoid_airspaces([origin, destination], buffer_nm=5.0)
+
+    # The first detour point is offset from the boundary of `big`, not `small`.
+    def detour_point(poly: Polygon) -> tuple:
+        boundary = poly.boundary
+        closest = boundary.interpolate(boundary.project(shapely.Point(1.0, 0.0)))
+        return (closest.y + 5.0 * 0.0167, closest.x + 5.0 * 0.0167)
+
+    assert detour_point(big) in out
+    assert detour_point(small) not in out
+    assert out[-1] == destination
+
+
+def test_visibility_avoidance_routes_around_airspace_with_clearance(monkeypatch) -> None:
+    origin = (0.0, 0.0)
+    destination = (0.0, 2.0)
+    # One wide block across the direct leg and one far away that must not matter.
+    block = Polygon([(0.8, -0.3), (1.2, -0.3), (1.2, 0.5), (0.8, 0.5)])
+    far = Polygon([(10.0, 10.0), (11.0, 10.0), (11.0, 11.0), (10.0, 11.0)])
+    monkeypatch.setattr(xctry_route_planner, "load_airspace_store", lambda: _store([far, block]))
+
+    points, segments = xctry_route_planner.plan_route(
+        origin,
+        destination,
+        5500,
+        avoid_airspaces_enabled=True,
+        airspace_buffer_nm=5.0,
+        airspace_avoidance_mode="visibility",
+    )
+
+    assert points[0] == origin
+    assert points[-1] == destination
+    assert len(segments) == len(points) - 1
+    line = shapely.LineString([(lon, lat) for lat, lon in points])
+    # 70% of the 5 nm buffer, in degrees at the equator.
+    assert line.distance(block) >= 3.5 / 60.0 - 1e-6
+    # The short way round is south of the block (0.3 deg + buffer), not north.
+    assert max(lat for lat, _ in points) < 0.1
+    assert min(lat for lat, _ in points) > -0.3 - 6.0 / 60.0
+
+
+def test_visibility_avoidance_ignores_airspace_around_origin(monkeypatch) -> None:
+    origin = (0.0, 0.0)
+    destination = (0.0, 2.0)
+    around_origin = Polygon([(-0.2, -0.2), (0.2, -0.2), (0.2, 0.2), (-0.2, 0.2)])
+    monkeypatch.setattr(xctry_route_planner, "load_airspace_store", lambda: _store([around_origin]))
+
+    points, _ = xctry_route_planner.plan_route(
+        origin,
+        destination,
+        5500,
+        avoid_airspaces_enabled=True,
+        airspace_avoidance_mode="visibility",
+    )
+
+    assert points == [origin, destination]
+
+
+def test_avoidance_ignores_airspace_outside_the_cruise_altitude(monkeypatch) -> None:
+    origin = (0.0, 0.0)
+    destination = (0.0, 2.0)
+    block = Polygon([(0.8, -0.3), (1.2, -0.3), (1.2, 0.5), (0.8, 0.5)])
+    below = _limits(0.0, REF_GND, 3000.0, REF_MSL)
+    above = _limits(10000.0, REF_STD, 18000.0, REF_STD)
+    # 1,200 ft AGL could be anywhere up to the highest terrain, so it is always avoided.
+    agl_ceiling = _limits(0.0, REF_GND, 1200.0, REF_GND)
+
+    for mode in ("offset", "visibility"):
+        monkeypatch.setattr(
+            xctry_route_planner,
+            "load_airspace_store",
+            lambda: _store([block, block], [below, above]),
+        )
+        points, _ = xctry_route_planner.plan_route(
+            origin,
+            destination,
+            5500,
+            avoid_airspaces_enabled=True,
+            airspace_avoidance_mode=mode,
+        )
+        assert points == [origin, destination]
+
+        # Unknown limits, or airspace around the cruise altitude, are still avoided.
+        for props in ({}, _limits(4500.0, REF_MSL, 10000.0, REF_MSL), agl_ceiling):
+            monkeypatch.setattr(
+                xctry_route_planner, "load_airspace_store", lambda: _store([block], [props])
+            )
+            points, _ = xctry_route_planner.plan_route(
+                origin,
+                destination,
+                5500,
+                avoid_airspaces_enabled=True,
+                airspace_avoidance_mode=mode,
+            )
+            assert len(points) > 2, (mode, props)
+
+
+def test_vertical_mask_margins() -> None:
+    store = _store(
+        [Polygon([(0, 0), (1, 0), (1, 1)])] * 4,
+        [
+            _limits(5700.0, REF_MSL, 9000.0, REF_MSL),
+            _limits(5800.0, REF_MSL, 9000.0, REF_MSL),
+            _limits(6500.0, REF_STD, 9500.0, REF_STD),
+            _limits(0.0, REF_GND, 5300.0, REF_MSL),
+        ],
+    )
+    # 250 ft of margin around the altitude; flight levels get 1,000 ft either way.
+    assert store.altitude_mask(5500).tolist() == [True, False, True, True]
+    assert store.altitude_mask(None).all()
+
+
+def _sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _obstacle_layers(tmp_path, rows, *, built_from=b"[]", vertical=None) -> ObstacleLayers:
+    """Write (buffer_nm, class, geometry) rows in the build script's snapshot layout.
+
+    The layers record the digest of ``built_from``; the current source file holds ``[]``.
+    """
+    source = tmp_path / "airspaces_us.json"
+    source.write_bytes(built_from)
+    built_sha256 = _sha256(source)
+    source.write_bytes(b"[]")
+    path = tmp_path / "airspace_obstacles.bin"
+    write_snapshot(
+        path,
+        kind="obstacles",
+        count=len(rows),
+        arrays={"buffer_nm": np.array([r[0] for r in rows], dtype="<f8"), **(vertical or {})},
+        strings={"class": [r[1] for r in rows]},
+        blobs={"wkb": [r[2].wkb for r in rows]},
+        meta={"source_size": len(built_from), "sha256": built_sha256},
+    )
+    return ObstacleLayers.from_snapshot(open_snapshot(path, kind="obstacles"), _sha256(source))
+
+
+def test_avoid_airspaces_uses_prebuffered_obstacle_layers(monkeypatch, tmp_path) -> None:
+    origin = (0.0, 0.0)
+    destination = (0.0, 2.0)
+    airspace = Polygon([(0.9, -0.1), (1.1, -0.1), (1.1, 0.1), (0.9, 0.1)])
+    buffered = airspace.buffer(5.0 / 60.0)
+    layers = _obstacle_layers(
+        tmp_path,
+        [
+            (5.0, "4", buffered),
+            (10.0, "4", airspace.buffer(10.0 / 60.0)),
+            (5.0, "8", Polygon([(10.0, 10.0), (11.0, 10.0), (11.0, 11.0), (10.0, 11.0)])),
+        ],
+    )
+    assert layers.buffers_nm == [5.0, 10.0]
+    assert [layer.airspace_class for layer in layers.for_buffer(5.0)] == ["4", "8"]
+    assert [layer.airspace_class for layer in layers.for_buffer(5.0, classes=["8"])] == ["8"]
+
+    monkeypatch.setattr(xctry_route_planner, "load_obstacle_layers", lambda: layers)
+
+    def raw_airspace_not_used():
+        raise AssertionError("raw airspace should not be loaded when layers match")
+
+    monkeypatch.setattr(xctry_route_planner, "load_airspace_store", raw_airspace_not_used)
+
+    out = xctry_route_planner.avoid_airspaces([origin, destination], buffer_nm=5.0)
+
+    assert out[0] == origin
+    assert out[-1] == destination
+    line = shapely.LineString([(lon, lat) for lat, lon in out])
+    assert not line.intersects(airspace)
+    assert line.distance(airspace) >= 4.9 / 60.0
+
+
+def test_avoid_airspaces_ignores_segments_only_touching_an_obstacle(monkeypatch, tmp_path) -> None:
+    square = Polygon([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)])
+    layers = _obstacle_layers(tmp_path, [(5.0, "4", square)])
+    monkeypatch.setattr(xctry_route_planner, "load_obstacle_layers", lambda: layers)
+
+    # (lat, lon): one leg touches the corner, the other runs along the top edge.
+    for route in ([(1.0, 1.0), (3.0, 2.0)], [(1.0, -0.5), (1.0, 1.5)]):
+        assert xctry_route_planner.avoid_airspaces(route, buffer_nm=5.0) == route
+
+
+def test_obstacle_layers_built_from_another_source_are_ignored(tmp_path) -> None:
+    square = Polygon([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)])
+    assert _obstacle_layers(tmp_path, [(5.0, "4", square)], built_from=b"[{}]") is None
+    # A refresh that keeps the byte length (an edited digit) still invalidates the layers.
+    assert _obstacle_layers(tmp_path, [(5.0, "4", square)], built_from=b"{}") is None
+
+
+def test_obstacle_layers_skip_parts_outside_the_cruise_altitude(monkeypatch, tmp_path) -> None:
+    airspace = Polygon([(0.9, -0.1), (1.1, -0.1), (1.1, 0.1), (0.9, 0.1)])
+    layers = _obstacle_layers(
+        tmp_path,
+        [(5.0, "4", airspace.buffer(5.0 / 60.0))],
+        vertical={
+            "lower_ft": np.array([0.0]),
+            "lower_ref": np.array([REF_GND], dtype="<i1"),
+            "upper_ft": np.array([2500.0]),
+            "upper_ref": np.array([REF_MSL], dtype="<i1"),
+        },
+    )
+    monkeypatch.setattr(xctry_route_planner, "load_obstacle_layers", lambda: layers)
+
+    route = [(0.0, 0.0), (0.0, 2.0)]
+    assert xctry_route_planner.avoid_airspaces(route, altitude_ft=4500) == route
+    assert len(xctry_route_planner.avoid_airspaces(route, altitude_ft=2500)) > 2
+    assert len(xctry_route_planner.avoid_airspaces(route)) > 2
+
+
+def test_obstacle_layers_follow_the_file_the_airspace_store_loads(monkeypatch, tmp_path) -> None:
+    map_cache = tmp_path / "airspace_cache.json"
+    us_list = tmp_path / "airspaces_us.json"
+    obstacles = tmp_path / "airspace_obstacles.bin"
+    us_list.write_text(json.dumps([]), encoding="utf-8")
+    monkeypatch.setenv("AIRSPACE_CACHE_FILE", str(map_cache))
+    monkeypatch.setenv("AIRSPACES_FILE", str(us_list))
+    monkeypatch.setenv("AIRSPACE_OBSTACLES_FILE", str(obstacles))
+
+    def write_layers(source: Path) -> None:
+        square = Polygon([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)])
+        write_snapshot(
+            obstacles,
+            kind="obstacles",
+            count=1,
+            arrays={"buffer_nm": np.array([5.0], dtype="<f8")},
+            strings={"class": ["4"]},
+            blobs={"wkb": [square.wkb]},
+            meta={"source_size": source.stat().st_size, "sha256": _sha256(source)},
+        )
+
+    def build() -> Optional[ObstacleLayers]:
+        return xctry_route_planner._build_obstacle_layers(dv.DataVersionManager().current())
+
+    # Without a map cache the store loads the US list, and so do the layers.
+    write_layers(us_list)
+    assert build() is not None
+
+    # With one, layers built from the US list are stale; they must match the map cache.
+    map_cache.write_text(
+        json.dumps({"type": "FeatureCollection", "features": []}), encoding="utf-8"
+    )
+    assert build() is None
+    write_layers(map_cache)
+    assert build() is not None
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import shapely
+from fastapi.testclient import TestClient
+
+from app.models import airspace_store as store_module
+from app.routers import airspace as airspace_router
+from app.utils.snapshot import snapshot_path_for, write_snapshot
+from main import app
+
+
+def _circle(lon: float, lat: float, r: float, n: int) -> shapely.Polygon:
+    ang = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+    return shapely.Polygon(np.c_[lon + r * np.cos(ang), lat + r * np.sin(ang)])
+
+
+def _airspace_version(tmp_path) -> SimpleNamespace:
+    full = _circle(-122.0, 37.0, 0.2, 2000)
+    coarse = full.simplify(1000 / 111_320.0)
+    source = tmp_path / "airspace_cache.json"
+    source.write_text(json.dumps({"type": "FeatureCollection", "features": []}), encoding="utf-8")
+    write_snapshot(
+        snapshot_path_for(source),
+        kind="airspaces",
+        count=1,
+        arrays={},
+        strings={"properties": [json.dumps({"name": "TEST"})]},
+        blobs={"wkb": [full.wkb], "wkb_1000m": [coarse.wkb]},
+        meta={},
+    )
+    return SimpleNamespace(files={"airspace": source, "airspaces_us": tmp_path / "missing.json"})
+
+
+def test_airspace_nearby_uses_simplified_tier_for_zoom(tmp_path, monkeypatch) -> None:
+    store = store_module._build_airspace_store(_airspace_version(tmp_path))
+    monkeypatch.setattr(airspace_router, "airspace_store", lambda: store)
+    client = TestClient(app)
+
+    def ring_size(**params) -> int:
+        resp = client.get(
+            "/api/airspace/nearby", params={"lat": 37.0, "lon": -122.0, "radius_nm": 30, **params}
+        )
+        assert resp.status_code == 200
+        (feature,) = resp.json()["features"]
+        assert feature["properties"] == {"name": "TEST"}
+        return len(feature["geometry"]["coordinates"][0])
+
+    full = ring_size()
+    assert full == 2001
+    # 1 km is under a pixel at zoom 6; only the 1 km tier was built, so zoom 9 gets full detail.
+    assert ring_size(zoom=6) < full / 10
+    assert ring_size(zoom=9) == full
+
+
+def test_airspace_nearby_radius_is_nautical_miles_at_query_latitude(monkeypatch) -> None:
+    # A small square 25 nm north of the query point, at a latitude where mercator meters are
+    # half of true meters.
+    square = shapely.box(10.0, 60.0 + 25 / 60.0, 10.01, 60.0 + 25.5 / 60.0)
+    store = store_module.AirspaceStore(
+        np.array([square], dtype=object), [{"name": "N"}], source=None
+    )
+    monkeypatch.setattr(airspace_router, "airspace_store", lambda: store)
+    client = TestClient(app)
+
+    def names(radius_nm: float) -> list:
+        resp = client.get(
+            "/api/airspace/nearby", params={"lat": 60.0, "lon": 10.0, "radius_nm": radius_nm}
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/json"
+        return [f["properties"]["name"] for f in resp.json()["features"]]
+
+    assert names(20) == []
+    assert names(26) == ["N"]
+    # Served from the cached fragment the second time.
+    assert names(26) == ["N"]
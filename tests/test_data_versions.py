@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import gc
+import json
+import os
+import weakref
+
+from app.utils import data_versions as dv
+
+
+def _write_airports(path, icao: str) -> None:
+    path.write_text(
+        json.dumps([{"icao": icao, "iata": "", "latitude": 37.0, "longitude": -122.0}]),
+        encoding="utf-8",
+    )
+    # Make each write visible to the (mtime, size) signature even on coarse clocks.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_data_version_swaps_on_change_and_releases_old(tmp_path, monkeypatch) -> None:
+    airports = tmp_path / "airports_cache.json"
+    _write_airports(airports, "KAAA")
+    monkeypatch.setenv("AIRPORT_CACHE_FILE", str(airports))
+    monkeypatch.setenv("AIRSPACE_CACHE_FILE", str(tmp_path / "airspace_cache.json"))
+    monkeypatch.setenv("AIRSPACES_FILE", str(tmp_path / "airspaces_us.json"))
+
+    builds: list[int] = []
+    monkeypatch.setattr(dv, "_INDEX_BUILDERS", {"test": lambda v: builds.append(v.number)})
+
+    signature_calls = []
+    file_signature = dv.file_signature
+    monkeypatch.setattr(
+        dv, "file_signature", lambda files: signature_calls.append(1) or file_signature(files)
+    )
+
+    manager = dv.DataVersionManager()
+    first = manager.current()
+    assert first.number == 1
+    assert first.airports.icao == ("KAAA",)
+
+    # Requests read the published reference only: no stat, no reload.
+    calls = len(signature_calls)
+    assert manager.current() is first
+    assert len(signature_calls) == calls
+
+    assert manager.refresh() is False
+
+    _write_airports(airports, "KBBB")
+    first_ref = weakref.ref(first)
+    del first
+    assert manager.refresh() is True
+
+    second = manager.current()
+    assert second.number == 2
+    assert second.airports.icao == ("KBBB",)
+    # The new version was fully indexed before it was published.
+    assert builds == [2]
+    assert "code_index" in second.airports.__dict__
+
+    gc.collect()
+    assert first_ref() is None
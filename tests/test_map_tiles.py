@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Dict, List, Tuple
+
+from fastapi.testclient import TestClient
+
+from app.routers import tiles as tiles_router
+from app.utils import data_versions as dv
+from app.utils.ttl_cache import map_tile_cache
+from main import app
+
+
+def _varint(data: bytes, i: int) -> Tuple[int, int]:
+    shift = n = 0
+    while True:
+        b = data[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        shift += 7
+        if not b & 0x80:
+            return n, i
+
+
+def _fields(data: bytes) -> List[Tuple[int, object]]:
+    out: List[Tuple[int, object]] = []
+    i = 0
+    while i < len(data):
+        key, i = _varint(data, i)
+        if key & 7 == 0:
+            value, i = _varint(data, i)
+        elif key & 7 == 1:
+            value, i = data[i : i + 8], i + 8
+        else:
+            size, i = _varint(data, i)
+            value, i = data[i : i + size], i + size
+        out.append((key >> 3, value))
+    return out
+
+
+def _decode(tile: bytes) -> Dict[str, List[Tuple[int, Dict[str, object]]]]:
+    """Layer name -> [(geometry type, properties)] for the string-valued properties."""
+    layers: Dict[str, List[Tuple[int, Dict[str, object]]]] = {}
+    for _, layer in (f for f in _fields(tile) if f[0] == 3):
+        fields = _fields(layer)
+        keys = [v.decode() for n, v in fields if n == 3]
+        values = [dict(_fields(v)).get(1, b"").decode() for n, v in fields if n == 4]
+        features = []
+        for _, feat in (f for f in fields if f[0] == 2):
+            parts = dict(_fields(feat))
+            tags, j = [], 0
+            while j < len(parts.get(2, b"")):
+                t, j = _varint(parts[2], j)
+                tags.append(t)
+            props = {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])}
+            features.append((parts[3], props))
+        layers[dict(fields)[1].decode()] = features
+    return layers
+
+
+def _version(tmp_path, monkeypatch) -> dv.DataVersion:
+    airports = tmp_path / "airports_cache.json"
+    airports.write_text(
+        json.dumps(
+            [
+                {"icao": "KSFO", "latitude": 37.62, "longitude": -122.38, "type": "large_airport"},
+                {"icao": "KSQL", "latitude": 37.51, "longitude": -122.45, "type": "small_airport"},
+            ]
+        ),
+        encoding="utf-8",
+    )
+    airspace = tmp_path / "airspace_cache.json"
+    ring = [[-122.6, 37.4], [-122.1, 37.4], [-122.1, 37.8], [-122.6, 37.8], [-122.6, 37.4]]
+    airspace.write_text(
+        json.dumps(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {
+                        "type": "Feature",
+                        "geometry": {"type": "Polygon", "coordinates": [ring]},
+                        "properties": {"name": "SFO CLASS B", "icaoClass": "B"},
+                    }
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setenv("AIRPORT_CACHE_FILE", str(airports))
+    monkeypatch.setenv("AIRSPACE_CACHE_FILE", str(airspace))
+    monkeypatch.setenv("AIRSPACES_FILE", str(tmp_path / "airspaces_us.json"))
+    monkeypatch.setenv("MAP_TILES_DIR", str(tmp_path / "tiles"))
+    version = dv.DataVersionManager().current()
+    monkeypatch.setattr(tiles_router, "current_data", lambda: version)
+    return version
+
+
+def test_map_tiles_render_airspace_and_airports_by_zoom(tmp_path, monkeypatch) -> None:
+    _version(tmp_path, monkeypatch)
+    client = TestClient(app)
+
+    resp = client.get("/api/tiles/airspace/0/0/0.mvt")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    assert _decode(resp.content) == {"airspace": [(3, {"name": "SFO CLASS B", "icaoClass": "B"})]}
+
+    def airport_codes(z: int, x: int, y: int) -> List[object]:
+        resp = client.get(f"/api/tiles/airports/{z}/{x}/{y}.mvt")
+        assert resp.status_code == 200
+        return [props["code"] for _, props in _decode(resp.content).get("airports", [])]
+
+    # Small fields only appear from their minimum zoom on.
+    assert airport_codes(0, 0, 0) == ["KSFO"]
+    assert airport_codes(10, 163, 396) == ["KSFO", "KSQL"]
+    # A tile with nothing in it is empty, not an error.
+    assert airport_codes(10, 0, 0) == []
+
+    assert client.get("/api/tiles/weather/0/0/0.mvt").status_code == 404
+    assert client.get("/api/tiles/airports/1/2/0.mvt").status_code == 404
+
+
+def test_map_tiles_serve_prerendered_tiles_built_from_current_data(tmp_path, monkeypatch) -> None:
+    version = _version(tmp_path, monkeypatch)
+    layer_dir = tmp_path / "tiles" / "airspace"
+    (layer_dir / "0" / "0").mkdir(parents=True)
+    (layer_dir / "0" / "0" / "0.mvt").write_bytes(b"prerendered")
+    source = version.files["airspace"]
+    (layer_dir / "meta.json").write_text(
+        json.dumps(
+            {
+                "source_size": source.stat().st_size,
+                "sha256": hashlib.sha256(source.read_bytes()).hexdigest(),
+                "max_zoom": 1,
+            }
+        ),
+        encoding="utf-8",
+    )
+    client = TestClient(app)
+
+    assert client.get("/api/tiles/airspace/0/0/0.mvt").content == b"prerendered"
+    # Within the pre-rendered zooms a missing file means the tile is empty.
+    assert client.get("/api/tiles/airspace/1/0/0.mvt").content == b""
+    # Above them tiles are rendered on demand.
+    assert "airspace" in _decode(client.get("/api/tiles/airspace/2/0/1.mvt").content)
+
+    # An airspace refresh of the same byte length is a new source: render, don't serve.
+    source.write_text(source.read_text(encoding="utf-8").replace("SFO", "OAK"), encoding="utf-8")
+    refreshed = dv.DataVersionManager().current()
+    map_tile_cache.clear()  # a fresh manager reuses version number 1
+    monkeypatch.setattr(tiles_router, "current_data", lambda: refreshed)
+    assert refreshed.files["airspace"].stat().st_size == version.files["airspace"].stat().st_size
+    tile = client.get("/api/tiles/airspace/0/0/0.mvt").content
+    assert _decode(tile)["airspace"][0][1]["name"] == "OAK CLASS B"
@@ -422,3 +422,213 @@ def test_plan_local_mode_ok(monkeypatch) -> None:
     assert body["center"]["icao"] == "AAA"
     assert len(body["nearby_airports"]) == 1
     assert body["nearby_airports"][0]["icao"] == "BBB"
+
+
+def test_plan_route_mode_returns_ranked_alternative_itineraries(monkeypatch) -> None:
+    import app.routers.route as route_router
+
+    airports = {
+        "AAA": (40.0, -75.0),
+        "BBB": (41.0, -75.0),
+        "BBX": (41.0, -74.9),
+        "CCC": (42.0, -75.0),
+    }
+    monkeypatch.setattr(
+        route_router,
+        "load_airport_cache",
+        lambda: [
+            {"icao": code, "latitude": lat, "longitude": lon, "name": code}
+            for code, (lat, lon) in airports.items()
+        ],
+    )
+    monkeypatch.setattr(
+        route_router,
+        "get_airport_coordinates",
+        lambda code: (
+            {
+                "icao": code.upper(),
+                "iata": "",
+                "latitude": airports[code.upper()][0],
+                "longitude": airports[code.upper()][1],
+            }
+            if code.upper() in airports
+            else None
+        ),
+    )
+
+    client = TestClient(app)
+    resp = client.post(
+        "/api/plan",
+        json={
+            "mode": "route",
+            "origin": "AAA",
+            "destination": "CCC",
+            "speed": 100.0,
+            "speed_unit": "knots",
+            "altitude": 5500,
+            "plan_fuel_stops": True,
+            "aircraft_range_nm": 80,
+            "max_leg_distance": 80,
+            "alternatives": 2,
+        },
+    )
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["route"] == ["AAA", "BBB", "CCC"]
+    alternatives = body["alternative_routes"]
+    assert [a["rank"] for a in alternatives] == [1, 2]
+    assert alternatives[0]["route"] == ["AAA", "BBX", "CCC"]
+    assert len({tuple(a["route"]) for a in alternatives}) == 2
+    assert alternatives[0]["fuel_stops"] == ["BBX"]
+    assert alternatives[0]["distance_nm"] >= body["distance_nm"] - 0.1
+
+
+def test_plan_route_mode_reuses_cached_fuel_stop_search(monkeypatch) -> None:
+    import app.routers.route as route_router
+
+    airports = {
+        "AAA": (40.0, -75.0),
+        "BBB": (41.0, -75.0),
+        "CCC": (42.0, -75.0),
+    }
+    monkeypatch.setattr(
+        route_router,
+        "load_airport_cache",
+        lambda: [
+            {"icao": code, "latitude": lat, "longitude": lon, "name": code}
+            for code, (lat, lon) in airports.items()
+        ],
+    )
+    monkeypatch.setattr(
+        route_router,
+        "get_airport_coordinates",
+        lambda code: (
+            {
+                "icao": code.upper(),
+                "iata": "",
+                "latitude": airports[code.upper()][0],
+                "longitude": airports[code.upper()][1],
+            }
+            if code.upper() in airports
+            else None
+        ),
+    )
+    searched: list[float] = []
+    real_find_routes = route_router.a_star.find_routes
+
+    def counting_find_routes(**kwargs):
+        searched.append(kwargs["max_leg_distance_nm"])
+        return real_find_routes(**kwargs)
+
+    monkeypatch.setattr(route_router.a_star, "find_routes", counting_find_routes)
+
+    client = TestClient(app)
+    routes = []
+    for range_nm in (82, 84, 86):
+        resp = client.post(
+            "/api/plan",
+            json={
+                "mode": "route",
+                "origin": "AAA",
+                "destination": "CCC",
+                "speed": 100.0,
+                "speed_unit": "knots",
+                "altitude": 5500,
+                "plan_fuel_stops": True,
+                "aircraft_range_nm": range_nm,
+                "max_leg_distance": 500,
+            },
+        )
+        assert resp.status_code == 200
+        routes.append(resp.json()["route"])
+
+    # 82 and 84 nm share the 80 nm bucket; 86 nm is searched again with 85 nm legs.
+    assert routes == [["AAA", "BBB", "CCC"]] * 3
+    assert searched == [80.0, 85.0]
+
+    caches = client.get("/api/health").json()["caches"]
+    assert caches["fuel_stop_routes"]["hits"] == 1
+    assert caches["fuel_stop_routes"]["misses"] == 2
+
+
+def test_plan_route_mode_fuel_stop_cache_is_keyed_by_resolved_airport(monkeypatch) -> None:
+    import app.models.airport as airport_model
+    import app.routers.route as route_router
+
+    airports = [
+        {"icao": f"K{code}", "iata": code, "latitude": lat, "longitude": -75.0, "name": code}
+        for code, lat in (("AAA", 40.0), ("BBB", 41.0), ("CCC", 42.0))
+    ]
+    monkeypatch.setattr(airport_model, "load_airport_cache", lambda: airports)
+    monkeypatch.setattr(route_router, "load_airport_cache", lambda: airports)
+    searches: list[str] = []
+    real_find_routes = route_router.a_star.find_routes
+
+    def counting_find_routes(**kwargs):
+        searches.append(kwargs["origin"].code)
+        return real_find_routes(**kwargs)
+
+    monkeypatch.setattr(route_router.a_star, "find_routes", counting_find_routes)
+
+    client = TestClient(app)
+    routes = []
+    for origin in ("KAAA", " kaaa", "KAAA - Alpha", "AAA"):
+        resp = client.post(
+            "/api/plan",
+            json={
+                "mode": "route",
+                "origin": origin,
+                "destination": "ccc",
+                "speed": 100.0,
+                "speed_unit": "knots",
+                "altitude": 5500,
+                "plan_fuel_stops": True,
+                "aircraft_range_nm": 82,
+                "max_leg_distance": 500,
+            },
+        )
+        assert resp.status_code == 200
+        routes.append(resp.json()["route"])
+
+    assert searches == ["KAAA"]
+    assert routes == [["KAAA", "KBBB", "KCCC"]] * 4
+
+
+def test_plan_route_mode_embeds_airspace_report(monkeypatch) -> None:
+    import numpy as np
+    import shapely
+
+    import app.routers.route as route_router
+    from app.models.airspace_store import AirspaceStore
+
+    airports = {"AAA": (40.0, -75.0), "BBB": (41.0, -76.0)}
+    monkeypatch.setattr(
+        route_router,
+        "get_airport_coordinates",
+        lambda code: (
+            {"latitude": airports[code.upper()][0], "longitude": airports[code.upper()][1]}
+            if code.upper() in airports
+            else None
+        ),
+    )
+    store = AirspaceStore(
+        np.array([shapely.box(-75.6, 40.4, -75.4, 40.6)], dtype=object), [{"name": "MID"}]
+    )
+    monkeypatch.setattr(route_router, "airspace_store", lambda: store)
+
+    request = {
+        "mode": "route",
+        "origin": "AAA",
+        "destination": "BBB",
+        "speed": 100.0,
+        "altitude": 5500,
+    }
+    client = TestClient(app)
+    assert client.post("/api/plan", json=request).json()["airspace_crossings"] is None
+
+    resp = client.post("/api/plan", json={**request, "include_airspace_report": True})
+    assert resp.status_code == 200
+    (crossing,) = resp.json()["airspace_crossings"]
+    assert crossing["name"] == "MID"
+    assert 0 < crossing["entry_nm"] < crossing["exit_nm"] < resp.json()["distance_nm"]
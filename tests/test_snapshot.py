@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.models.airport_table import AirportTable
+from app.utils import data_loader
+from app.utils.snapshot import SnapshotError, open_snapshot, write_snapshot
+
+
+AIRPORTS = [
+    {
+        "icao": "KPAO",
+        "iata": "PAO",
+        "name": "Palo Alto Airport",
+        "city": "Palo Alto",
+        "country": "US",
+        "latitude": 37.4611,
+        "longitude": -122.115,
+        "elevation": 4,
+        "type": "small_airport",
+    },
+    {
+        "icao": "LSZH",
+        "iata": "ZRH",
+        "name": None,
+        "city": "Zürich",
+        "country": "CH",
+        "latitude": 47.4647,
+        "longitude": 8.5492,
+        "elevation": None,
+        "type": "large_airport",
+    },
+]
+
+
+def _write_airports_snapshot(path: Path) -> None:
+    write_snapshot(
+        path,
+        kind="airports",
+        count=len(AIRPORTS),
+        arrays={
+            "lat": np.array([a["latitude"] for a in AIRPORTS]),
+            "lon": np.array([a["longitude"] for a in AIRPORTS]),
+            "elevation": np.array(
+                [np.nan if a["elevation"] is None else a["elevation"] for a in AIRPORTS]
+            ),
+        },
+        strings={
+            key: [a[key] for a in AIRPORTS]
+            for key in ("icao", "iata", "name", "city", "country", "type")
+        },
+    )
+
+
+def test_snapshot_round_trip(tmp_path) -> None:
+    path = tmp_path / "data.bin"
+    write_snapshot(
+        path,
+        kind="test",
+        count=3,
+        arrays={"x": np.array([1.5, 2.5, 3.5])},
+        strings={"s": ["a", None, "ü"]},
+        blobs={"b": [b"\x00\x01", b"", b"xyz"]},
+        meta={"source": "unit"},
+    )
+
+    snap = open_snapshot(path, kind="test")
+    assert snap.count == 3
+    assert snap.meta == {"source": "unit"}
+    assert snap.array("x").tolist() == [1.5, 2.5, 3.5]
+    assert not snap.array("x").flags.writeable
+    assert list(snap.strings("s")) == ["a", None, "ü"]
+    assert snap.strings("s")[-1] == "ü"
+    assert list(snap.blobs("b")) == [b"\x00\x01", b"", b"xyz"]
+
+    with pytest.raises(SnapshotError):
+        open_snapshot(path, kind="airports")
+    with pytest.raises(SnapshotError):
+        snap.array("missing")
+
+
+def test_load_airports_prefers_fresh_snapshot(tmp_path) -> None:
+    json_path = tmp_path / "airports_cache.json"
+    json_path.write_text(json.dumps(AIRPORTS), encoding="utf-8")
+    _write_airports_snapshot(tmp_path / "airports_cache.bin")
+
+    table = data_loader.load_airports(json_path)
+    assert isinstance(table, AirportTable)
+    assert type(table.icao).__name__ == "StringColumn"
+    assert list(table) == list(AirportTable.from_records(AIRPORTS))
+    assert table.code_index["PAO"] == 0
+
+    # A JSON file newer than its snapshot wins, so a stale snapshot is never served.
+    stat = json_path.stat()
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**10))
+    fallback = data_loader.load_airports(json_path)
+    assert isinstance(fallback.icao, tuple)
+    assert list(fallback) == list(table)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np
+
+from app.models.airport_table import AirportTable
+from app.utils.spatial_index import GridIndex, SphericalIndex
+
+
+def _random_table(n: int) -> AirportTable:
+    rng = random.Random(42)
+    return AirportTable.from_records(
+        {
+            "icao": f"X{i:04d}",
+            "latitude": rng.uniform(-89.0, 89.0),
+            "longitude": rng.uniform(-180.0, 180.0),
+        }
+        for i in range(n)
+    )
+
+
+def test_query_radius_matches_brute_force() -> None:
+    table = _random_table(2000)
+    index = SphericalIndex(table.lat, table.lon, leaf_size=8)
+
+    # Includes points near the antimeridian and the poles.
+    for lat, lon, radius in [(0.0, 179.9, 600.0), (88.0, 10.0, 400.0), (37.5, -122.2, 900.0)]:
+        expected = np.flatnonzero(table.distances_nm(lat, lon) <= radius)
+        rows, dists = index.query_radius(lat, lon, radius)
+        assert rows.tolist() == expected.tolist()
+        assert np.allclose(dists, table.distances_nm(lat, lon)[rows])
+
+
+def test_query_knn_returns_nearest_first() -> None:
+    table = _random_table(2000)
+    index = SphericalIndex(table.lat, table.lon, leaf_size=8)
+
+    rows, dists = index.query_knn(-45.0, 170.0, 7)
+    expected = np.argsort(table.distances_nm(-45.0, 170.0), kind="stable")[:7]
+    assert rows.tolist() == expected.tolist()
+    assert list(dists) == sorted(dists)
+
+
+def test_grid_bbox_matches_brute_force() -> None:
+    table = _random_table(2000)
+    index = GridIndex(table.lat, table.lon, cell_deg=5.0)
+    lat, lon = table.lat, table.lon
+
+    for west, south, east, north in [(-10.0, -20.0, 30.0, 15.0), (170.0, -60.0, -170.0, 60.0)]:
+        in_lon = (lon >= west) & (lon <= east) if west <= east else (lon >= west) | (lon <= east)
+        expected = np.flatnonzero(in_lon & (lat >= south) & (lat <= north))
+        assert index.query_bbox(west, south, east, north).tolist() == expected.tolist()
+
+    assert len(index.query_bbox(-180.0, -90.0, 180.0, 90.0)) == len(table)